@@ -0,0 +1,196 @@
+"""
+Collision-free NUBAN-style account numbers for wallets that can't use the
+owner's phone number.
+
+A number is a 9-digit serial plus the CBN NUBAN check digit for our bank
+code. Serials are handed out in blocks of BLOCK_SIZE: each worker reserves a
+block with one statement (nextval() on Postgres, a locked counter row
+elsewhere) and then allocates from memory, so signups never retry and never
+run an extra uniqueness query.
+
+Serials start at SERIAL_START and stay below SERIAL_END, so allocated numbers
+begin with 1-6 and can't collide with phone-derived numbers, which begin
+with 7-9 (070/080/081/090/091 without the leading 0). Legacy random numbers
+may sit anywhere in that range, so a reserved block that already holds one
+is skipped.
+
+Two spellings of one phone number ('+234803...', '0803...') give the same
+phone-derived number, so account_numbers_for() only hands it out if no
+wallet has it yet and allocates otherwise.
+"""
+import os
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .banks import OWO_BANK_CODE
+from .utils import normalize_phone
+
+NUBAN_WEIGHTS = [3, 7, 3, 3, 7, 3, 3, 7, 3, 3, 7, 3]
+BLOCK_SIZE = 100  # Never change: block index -> serial range depends on it
+SERIAL_START = 100000000
+SERIAL_END = 700000000
+SEQUENCE_NAME = 'accounts_account_number_block_seq'
+
+PHONE_ACCOUNT_RE = re.compile(r'^[7-9]\d{9}$')
+
+
+def nuban_check_digit(serial, bank_code=OWO_BANK_CODE):
+    digits = f'{bank_code}{serial:09d}'
+    total = sum(int(d) * w for d, w in zip(digits, NUBAN_WEIGHTS))
+    return (10 - total % 10) % 10
+
+
+def is_valid_nuban(account_number, bank_code=OWO_BANK_CODE):
+    if len(account_number) != 10 or not account_number.isdigit():
+        return False
+    return nuban_check_digit(int(account_number[:9]), bank_code) == int(account_number[9])
+
+
+def phone_account_number(phone_number):
+    """Last 10 digits of a Nigerian mobile number, or None if it isn't one"""
+    candidate = (normalize_phone(phone_number or '') or '')[-10:]
+    return candidate if PHONE_ACCOUNT_RE.match(candidate) else None
+
+
+def account_numbers_for(phone_numbers):
+    """
+    An account number for each phone number: the phone-derived one unless a
+    wallet (or an earlier entry) already has it, else an allocated one. One
+    query per shard for the whole list.
+    """
+    from .models import Wallet
+    from .sharding import shard_for
+
+    candidates = [phone_account_number(phone_number) for phone_number in phone_numbers]
+    by_shard = defaultdict(list)
+    for candidate in filter(None, candidates):
+        by_shard[shard_for(candidate)].append(candidate)
+    taken = set()
+    for alias, numbers in by_shard.items():
+        taken.update(
+            Wallet.objects.using(alias).filter(account_number__in=numbers).values_list('account_number', flat=True)
+        )
+
+    numbers = []
+    for candidate in candidates:
+        if candidate and candidate not in taken:
+            taken.add(candidate)
+            numbers.append(candidate)
+        else:
+            numbers.append(allocate_account_number())
+    return numbers
+
+
+def _block_in_use(block):
+    """Whether a legacy account number falls in the block's serial range"""
+    from .models import Wallet
+    from .sharding import shards
+
+    start = SERIAL_START + block * BLOCK_SIZE
+    low, high = f'{start:09d}0', f'{start + BLOCK_SIZE:09d}0'
+    return any(
+        Wallet.objects.using(alias).filter(account_number__gte=low, account_number__lt=high).exists()
+        for alias in shards()
+    )
+
+
+def reserve_block():
+    """Reserve the next block index in the database that no legacy number falls in"""
+    while True:
+        block = _next_block()
+        # Past the end, _block_range() reports the exhaustion
+        if SERIAL_START + (block + 1) * BLOCK_SIZE > SERIAL_END or not _block_in_use(block):
+            return block
+
+
+def _next_block():
+    if connection.vendor == 'postgresql':
+        # nextval() is not transactional, so the block is ours even if the
+        # caller's transaction rolls back
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s)", [SEQUENCE_NAME])
+            return cursor.fetchone()[0] - 1  # sequences start at 1
+
+    from .models import AccountNumberSequence
+    with transaction.atomic():
+        sequence, _ = AccountNumberSequence.objects.select_for_update().get_or_create(name='wallet')
+        block = sequence.next_block
+        sequence.next_block = block + 1
+        sequence.save(update_fields=['next_block'])
+    return block
+
+
+class BlockAllocator:
+    """Per-process cache of reserved serials"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._range = [0, 0]  # committed block shared by all threads
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def allocate(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's block is not ours to use
+                self._range = [0, 0]
+                self._pid = os.getpid()
+            if self._range[0] < self._range[1]:
+                return self._take(self._range)
+
+        if connection.vendor != 'postgresql' and connection.in_atomic_block:
+            return self._allocate_in_transaction()
+
+        block = reserve_block()
+        with self._lock:
+            self._range = self._block_range(block)
+            return self._take(self._range)
+
+    def _allocate_in_transaction(self):
+        """
+        The counter row update belongs to the caller's transaction, so its
+        block may only be shared once that commits. Until then this thread
+        keeps using it; a rollback discards the on_commit hook and the block.
+        """
+        pending = getattr(self._local, 'pending', None)
+        if pending and pending[0] < pending[1] and self._hook_pending(self._local.hook):
+            return self._take(pending)
+
+        pending = self._local.pending = self._block_range(reserve_block())
+
+        def adopt():
+            with self._lock:
+                if self._range[0] >= self._range[1]:
+                    self._range = pending
+            self._local.pending = None
+
+        self._local.hook = adopt
+        transaction.on_commit(adopt)
+        return self._take(pending)
+
+    @staticmethod
+    def _hook_pending(hook):
+        return any(entry[1] is hook for entry in connection.run_on_commit)
+
+    @staticmethod
+    def _block_range(block):
+        start = SERIAL_START + block * BLOCK_SIZE
+        if start + BLOCK_SIZE > SERIAL_END:
+            raise RuntimeError("Account number space exhausted")
+        return [start, start + BLOCK_SIZE]
+
+    @staticmethod
+    def _take(serial_range):
+        serial = serial_range[0]
+        serial_range[0] += 1
+        return f'{serial:09d}{nuban_check_digit(serial)}'
+
+
+allocator = BlockAllocator()
+
+
+def allocate_account_number():
+    return allocator.allocate()
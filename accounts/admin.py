@@ -1,8 +1,121 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import User, Wallet, Transaction
 from django.utils.html import format_html
-from .models import Statement
+from django.http import FileResponse, Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from datetime import datetime
+from . import profiling
+from .models import Statement, OutboundEmail
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes an unfiltered table's size from PostgreSQL's
+    statistics (pg_class.reltuples, kept current by autovacuum) instead of
+    running COUNT(*), which reads every row. Filtered lists, small tables and
+    other databases are counted exactly.
+
+    The estimate can be off by a little, so the last page may come up short.
+    """
+
+    # Below this an exact count is cheap, and the estimate is least reliable
+    ESTIMATE_ABOVE = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.ESTIMATE_ABOVE:
+                return estimate
+        return super().count
+
+
+def estimated_row_count(model, using):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 until the table is first analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class TransactionTypeFilter(admin.SimpleListFilter):
+    """By type, from a fixed list: the stock filter runs SELECT DISTINCT type over the whole table"""
+    title = 'type'
+    parameter_name = 'type'
+
+    def lookups(self, request, model_admin):
+        return [(value, value.title()) for value in Transaction.TYPES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(type=self.value())
+        return queryset
+
+
+class WalletFilter(admin.SimpleListFilter):
+    """
+    One wallet, picked with the admin's autocomplete (WalletAdmin's search),
+    instead of a link per user email rendered into every page load.
+    """
+    title = 'wallet'
+    parameter_name = 'wallet'
+    template = 'admin/accounts/wallet_filter.html'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value:
+            return []
+        if not value.isdigit():
+            raise IncorrectLookupParameters(f"Invalid wallet: {value}")
+        # Only the selected wallet, for its label
+        return [(value, account) for account in Wallet.objects.filter(pk=value).values_list('account_number', flat=True)]
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(wallet_id=self.value())
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value(),
+            'display': dict(self.lookup_choices).get(self.value(), ''),
+            # Everything else on the page survives picking a wallet
+            'hidden': [(name, value) for name, value in changelist.params.items() if name != self.parameter_name],
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+class TransactionChangeList(ChangeList):
+    """
+    The year/month/day drill-down reads MIN/MAX(timestamp) and the distinct
+    dates of every row it covers, so it is only offered within one wallet.
+    """
+
+    def __init__(self, request, model, list_display, list_display_links, list_filter, date_hierarchy, *args, **kwargs):
+        if not request.GET.get(WalletFilter.parameter_name):
+            date_hierarchy = None
+        super().__init__(request, model, list_display, list_display_links, list_filter, date_hierarchy, *args, **kwargs)
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # Just the columns list_display shows, not every wallet and user column
+        return super().get_queryset(request, exclude_parameters).only(
+            'id', 'amount', 'type', 'description', 'timestamp', 'wallet__account_number', 'wallet__user__email',
+        )
+
 
 # Custom User Admin
 class CustomUserAdmin(UserAdmin):
@@ -29,10 +142,17 @@ class CustomUserAdmin(UserAdmin):
 # Custom Wallet Admin
 class WalletAdmin(admin.ModelAdmin):
     list_display = ('account_number', 'user_email', 'balance_display', 'user_phone', 'created_at')
+    list_select_related = ('user',)  # user_email/user_phone/created_at read the user per row
     list_filter = ('user__is_active',)
-    search_fields = ('account_number', 'user__email', 'user__phone_number')
+    # Prefix matches only, each on a column with an index LIKE 'prefix%' can
+    # use (migration 0015); also what the transaction list's wallet
+    # autocomplete searches
+    search_fields = ('account_number__startswith', 'user__email__startswith', 'user__phone_number__startswith')
     readonly_fields = ('account_number', 'created_at', 'updated_at')
-    ordering = ('-user__date_joined',)
+    # Wallets are created with their user, so id order is join order, without a join
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def user_email(self, obj):
         return obj.user.email
@@ -53,11 +173,41 @@ class WalletAdmin(admin.ModelAdmin):
 # Custom Transaction Admin
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('transaction_id', 'user_info', 'amount_display', 'type', 'description_short', 'timestamp')
-    list_filter = ('type', 'timestamp', 'wallet__user__email')
-    search_fields = ('wallet__user__email', 'wallet__account_number', 'description', 'type')
+    list_select_related = ('wallet__user',)  # user_info
+    # 'timestamp' offers today / past 7 days / this month / this year: range
+    # scans on transaction_time_idx, no queries to render
+    list_filter = (TransactionTypeFilter, 'timestamp', WalletFilter)
+    search_fields = ('wallet__account_number__exact', 'wallet__user__email__exact', 'reference__exact')
+    autocomplete_fields = ('wallet',)
     readonly_fields = ('timestamp',)
     ordering = ('-timestamp',)
+    # Within one wallet only, see TransactionChangeList
     date_hierarchy = 'timestamp'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return TransactionChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact matches, one index each: an email or an account number finds
+        that wallet's transactions, anything else a saga reference. The stock
+        search ORs every field across the joins, which no index can answer.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term:
+            return queryset.filter(wallet__user__email=term), False
+        if term.isdigit():
+            return queryset.filter(wallet__account_number=term), False
+        return queryset.filter(reference=term), False
+
+    @property
+    def media(self):
+        # Select2 and the admin's autocomplete script, for WalletFilter
+        return super().media + AutocompleteSelect(Transaction._meta.get_field('wallet'), self.admin_site).media
     
     def transaction_id(self, obj):
         return f"TX{obj.id:06d}"
@@ -82,6 +232,7 @@ class TransactionAdmin(admin.ModelAdmin):
 
 class StatementAdmin(admin.ModelAdmin):
     list_display = ('statement_id', 'user_email', 'period_range', 'total_transactions', 'total_income', 'total_expense', 'generated_at')
+    list_select_related = ('user',)
     list_filter = ('generated_at', 'period_start', 'period_end')
     search_fields = ('statement_id', 'user__email', 'user__phone_number')
     readonly_fields = ('statement_id', 'generated_at', 'total_transactions', 'total_income', 'total_expense', 'net_change')
@@ -95,12 +246,38 @@ class StatementAdmin(admin.ModelAdmin):
         return f"{obj.period_start} to {obj.period_end}"
     period_range.short_description = 'Period'
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    ordering = ('-created_at',)
+
+
+def profile_list_view(request):
+    profiles = [
+        {'name': name, 'size': size, 'modified': datetime.fromtimestamp(mtime, tz=timezone.get_current_timezone())}
+        for name, size, mtime in profiling.list_profiles()
+    ]
+    context = {**admin.site.each_context(request), 'title': 'Request profiles', 'profiles': profiles}
+    return TemplateResponse(request, 'admin/accounts/profiles.html', context)
+
+
+def profile_download_view(request, name):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404("Profile not found")
+    if request.GET.get('format') == 'txt':
+        return HttpResponse(profiling.summarize(path), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
 
 # Register your models
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Wallet, WalletAdmin)
 admin.site.register(Transaction, TransactionAdmin)
 admin.site.register(Statement, StatementAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
 
 # Customize admin site
 admin.site.site_header = "Owo Bank Administration"
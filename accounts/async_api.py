@@ -0,0 +1,52 @@
+"""
+Native async DRF views, for endpoints that mostly wait (database, upstream
+providers) and are served under ASGI.
+
+DRF's APIView is synchronous: under an ASGI server Django runs it in a
+thread, one per request in flight. AsyncAPIView runs on the event loop
+instead. Only the synchronous parts of DRF (authentication, permissions,
+throttles, content negotiation) hop to a thread, via sync_to_async; the
+handler itself is a coroutine that awaits the async ORM, so a single worker
+keeps many requests waiting at once.
+
+Handlers (get, post, ...) must all be `async def`, and must not touch the
+sync ORM: `request.user` is loaded before the handler runs, but related
+objects (`request.user.wallet`) are not, so fetch them with the a*-methods
+(`Wallet.objects.aget_for_user(user)`).
+
+Which variant serves a URL is decided by OWO_ASYNC_VIEWS (accounts/urls.py).
+Under WSGI async views still work, but Django runs each one in its own event
+loop, so leave the flag off there.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting the handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication may query the database (JWT -> user row)
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
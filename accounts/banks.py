@@ -0,0 +1,63 @@
+"""
+Bank directory, loaded once per process.
+
+The /banks/ response body never changes between deploys, so it is rendered,
+gzipped and hashed for an ETag at import time, and every request just picks
+the right bytes.
+"""
+import gzip
+import hashlib
+import json
+
+from django.http import HttpResponse, HttpResponseNotModified
+
+OWO_BANK_CODE = '050'
+
+BANKS = (
+    ("050", "Owo Bank"),
+    ("001", "Access Bank"),
+    ("002", "First Bank"),
+    ("003", "GTBank"),
+    ("004", "UBA"),
+    ("005", "Zenith Bank"),
+    ("006", "Fidelity Bank"),
+    ("030", "Opay"),
+    ("032", "Kuda Bank"),
+)
+
+BANK_NAMES = dict(BANKS)
+
+
+def bank_name(code, default=''):
+    return BANK_NAMES.get(code, default)
+
+
+class StaticResponse:
+    """Pre-rendered (and pre-compressed) response bytes with a strong ETag"""
+
+    def __init__(self, body, content_type='application/json', cache_control='public, max-age=86400'):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        self.content_type = content_type
+        self.cache_control = cache_control
+
+    def respond(self, request):
+        if self.etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(self.gzip_body, content_type=self.content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(self.body, content_type=self.content_type)
+        response['ETag'] = self.etag
+        response['Cache-Control'] = self.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+# Authenticated endpoint, so only the client may cache it
+BANK_LIST_RESPONSE = StaticResponse(
+    json.dumps([{"code": code, "name": name} for code, name in BANKS], separators=(',', ':')).encode(),
+    cache_control='private, max-age=86400',
+)
@@ -0,0 +1,354 @@
+"""
+Synthetic load driver for `manage.py bench_api`.
+
+Each virtual user is a thread with its own keep-alive HTTP connection. It
+logs in, takes a PIN step-up token (as the app does), then runs weighted
+random scenarios until the deadline or request budget runs out. Latencies
+are recorded per scenario. Results and baselines are plain dicts, so they
+can be saved as JSON.
+"""
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = {
+    'login': 5,
+    'transfer': 20,
+    'bill': 15,
+    'transactions': 45,
+    'statement': 15,
+}
+# The read endpoints that have async variants (bench_asgi)
+ASYNC_MIX = {
+    'verify_account': 60,
+    'profile': 20,
+    'real_time': 20,
+}
+SCENARIOS = (*DEFAULT_MIX, *ASYNC_MIX)
+
+BENCH_EMAIL = 'bench{}@bench.owo.test'
+BENCH_PASSWORD = 'bench-password-1'
+BENCH_PIN = '4826'
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_samples))) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+def parse_mix(value):
+    """'transfer=20,transactions=80' -> {'transfer': 20, 'transactions': 80}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+BENCH_DATABASE_MARKERS = ('test', 'bench')
+
+
+def non_bench_databases():
+    """
+    Aliases the seeding commands (bench_api --seed-users, seed_load) would
+    write to whose database name doesn't say test or bench. They create
+    funded accounts sharing one known password and PIN, so they must not run
+    against a real database by accident.
+    """
+    from django.db import DEFAULT_DB_ALIAS, connections
+
+    from .sharding import shards
+
+    unsafe = []
+    for alias in dict.fromkeys([DEFAULT_DB_ALIAS, *shards()]):
+        connection = connections[alias]
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            continue
+        name = os.path.basename(str(connection.settings_dict['NAME'] or '')).lower()
+        if not any(marker in name for marker in BENCH_DATABASE_MARKERS):
+            unsafe.append(alias)
+    return unsafe
+
+
+def seed_bench_users(count, transactions_per_user=200):
+    """
+    Create (or reuse) bench users with funded wallets and some history.
+    Returns [(email, account_number)].
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction as db_transaction
+
+    from .models import Transaction, User, Wallet
+
+    password_hash = make_password(BENCH_PASSWORD)
+    pin_hash = make_password(BENCH_PIN)
+    users = []
+    with db_transaction.atomic():
+        for i in range(count):
+            user, created = User.objects.get_or_create(
+                email=BENCH_EMAIL.format(i),
+                defaults={
+                    'phone_number': f'0909{i:07d}',
+                    'first_name': 'Bench',
+                    'last_name': f'User{i}',
+                    'nin': f'9{i:010d}',
+                    'date_of_birth': '1990-01-01',
+                    'password': password_hash,
+                    'pin': pin_hash,
+                },
+            )
+            wallet, _ = Wallet.objects.get_or_create(user=user)
+            wallet.balance = Decimal('100000000.00')
+            wallet.save(update_fields=['balance'])
+            if created and transactions_per_user:
+                Transaction.objects.bulk_create([
+                    Transaction(
+                        wallet=wallet,
+                        amount=Decimal(random.choice(['-1500.00', '-200.00', '5000.00', '-750.50'])),
+                        type=random.choice(['TRANSFER', 'AIRTIME', 'DATA', 'DEPOSIT']),
+                        description='Bench history',
+                    )
+                    for _ in range(transactions_per_user)
+                ])
+            users.append((user.email, wallet.account_number))
+    return users
+
+
+def use_file_test_databases(tmpdir, suffix):
+    """
+    Make the next setup_databases() create throwaway databases that several
+    threads and processes can share. Call before setup_databases().
+    """
+    from django.db import connections
+
+    for alias in connections:
+        conn = connections[alias]
+        test = conn.settings_dict.setdefault('TEST', {})
+        if conn.vendor == 'sqlite':
+            # One file per run instead of the shared-memory test DB, so each
+            # thread gets its own connection as in production. WAL and
+            # IMMEDIATE transactions make concurrent writers queue up instead
+            # of failing with "database is locked".
+            test['NAME'] = os.path.join(tmpdir, f'{alias}.sqlite3')
+            conn.settings_dict['OPTIONS'] = {
+                **conn.settings_dict.get('OPTIONS', {}),
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 30,
+                'init_command': 'PRAGMA journal_mode=WAL;',
+            }
+        else:
+            # Never the test suite's database, which may be in use
+            test['NAME'] = f"test_{conn.settings_dict['NAME']}_{suffix}"
+
+
+class Result:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.error_examples = {}
+        self.lock = threading.Lock()
+
+    def add(self, scenario, elapsed, status, body=b''):
+        with self.lock:
+            self.samples.setdefault(scenario, []).append(elapsed)
+            if not 200 <= status < 300:
+                self.errors[scenario] = self.errors.get(scenario, 0) + 1
+                self.error_examples.setdefault(scenario, f'{status} {body[:200]!r}')
+
+    def summary(self, elapsed):
+        report = {}
+        for scenario, samples in sorted(self.samples.items()):
+            samples.sort()
+            report[scenario] = {
+                'count': len(samples),
+                'errors': self.errors.get(scenario, 0),
+                'p50_ms': round(percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(percentile(samples, 99) * 1000, 2),
+                'rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            }
+        return report
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, driver, index, email, account_number, accounts):
+        super().__init__(daemon=True)
+        self.driver = driver
+        self.email = email
+        self.recipients = [a for a in accounts if a != account_number] or accounts
+        # Reproducible request sequence per thread for a given --seed
+        self.rng = random.Random(f'{driver.seed}:{index}')
+        self.connection = None
+        self.token = None
+        self.pin_token = None
+
+    def request(self, method, path, body=None, record=None):
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body).encode() if body is not None else None
+
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.driver.connect()
+            self.connection.request(method, self.driver.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            # Reconnect on the next request
+            self.connection = None
+            data, status = str(e).encode(), 599
+        elapsed = time.perf_counter() - start
+
+        if record:
+            self.driver.result.add(record, elapsed, status, data)
+        return status, data
+
+    def login(self, record=None):
+        status, data = self.request('POST', 'login/', {'email': self.email, 'password': BENCH_PASSWORD}, record)
+        if status == 200:
+            self.token = json.loads(data)['access']
+            status, data = self.request('POST', 'pin/step-up/', {'pin': BENCH_PIN})
+            if status == 200:
+                self.pin_token = json.loads(data)['pin_token']
+        return status == 200
+
+    def run(self):
+        if not self.login():
+            self.driver.result.add('login', 0.0, 401, b'initial login failed')
+            return
+        scenarios, weights = zip(*self.driver.mix.items())
+        while self.driver.take_ticket():
+            getattr(self, 'run_' + self.rng.choices(scenarios, weights)[0])()
+        if self.connection:
+            self.connection.close()
+
+    def run_login(self):
+        self.login(record='login')
+
+    def run_transfer(self):
+        recipient = self.rng.choice(self.recipients)
+        self.request('POST', 'transfer/', {
+            'amount': '1.00',
+            'account_number': recipient,
+            'bank_code': '050',
+            'description': 'bench',
+            'pin_token': self.pin_token,
+        }, record='transfer')
+
+    def run_bill(self):
+        self.request('POST', 'bill/', {
+            'type': self.rng.choice(['AIRTIME', 'DATA']),
+            'amount': '100',
+            'phone_number': '08031234567',
+            'pin_token': self.pin_token,
+        }, record='bill')
+
+    def run_transactions(self):
+        self.request('GET', 'transactions/', record='transactions')
+
+    def run_statement(self):
+        self.request('POST', 'statement/generate/', {
+            'period': self.rng.choice(['this_month', 'last_month', 'this_year']),
+        }, record='statement')
+
+    def run_verify_account(self):
+        # An external bank, so the view waits on the (simulated) name enquiry
+        self.request('POST', 'verify-account/', {
+            'account_number': '0123456789',
+            'bank_code': '058',
+        }, record='verify_account')
+
+    def run_profile(self):
+        self.request('GET', 'profile/', record='profile')
+
+    def run_real_time(self):
+        self.request('GET', 'real-time-data/', record='real_time')
+
+
+class LoadDriver:
+    def __init__(self, base_url, users, mix=None, concurrency=8, duration=30, max_requests=None, seed=0):
+        parts = urlsplit(base_url)
+        self.scheme, self.netloc = parts.scheme, parts.netloc
+        self.prefix = parts.path.rstrip('/') + '/'
+        self.users = users
+        self.mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.seed = seed
+        self.result = Result()
+        self._issued = 0
+        self._deadline = None
+        self._ticket_lock = threading.Lock()
+
+    def connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.netloc, timeout=30)
+
+    def take_ticket(self):
+        """True while the run should continue"""
+        if time.monotonic() >= self._deadline:
+            return False
+        if self.max_requests is None:
+            return True
+        with self._ticket_lock:
+            self._issued += 1
+            return self._issued <= self.max_requests
+
+    def run(self):
+        accounts = [account for _, account in self.users]
+        # Different senders per thread; wrap around when there are fewer users
+        clients = [VirtualUser(self, i, *self.users[i % len(self.users)], accounts) for i in range(self.concurrency)]
+        self._deadline = time.monotonic() + self.duration
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'meta': {
+                'concurrency': self.concurrency,
+                'elapsed_s': round(elapsed, 2),
+                'mix': self.mix,
+                'total_rps': round(sum(len(s) for s in self.result.samples.values()) / elapsed, 2) if elapsed else 0.0,
+            },
+            'endpoints': self.result.summary(elapsed),
+            'error_examples': dict(self.result.error_examples),
+        }
+
+
+def compare(current, baseline, threshold=0.2, max_error_rate=0.01):
+    """
+    Regressions of `current` against `baseline` as human-readable strings.
+    Latency percentiles may grow and throughput may shrink by `threshold`
+    (a fraction) before they count.
+    """
+    problems = []
+    for scenario, now in current['endpoints'].items():
+        if now['count'] and now['errors'] / now['count'] > max_error_rate:
+            problems.append(f"{scenario}: {now['errors']}/{now['count']} requests failed")
+
+        before = baseline.get('endpoints', {}).get(scenario)
+        if not before:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if before[key] and now[key] > before[key] * (1 + threshold):
+                problems.append(f"{scenario}: {key} {before[key]} -> {now[key]}")
+        if before['rps'] and now['rps'] < before['rps'] * (1 - threshold):
+            problems.append(f"{scenario}: rps {before['rps']} -> {now['rps']}")
+    return problems
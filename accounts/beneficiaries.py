@@ -0,0 +1,148 @@
+"""
+Frecency ranking for saved beneficiaries.
+
+Each use adds use_weight(now) = 2 ** (days since EPOCH / HALF_LIFE_DAYS) to
+Beneficiary.score. Because every weight grows at the same rate, ordering by
+the stored score equals ordering by a score where each use decays with the
+given half-life. Nothing needs rewriting as time passes, and a use is a
+single F() increment.
+
+Scores double every HALF_LIFE_DAYS, so they stay well within float range for
+decades. If that ever matters, move EPOCH forward and divide every stored
+score by the same factor.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Beneficiary
+
+SEARCH_CACHE_TTL = 60
+SEARCH_MAX_RESULTS = 20
+
+HALF_LIFE_DAYS = 14
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def use_weight(at=None):
+    days = ((at or timezone.now()) - EPOCH).total_seconds() / 86400
+    return 2 ** (days / HALF_LIFE_DAYS)
+
+
+def record_beneficiary_use(user, account_number, bank_code, at=None):
+    """Bump a saved beneficiary's usage in one UPDATE; returns rows updated (0 or 1)"""
+    at = at or timezone.now()
+    updated = Beneficiary.objects.filter(
+        user=user, account_number=account_number, bank_code=bank_code
+    ).update(
+        transfer_count=F('transfer_count') + 1,
+        last_used=at,
+        score=F('score') + use_weight(at),
+    )
+    if updated:
+        # update() sends no post_save; the new score reorders search results
+        invalidate_search(user.pk)
+    return updated
+
+
+def upsert_beneficiary_use(user, account_number, bank_code, name, bank_name='', nickname='', at=None):
+    """
+    Save a beneficiary and count a use of it in a single statement:
+    INSERT ... ON CONFLICT (user, account_number, bank_code) DO UPDATE.
+    Existing rows keep their name and nickname.
+    """
+    at = at or timezone.now()
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        # No ON CONFLICT: fall back to update-then-insert
+        if not record_beneficiary_use(user, account_number, bank_code, at):
+            Beneficiary.objects.get_or_create(
+                user=user, account_number=account_number, bank_code=bank_code,
+                defaults={'name': name, 'bank_name': bank_name, 'nickname': nickname or None,
+                          'transfer_count': 1, 'score': use_weight(at)},
+            )
+        invalidate_search(user.pk)
+        return
+
+    table = connection.ops.quote_name(Beneficiary._meta.db_table)
+    timestamp = connection.ops.adapt_datetimefield_value(at)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table}
+                (user_id, name, account_number, bank_code, bank_name, nickname,
+                 created_at, last_used, transfer_count, score)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1, %s)
+            ON CONFLICT (user_id, account_number, bank_code) DO UPDATE SET
+                transfer_count = {table}.transfer_count + 1,
+                last_used = excluded.last_used,
+                score = {table}.score + excluded.score
+            """,
+            [user.pk, name, account_number, bank_code, bank_name, nickname or None,
+             timestamp, timestamp, use_weight(at)],
+        )
+    # Raw SQL skips post_save, so invalidate the typeahead cache here
+    invalidate_search(user.pk)
+
+
+def _search_version(user_id):
+    return cache.get_or_set(f'bsearch-ver:{user_id}', 1, None)
+
+
+def _search_key(user_id, version, q):
+    # q is user input: hashed, it can't break memcached's key rules or its 250 byte limit
+    return f'bsearch:{user_id}:{version}:{hashlib.sha1(q.encode()).hexdigest()}'
+
+
+def invalidate_search(user_id):
+    """Called when a user's saved beneficiaries change"""
+    key = f'bsearch-ver:{user_id}'
+    cache.add(key, 1, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # evicted between add() and incr()
+
+
+def _matches(row, q):
+    return (
+        row['name'].lower().startswith(q)
+        or (row['nickname'] or '').lower().startswith(q)
+        or row['accountNumber'].startswith(q)
+    )
+
+
+def search_beneficiaries(user, q, limit, format_rows):
+    """
+    Prefix search over name, nickname and account number, best-ranked first.
+
+    Results are cached per user and query. While typing, each query extends
+    the previous one. If the cached result for q[:-1] was complete (fewer than
+    SEARCH_MAX_RESULTS hits), the answer for q is a subset of it. In that case
+    it is filtered in memory with no query at all.
+    """
+    q = q.strip().lower()
+    version = _search_version(user.pk)
+    key = _search_key(user.pk, version, q)
+
+    cached = cache.get(key)
+    if cached is None and len(q) > 1:
+        shorter = cache.get(_search_key(user.pk, version, q[:-1]))
+        if shorter is not None and shorter['complete']:
+            cached = {'rows': [r for r in shorter['rows'] if _matches(r, q)], 'complete': True}
+            cache.set(key, cached, SEARCH_CACHE_TTL)
+
+    if cached is None:
+        matches = Beneficiary.objects.filter(user=user).filter(
+            Q(name__istartswith=q) | Q(nickname__istartswith=q) | Q(account_number__startswith=q)
+        ).order_by('-score', '-id').only(
+            'id', 'name', 'account_number', 'bank_code', 'bank_name', 'nickname', 'last_used', 'transfer_count'
+        )[:SEARCH_MAX_RESULTS]
+        rows = format_rows(matches)
+        cached = {'rows': rows, 'complete': len(rows) < SEARCH_MAX_RESULTS}
+        cache.set(key, cached, SEARCH_CACHE_TTL)
+
+    return cached['rows'][:limit]
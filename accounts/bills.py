@@ -0,0 +1,42 @@
+"""
+Airtime and data purchases behind a pluggable provider.
+
+BillPaymentView debits the wallet before calling the provider, so the same
+money can't pay for two purchases while the provider works, and reverses the
+debit (ledger.reverse) when the provider fails. Providers implement
+`purchase(bill_type, phone_number, amount)` and raise BillProviderError when
+nothing was bought. Pick a provider with OWO_BILL_PROVIDER:
+  accounts.bills.StubBillProvider - simulated, in process (default); takes
+                                    OWO_BILL_PROVIDER_DELAY seconds and always
+                                    succeeds
+"""
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BillProviderError(Exception):
+    pass
+
+
+class BaseBillProvider:
+    def purchase(self, bill_type, phone_number, amount):
+        raise NotImplementedError
+
+
+class StubBillProvider(BaseBillProvider):
+    """Simulated vendor: every purchase succeeds after OWO_BILL_PROVIDER_DELAY seconds"""
+
+    def purchase(self, bill_type, phone_number, amount):
+        time.sleep(getattr(settings, 'OWO_BILL_PROVIDER_DELAY', 1.0))
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = import_string(getattr(settings, 'OWO_BILL_PROVIDER', 'accounts.bills.StubBillProvider'))()
+    return _provider
@@ -0,0 +1,143 @@
+"""
+In-memory Bloom filter index of registered emails, phone numbers and NINs.
+
+A negative answer means "not registered" and lets signup validation and
+NIN checks skip the database. A positive answer may be a false positive, so
+callers still confirm with a query.
+
+The index is built with one streamed query by warm_up() in the gunicorn
+master before it forks (or lazily, on first use, elsewhere), and each
+process adds users it creates or saves itself. Users created by other workers are
+picked up by an incremental refresh at most every
+OWO_REGISTRATION_INDEX_REFRESH seconds. IDs are handed out when a row is
+inserted, not when it commits, so a refresh re-reads the last
+OWO_REGISTRATION_INDEX_OVERLAP ids before `last_id` too: a signup still
+in flight when a later one committed is picked up on the next refresh
+instead of never. The unique constraints remain the final guard for the
+few seconds in between.
+
+Refreshes only read new ids, so a user changing their email or phone number
+in another worker is never seen here (this process's own saves are), and a
+value freed by a deletion or change stays in the filter. So a negative can
+be wrong for an updated value: signup then fails on the unique constraint
+(RegisterView reports it), and /register/availability/ doesn't use the index.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+
+INDEXED_FIELDS = ('email', 'phone_number', 'nin')
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        new = False
+        for pos in self._positions(value):
+            new = new or not self.bits[pos >> 3] & (1 << (pos & 7))
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        # Values seen before (re-read by an overlapping refresh) don't count
+        # towards capacity
+        if new:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class RegistrationIndex:
+    def __init__(self, error_rate=0.001, refresh_interval=5, refresh_overlap=1000):
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.refresh_overlap = refresh_overlap
+        self.filters = None
+        self.last_id = 0
+        self.refreshed_at = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def build(self):
+        """Rebuild every filter from one streamed query over the user table"""
+        from .models import User
+
+        capacity = max(User.objects.count() * 2, 100000)
+        filters = {field: BloomFilter(capacity, self.error_rate) for field in INDEXED_FIELDS}
+        last_id = 0
+        rows = User.objects.order_by().values_list('id', *INDEXED_FIELDS).iterator(chunk_size=5000)
+        for user_id, *values in rows:
+            for field, value in zip(INDEXED_FIELDS, values):
+                if value:
+                    filters[field].add(value)
+            last_id = max(last_id, user_id)
+
+        with self._lock:
+            self.filters, self.last_id, self.refreshed_at = filters, last_id, time.monotonic()
+
+    def refresh(self):
+        """Add users created by other processes since the last build/refresh"""
+        from .models import User
+
+        since = max(self.last_id - self.refresh_overlap, 0)
+        rows = list(User.objects.filter(id__gt=since).order_by('id').values_list('id', *INDEXED_FIELDS))
+        with self._lock:
+            for user_id, *values in rows:
+                self._add_values(zip(INDEXED_FIELDS, values))
+                self.last_id = max(self.last_id, user_id)
+            self.refreshed_at = time.monotonic()
+            full = any(f.count > f.capacity for f in self.filters.values())
+        if full:
+            self.build()
+
+    def _ensure_fresh(self):
+        if self.filters is None:
+            with self._build_lock:
+                if self.filters is None:
+                    self.build()
+        elif time.monotonic() - self.refreshed_at > self.refresh_interval:
+            self.refresh()
+
+    def _add_values(self, pairs):
+        for field, value in pairs:
+            if value:
+                self.filters[field].add(value)
+
+    def add(self, user):
+        if self.filters is None:
+            return  # picked up by the first build
+        with self._lock:
+            self._add_values((field, getattr(user, field)) for field in INDEXED_FIELDS)
+
+    def might_contain(self, field, value):
+        """False means the value is certainly not registered"""
+        if not value:
+            return False
+        self._ensure_fresh()
+        return value in self.filters[field]
+
+    def is_registered(self, field, value):
+        """Exact answer, touching the database only when the filter can't rule it out"""
+        from .models import User
+
+        return self.might_contain(field, value) and User.objects.filter(**{field: value}).exists()
+
+
+registration_index = RegistrationIndex(
+    refresh_interval=getattr(settings, 'OWO_REGISTRATION_INDEX_REFRESH', 5),
+    refresh_overlap=getattr(settings, 'OWO_REGISTRATION_INDEX_OVERLAP', 1000),
+)
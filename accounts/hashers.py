@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with cost parameters taken from settings.
+
+    Django's stock parameters (100 MiB, parallelism 8) cost tens of ms of CPU
+    per check, which every PIN-protected request pays. The algorithm name is
+    unchanged, so existing argon2 hashes still verify and are transparently
+    rehashed with these parameters on the next successful check.
+    """
+
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', 19456)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', 1)
@@ -0,0 +1,221 @@
+"""
+Balance changes as single conditional UPDATEs, each written together with
+its Transaction row.
+
+Reading a balance, checking it in Python and saving it back loses money under
+concurrency: two requests read the same balance and the second save wins.
+Here the check and the change are one statement,
+
+    UPDATE accounts_wallet SET balance = balance - %s WHERE id = %s AND balance >= %s
+
+so the database serializes them on the row lock and a debit that would go
+negative matches no row.
+
+Transfers update both rows in primary-key order, so two opposite transfers
+between the same wallets queue up instead of deadlocking.
+
+When the two wallets live on different shards (accounts/sharding.py) there is
+no transaction spanning both. The transfer becomes a saga recorded in a
+ShardTransfer row on default:
+
+    PENDING  -> debit the sender (its shard)      -> DEBITED
+    DEBITED  -> credit the recipient (its shard)  -> COMPLETED
+
+Each step writes a Transaction with a unique `reference`, so repeating a
+step is a no-op. If the sender can't pay, or the debit fails with a database
+error and did not apply, the saga is FAILED and nothing moved (if the sender's
+shard can't even say whether it applied, the saga stays PENDING for
+`manage.py resume_transfers`). If the recipient's shard is unreachable the saga stays DEBITED and
+`manage.py resume_transfers` finishes it later; if the recipient wallet is
+gone the sender is refunded (COMPENSATED), or, if the refund can't be written
+yet, the saga stays DEBITED and resume_transfers refunds it later.
+"""
+import logging
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+
+from .models import ShardTransfer, Transaction, Wallet
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+class TransferPending(Exception):
+    """The sender was debited but the recipient's shard did not answer; resume_transfers will finish it"""
+
+    def __init__(self, debit):
+        super().__init__("Transfer is being completed")
+        self.debit = debit
+
+
+class TransferFailed(Exception):
+    pass
+
+
+def debit(wallet, amount):
+    updated = Wallet.objects.using(wallet._state.db).filter(pk=wallet.pk, balance__gte=amount).update(
+        balance=F('balance') - amount
+    )
+    if not updated:
+        raise InsufficientFunds
+
+
+def credit(wallet, amount):
+    Wallet.objects.using(wallet._state.db).filter(pk=wallet.pk).update(balance=F('balance') + amount)
+
+
+def balance(wallet):
+    return Wallet.objects.using(wallet._state.db).values_list('balance', flat=True).get(pk=wallet.pk)
+
+
+def pay_out(wallet, amount, entry):
+    """Debit `wallet` for money leaving the bank (bills, external transfers); returns its Transaction"""
+    alias = wallet._state.db
+    with transaction.atomic(using=alias):
+        debit(wallet, amount)
+        return Transaction.objects.using(alias).create(wallet=wallet, amount=-amount, **entry)
+
+
+def reverse(wallet, debit_row):
+    """Credit back a pay_out() whose money never left (the provider failed), at most once"""
+    entry = {'type': debit_row.type, 'description': f"Reversal: {debit_row.description}"[:255]}
+    apply_step(wallet, -debit_row.amount, entry, f'reversal-{debit_row.pk}')
+
+
+def move(sender, recipient, amount, debit_entry, credit_entry):
+    """
+    Debit the sender and credit the recipient, writing both Transaction rows,
+    or do neither (raises InsufficientFunds). Returns the sender's Transaction.
+    `debit_entry`/`credit_entry` are the other Transaction fields of each row.
+    """
+    alias = sender._state.db
+    if recipient._state.db != alias:
+        return move_across_shards(sender, recipient, amount, debit_entry, credit_entry)
+
+    with transaction.atomic(using=alias):
+        if recipient.pk < sender.pk:
+            credit(recipient, amount)
+            debit(sender, amount)
+        else:
+            debit(sender, amount)
+            credit(recipient, amount)
+        Transaction.objects.using(alias).create(wallet=recipient, amount=amount, **credit_entry)
+        return Transaction.objects.using(alias).create(wallet=sender, amount=-amount, **debit_entry)
+
+
+def move_across_shards(sender, recipient, amount, debit_entry, credit_entry):
+    saga = ShardTransfer.objects.create(
+        sender_account=sender.account_number, recipient_account=recipient.account_number, amount=amount,
+        debit_entry=debit_entry, credit_entry=credit_entry,
+    )
+    return run_saga(saga, sender, recipient)
+
+
+def run_saga(saga, sender=None, recipient=None):
+    """Drive a ShardTransfer forward from its current state; returns the sender's Transaction"""
+    sender = sender or Wallet.objects.get_by_account(saga.sender_account)
+
+    if saga.state == ShardTransfer.PENDING:
+        try:
+            apply_step(sender, -saga.amount, saga.debit_entry, f'saga-{saga.pk}-debit')
+        except InsufficientFunds:
+            set_state(saga, ShardTransfer.FAILED, "Insufficient funds")
+            raise
+        except DatabaseError as e:
+            logger.warning("Transfer %s: debiting %s failed", saga.pk, saga.sender_account, exc_info=True)
+            # A lost connection can hide a commit that went through
+            try:
+                debited = step_applied(sender, f'saga-{saga.pk}-debit')
+            except DatabaseError:
+                # PENDING: resume_transfers looks again once the shard answers
+                raise TransferFailed("Transfer could not be confirmed. Check your transactions before trying again.")
+            if not debited:
+                set_state(saga, ShardTransfer.FAILED, str(e))
+                raise TransferFailed("Transfer failed and your account was not debited. Please try again.")
+        set_state(saga, ShardTransfer.DEBITED)
+
+    debit_row = Transaction.objects.using(sender._state.db).get(reference=f'saga-{saga.pk}-debit')
+    if saga.state != ShardTransfer.DEBITED:
+        return debit_row
+
+    try:
+        recipient = recipient or Wallet.objects.get_by_account(saga.recipient_account)
+        apply_step(recipient, saga.amount, saga.credit_entry, f'saga-{saga.pk}-credit')
+    except Wallet.DoesNotExist:
+        # Permanent: give the money back
+        refund = {**saga.debit_entry, 'description': f"Reversal: {saga.debit_entry.get('description', '')}"[:255]}
+        try:
+            apply_step(sender, saga.amount, refund, f'saga-{saga.pk}-refund')
+        except DatabaseError as e:
+            # Still DEBITED: resume_transfers retries the refund once the sender's shard answers
+            logger.warning("Transfer %s: refunding %s failed", saga.pk, saga.sender_account, exc_info=True)
+            set_state(saga, ShardTransfer.DEBITED, str(e))
+            raise TransferFailed("Recipient account not found. Your refund is being processed.")
+        set_state(saga, ShardTransfer.COMPENSATED, "Recipient wallet not found")
+        raise TransferFailed("Recipient account not found")
+    except DatabaseError as e:
+        # Maybe transient; the saga stays DEBITED for resume_transfers
+        logger.warning("Transfer %s: crediting %s failed", saga.pk, saga.recipient_account, exc_info=True)
+        set_state(saga, ShardTransfer.DEBITED, str(e))
+        raise TransferPending(debit_row)
+
+    set_state(saga, ShardTransfer.COMPLETED)
+    return debit_row
+
+
+def apply_step(wallet, amount, entry, reference):
+    """Change the balance and write its Transaction, at most once per reference"""
+    alias = wallet._state.db
+    try:
+        with transaction.atomic(using=alias):
+            if amount < 0:
+                debit(wallet, -amount)
+            else:
+                credit(wallet, amount)
+            Transaction.objects.using(alias).create(wallet=wallet, amount=amount, reference=reference, **entry)
+    except IntegrityError:
+        # An earlier attempt already applied it; the balance change rolled back with the duplicate row
+        if not step_applied(wallet, reference):
+            raise
+
+
+def step_applied(wallet, reference):
+    return Transaction.objects.using(wallet._state.db).filter(reference=reference).exists()
+
+
+def set_state(saga, state, error=''):
+    saga.state, saga.error = state, error
+    saga.save(update_fields=['state', 'error', 'updated_at'])
+
+
+def resume_transfers(older_than):
+    """
+    Finish sagas left behind by crashed or failed requests: DEBITED ones are
+    credited (or refunded), PENDING ones that never debited are abandoned.
+    Returns {state: count} of the sagas handled.
+    """
+    from django.utils import timezone
+
+    handled = {}
+    stale = ShardTransfer.objects.filter(
+        state__in=[ShardTransfer.PENDING, ShardTransfer.DEBITED], updated_at__lt=timezone.now() - older_than,
+    ).order_by('pk')
+    for saga in stale.iterator():
+        if saga.state == ShardTransfer.PENDING:
+            sender = Wallet.objects.get_by_account(saga.sender_account)
+            if step_applied(sender, f'saga-{saga.pk}-debit'):
+                set_state(saga, ShardTransfer.DEBITED)
+            else:
+                set_state(saga, ShardTransfer.FAILED, "Abandoned before the debit")
+                handled[saga.state] = handled.get(saga.state, 0) + 1
+                continue
+        try:
+            run_saga(saga)
+        except (TransferFailed, TransferPending):
+            pass
+        handled[saga.state] = handled.get(saga.state, 0) + 1
+    return handled
@@ -0,0 +1,145 @@
+"""
+Structured JSON logging that keeps I/O off the request thread.
+
+Records are rendered to one JSON line on the calling thread (cheap) and put
+on an in-memory queue. A QueueListener thread writes them to stdout, so a
+slow or blocked stdout never stalls a worker and lines from concurrent
+requests never interleave.
+
+Every record carries the id of the request that logged it. The id comes
+from an incoming X-Request-ID header, or is generated, and is echoed back
+(see accounts.middleware.RequestIdMiddleware).
+
+High-frequency events are logged with `extra={'sample': True}` and kept for
+OWO_LOG_SAMPLE_RATE of requests. The decision is made once per request, so
+a kept request keeps all of its sampled events. Records without the flag and
+anything at WARNING or above are always kept.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+request_id = contextvars.ContextVar('owo_request_id', default='-')
+request_sampled = contextvars.ContextVar('owo_request_sampled', default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'sample'}
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        rid = request_id.get()
+        if rid == '-':
+            # django.request logs the response after the middleware has returned
+            rid = getattr(getattr(record, 'request', None), 'request_id', '-')
+        record.request_id = rid
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate=None):
+        super().__init__()
+        if rate is None:
+            from django.conf import settings
+            rate = getattr(settings, 'OWO_LOG_SAMPLE_RATE', 0.01)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or record.levelno >= logging.WARNING:
+            return True
+        sampled = request_sampled.get()
+        if sampled is None:
+            # Outside a request (commands, worker threads): decide per record
+            return random.random() < self.rate
+        return sampled
+
+
+class JSONFormatter(logging.Formatter):
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that owns its QueueListener and stdout handler. Formatting
+    and filters run on the caller's thread (so the request id context var is
+    visible); writing happens on the listener thread.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.stream = stream
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Started lazily, and again in forked children (gunicorn --preload),
+        # where the parent's listener thread does not exist
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked: the inherited queue may hold the parent's records and locks
+                self.queue = queue.Queue(self.queue.maxsize)
+            target = logging.StreamHandler(self.stream or sys.stdout)
+            target.setFormatter(logging.Formatter('%(message)s'))
+            self._listener = logging.handlers.QueueListener(self.queue, target)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._stop)
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        # super() stores the JSON line in msg; drop the rest so the listener
+        # side does no work beyond writing it
+        record.exc_info = record.exc_text = record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; count and move on
+            self.dropped += 1
+
+    def _stop(self):
+        # Flushes whatever is still queued
+        if self._listener and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+    def close(self):
+        self._stop()
+        super().close()
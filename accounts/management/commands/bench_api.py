@@ -0,0 +1,137 @@
+import json
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from accounts.benchmark import (
+    DEFAULT_MIX, LoadDriver, compare, non_bench_databases, parse_mix, seed_bench_users, use_file_test_databases,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a weighted mix of login, transfer, bill, transactions and statement calls "
+        "and report p50/p95/p99 latency and throughput per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Benchmark a running server (e.g. http://127.0.0.1:8000/api/auth/). "
+                                          "By default the app is booted in process against a fresh test database.")
+        parser.add_argument('--seed-users', action='store_true',
+                            help="With --url: create the bench users (with 100M balances) in the configured "
+                                 "database first; refused unless its name contains 'test' or 'bench'")
+        parser.add_argument('--i-know-this-is-not-prod', action='store_true',
+                            help="Allow --seed-users against a database whose name doesn't say test or bench")
+        parser.add_argument('--users', type=int, default=20, help="Distinct bench accounts")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent virtual users")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+        parser.add_argument('--requests', type=int, default=None, help="Stop after this many requests")
+        parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                            help="Scenario weights, e.g. transfer=20,transactions=80 (default: %s)"
+                                 % ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the request sequence")
+        parser.add_argument('--save-baseline', metavar='PATH', help="Write the results as a JSON baseline")
+        parser.add_argument('--baseline', metavar='PATH', help="Fail if results regress against this baseline")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed regression as a fraction (default 0.2 = 20%%)")
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        if options['url']:
+            if options['seed_users'] and not options['i_know_this_is_not_prod']:
+                unsafe = non_bench_databases()
+                if unsafe:
+                    names = ', '.join(f"{alias} ({settings.DATABASES[alias]['NAME']})" for alias in unsafe)
+                    raise CommandError(
+                        f"Refusing to seed funded bench users into {names}: the name doesn't contain "
+                        f"'test' or 'bench'. Point DATABASE_URL at a bench database, or pass "
+                        f"--i-know-this-is-not-prod if it really isn't production."
+                    )
+            users = seed_bench_users(options['users']) if options['seed_users'] else self.existing_users(options['users'])
+            report = self.drive(options['url'], users, options)
+        else:
+            report = self.run_in_process(options)
+
+        self.print_report(report)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if baseline is not None:
+            problems = compare(report, baseline, options['threshold'], options['max_error_rate'])
+            if problems:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(problems))
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%} of the baseline"))
+
+    def drive(self, url, users, options):
+        if not users:
+            raise CommandError("No bench users found; pass --seed-users")
+        driver = LoadDriver(
+            url, users, mix=options['mix'], concurrency=options['concurrency'],
+            duration=options['duration'], max_requests=options['requests'], seed=options['seed'],
+        )
+        return driver.run()
+
+    def existing_users(self, count):
+        from accounts.benchmark import BENCH_EMAIL
+        from accounts.models import Wallet
+
+        emails = [BENCH_EMAIL.format(i) for i in range(count)]
+        return list(Wallet.objects.filter(user__email__in=emails).values_list('user__email', 'account_number'))
+
+    def run_in_process(self, options):
+        """Fresh test database + threaded live server, torn down afterwards"""
+        use_file_test_databases(tempfile.mkdtemp(prefix='owo-bench-'), 'bench')
+
+        # Failures are counted in the report; don't log a traceback for each
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Throttles would dominate a load test; DEBUG would record every query
+            rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+            with override_settings(DEBUG=False, REST_FRAMEWORK=rest_framework):
+                users = seed_bench_users(options['users'])
+                server = LiveServerThread('127.0.0.1', lambda handler: handler)
+                server.daemon = True
+                server.start()
+                server.is_ready.wait()
+                if server.error:
+                    raise server.error
+                try:
+                    self.stdout.write(f"Serving on 127.0.0.1:{server.port}, {len(users)} bench users")
+                    return self.drive(f'http://127.0.0.1:{server.port}/api/auth/', users, options)
+                finally:
+                    server.terminate()
+        finally:
+            request_logger.setLevel(previous_level)
+            teardown_databases(old_config, verbosity=0)
+
+    def print_report(self, report):
+        meta = report['meta']
+        self.stdout.write(
+            f"\n{meta['concurrency']} virtual users, {meta['elapsed_s']}s, {meta['total_rps']} req/s overall\n"
+        )
+        self.stdout.write(
+            f"{'endpoint':<14} {'count':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}"
+        )
+        for scenario, row in report['endpoints'].items():
+            self.stdout.write(
+                f"{scenario:<14} {row['count']:>7} {row['errors']:>6} {row['p50_ms']:>9.2f} "
+                f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['rps']:>8.2f}"
+            )
+        for scenario, example in report.get('error_examples', {}).items():
+            self.stdout.write(self.style.WARNING(f"{scenario} failed with e.g. {example}"))
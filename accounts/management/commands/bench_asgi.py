@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+from accounts.benchmark import ASYNC_MIX, LoadDriver, parse_mix, seed_bench_users, use_file_test_databases
+
+ASGI_WORKER = 'uvicorn.workers.UvicornWorker'
+
+# Settings for the servers under test: the bench databases, no throttles, no DEBUG
+BENCH_SETTINGS = '''\
+import json
+import os
+
+from {base} import *
+
+DATABASES = json.loads(os.environ['OWO_BENCH_DATABASES'])
+if OWO_ASYNC_VIEWS:
+    for _db in DATABASES.values():
+        _db['CONN_MAX_AGE'] = 0
+DEBUG = False
+REST_FRAMEWORK = {{**REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {{}}}}
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the app from one sync (WSGI) gunicorn worker, then from one uvicorn (ASGI) worker with "
+        "OWO_ASYNC_VIEWS on, drive the same load at both and compare concurrent requests per worker"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64, help="Concurrent virtual users")
+        parser.add_argument('--duration', type=float, default=15, help="Seconds per server")
+        parser.add_argument('--users', type=int, default=20, help="Distinct bench accounts")
+        parser.add_argument('--mix', type=parse_mix, default=ASYNC_MIX,
+                            help="Scenario weights (default: %s)" % ','.join(f'{k}={v}' for k, v in ASYNC_MIX.items()))
+        parser.add_argument('--bank-delay', type=float, default=0.2,
+                            help="OWO_BANK_VERIFY_DELAY for the servers (seconds)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the request sequence")
+        parser.add_argument('--report', metavar='PATH', help="Write both reports as JSON")
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp(prefix='owo-bench-asgi-')
+        use_file_test_databases(tmpdir, 'asgi')
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            users = seed_bench_users(options['users'], transactions_per_user=50)
+            databases = {alias: connections[alias].settings_dict for alias in connections}
+            env = self.server_env(tmpdir, databases, options)
+            # Close ours, so sqlite's file isn't locked by a connection we no longer use
+            connections.close_all()
+
+            reports = {}
+            for label, app, worker_class, extra_env in (
+                ('wsgi', 'config.wsgi:application', 'sync', {'OWO_ASYNC_VIEWS': '0'}),
+                ('asgi', 'config.asgi:application', ASGI_WORKER, {'OWO_ASYNC_VIEWS': '1'}),
+            ):
+                with self.serve(app, worker_class, {**env, **extra_env}) as url:
+                    self.stdout.write(f"{label}: one {worker_class} worker on {url}")
+                    reports[label] = self.drive(url, users, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.print_reports(reports)
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(reports, f, indent=2, sort_keys=True)
+
+    def server_env(self, tmpdir, databases, options):
+        base = os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')
+        with open(os.path.join(tmpdir, 'owo_bench_settings.py'), 'w') as f:
+            f.write(BENCH_SETTINGS.format(base=base))
+        return {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join(filter(None, [tmpdir, str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+            'DJANGO_SETTINGS_MODULE': 'owo_bench_settings',
+            'OWO_BENCH_DATABASES': json.dumps(databases, default=str),
+            'OWO_BANK_VERIFY_DELAY': str(options['bank_delay']),
+            # Keep the servers' request logging out of the report
+            'OWO_LOG_LEVEL': 'ERROR',
+        }
+
+    @contextmanager
+    def serve(self, app, worker_class, env):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', app, '--workers', '1', '--worker-class', worker_class,
+             '--bind', f'127.0.0.1:{port}', '--chdir', str(settings.BASE_DIR), '--log-level', 'warning'],
+            env=env,
+        )
+        try:
+            self.wait_until_up(server, f'http://127.0.0.1:{port}/healthz')
+            yield f'http://127.0.0.1:{port}/api/auth/'
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def wait_until_up(self, server, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server did not answer {url} within {timeout}s")
+
+    def drive(self, url, users, options):
+        # Failures are counted in the report
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        driver = LoadDriver(
+            url, users, mix=options['mix'], concurrency=options['concurrency'],
+            duration=options['duration'], seed=options['seed'],
+        )
+        report = driver.run()
+        # Each bank lookup spends bank_delay inside the worker, so (Little's law)
+        # lookups/s x delay is how many the worker holds open at once on average.
+        # Client latencies can't tell: they include time queued in the backlog.
+        verify = report['endpoints'].get('verify_account')
+        report['meta']['in_flight'] = round(verify['rps'] * options['bank_delay'], 1) if verify else None
+        return report
+
+    def print_reports(self, reports):
+        self.stdout.write(
+            f"\n{'server':<6} {'endpoint':<15} {'count':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8}"
+        )
+        for label, report in reports.items():
+            for scenario, row in report['endpoints'].items():
+                self.stdout.write(
+                    f"{label:<6} {scenario:<15} {row['count']:>7} {row['errors']:>6} "
+                    f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['rps']:>8.2f}"
+                )
+            for scenario, example in report.get('error_examples', {}).items():
+                self.stdout.write(self.style.WARNING(f"{label} {scenario} failed with e.g. {example}"))
+        self.stdout.write('')
+        for label, report in reports.items():
+            meta = report['meta']
+            line = f"{label}: {meta['total_rps']} req/s from {meta['concurrency']} clients"
+            if meta['in_flight'] is not None:
+                line += f", {meta['in_flight']} bank lookups in flight per worker"
+            self.stdout.write(line)
+        wsgi, asgi = reports['wsgi']['meta'], reports['asgi']['meta']
+        if wsgi['total_rps']:
+            self.stdout.write(self.style.SUCCESS(f"ASGI worker: {asgi['total_rps'] / wsgi['total_rps']:.1f}x the throughput"))
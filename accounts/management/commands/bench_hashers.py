@@ -0,0 +1,96 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, check_password, make_password
+from django.core.management.base import BaseCommand
+
+from accounts.pin import check_pin_token, issue_pin_token
+
+
+class Command(BaseCommand):
+    help = "Benchmark Argon2 hash cost against PIN checks per second per worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--threads', type=int, default=4,
+                            help="Concurrent checks, to see how a worker's threads share the CPU")
+        parser.add_argument('--memory', type=int, nargs='+', default=[19456, 47104, 102400],
+                            help="Memory costs to try (KiB)")
+        parser.add_argument('--time', type=int, nargs='+', default=[1, 2, 3],
+                            help="Time costs to try")
+        parser.add_argument('--parallelism', type=int, nargs='+', default=[1])
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        threads = options['threads']
+
+        self.stdout.write(
+            f"{'time':>4} {'memory':>7} {'par':>3} | {'p50 ms':>8} {'p95 ms':>8} | "
+            f"{'checks/s':>9} {'checks/s x' + str(threads):>14}"
+        )
+        for memory_cost in options['memory']:
+            for time_cost in options['time']:
+                for parallelism in options['parallelism']:
+                    hasher = self._hasher(time_cost, memory_cost, parallelism)
+                    encoded = hasher.encode('4826', hasher.salt())
+
+                    samples = []
+                    for _ in range(iterations):
+                        start = time.perf_counter()
+                        hasher.verify('4826', encoded)
+                        samples.append(time.perf_counter() - start)
+                    samples.sort()
+                    p50 = statistics.median(samples)
+                    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+                    # argon2-cffi releases the GIL, so threads show the real
+                    # throughput of one worker process on this box
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=threads) as pool:
+                        list(pool.map(lambda _: hasher.verify('4826', encoded), range(iterations * threads)))
+                    concurrent_rate = (iterations * threads) / (time.perf_counter() - start)
+
+                    current = (
+                        time_cost == settings.ARGON2_TIME_COST
+                        and memory_cost == settings.ARGON2_MEMORY_COST
+                        and parallelism == settings.ARGON2_PARALLELISM
+                    )
+                    self.stdout.write(
+                        f"{time_cost:>4} {memory_cost:>7} {parallelism:>3} | {p50 * 1000:>8.2f} {p95 * 1000:>8.2f} | "
+                        f"{1 / p50:>9.1f} {concurrent_rate:>14.1f}" + ("  <- current" if current else "")
+                    )
+
+        self._bench_step_up(iterations)
+
+    def _hasher(self, time_cost, memory_cost, parallelism):
+        hasher = Argon2PasswordHasher()
+        hasher.time_cost = time_cost
+        hasher.memory_cost = memory_cost
+        hasher.parallelism = parallelism
+        return hasher
+
+    def _bench_step_up(self, iterations):
+        """Compare a full PIN check with validating a step-up token"""
+
+        class _User:
+            pk = 1
+            pin = make_password('4826')
+
+        user = _User()
+        token = issue_pin_token(user)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            check_password('4826', user.pin)
+        pin_ms = (time.perf_counter() - start) * 1000 / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations * 100):
+            check_pin_token(user, token)
+        token_ms = (time.perf_counter() - start) * 1000 / (iterations * 100)
+
+        self.stdout.write("")
+        self.stdout.write(f"PIN check (configured hasher): {pin_ms:.3f} ms")
+        self.stdout.write(f"Step-up token check:           {token_ms:.3f} ms")
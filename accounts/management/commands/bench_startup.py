@@ -0,0 +1,148 @@
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Appended to each config under test: every worker marks when it has loaded the app
+READY_HOOK = '''
+
+def post_worker_init(worker):
+    open({ready_dir!r} + '/' + str(worker.pid), 'w').close()
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with its defaults, then with gunicorn.conf.py (preload_app and warm-up), and compare "
+        "the time until every worker has loaded the app and the memory each worker adds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=3, help="Starts per config; the median time is reported")
+        parser.add_argument('--requests', type=int, default=400,
+                            help="Requests served before memory is read, so workers are past their first requests")
+
+    def handle(self, *args, **options):
+        with open(settings.BASE_DIR / 'gunicorn.conf.py') as f:
+            configs = {'default': '', 'gunicorn.conf.py': f.read()}
+
+        rows = {}
+        tmpdir = tempfile.mkdtemp(prefix='owo-bench-startup-')
+        try:
+            for label, config in configs.items():
+                times = []
+                for i in range(options['repeat']):
+                    ready_dir = os.path.join(tmpdir, f'ready-{len(rows)}-{i}')
+                    os.mkdir(ready_dir)
+                    config_path = os.path.join(tmpdir, f'config-{len(rows)}.py')
+                    with open(config_path, 'w') as f:
+                        f.write(config + READY_HOOK.format(ready_dir=ready_dir))
+                    elapsed, memory = self.start(config_path, ready_dir, options)
+                    times.append(elapsed)
+                rows[label] = {'startup': statistics.median(times), **memory}
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.print_rows(rows, options['workers'])
+
+    def start(self, config_path, ready_dir, options):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+            'OWO_LOG_LEVEL': 'ERROR',
+        }
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '--config', config_path,
+             '--workers', str(options['workers']), '--bind', f'127.0.0.1:{port}',
+             '--chdir', str(settings.BASE_DIR), '--log-level', 'warning'],
+            env=env,
+        )
+        try:
+            self.wait_for_workers(server, ready_dir, options['workers'])
+            elapsed = time.perf_counter() - started
+            # Not /healthz or /api/auth/health/: ProbeMiddleware answers those
+            # before the URLconf (and so the views) is ever imported
+            self.drive(f'http://127.0.0.1:{port}/api/auth/banks/', options['requests'])
+            return elapsed, self.memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def wait_for_workers(self, server, ready_dir, workers, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn exited with {server.returncode}")
+            if len(os.listdir(ready_dir)) >= workers:
+                return
+            time.sleep(0.01)
+        raise CommandError(f"Workers did not start within {timeout}s")
+
+    def drive(self, url, requests):
+        def get(_):
+            # Anonymous, so a 401 from DRF: URL resolution, middleware, authentication, rendering
+            try:
+                urllib.request.urlopen(url, timeout=10).close()
+            except urllib.error.HTTPError as e:
+                if e.code != 401:
+                    raise CommandError(f"GET {url}: {e}")
+                e.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(get, range(requests)))
+
+    def memory(self, master):
+        with open(f'/proc/{master}/task/{master}/children') as f:
+            workers = [int(pid) for pid in f.read().split()]
+        per_worker = [self.smaps(pid) for pid in workers]
+        return {
+            'master_rss': self.smaps(master)['Rss'],
+            # Rss counts pages shared with the master in full; Pss splits them
+            # between the processes sharing them; private pages are what
+            # each worker really adds
+            **{f'worker_{key.lower()}': statistics.mean(w[key] for w in per_worker) for key in ('Rss', 'Pss', 'Private')},
+            'total_pss': self.smaps(master)['Pss'] + sum(w['Pss'] for w in per_worker),
+        }
+
+    def smaps(self, pid):
+        # kB, from the kernel's per-process summary of /proc/<pid>/smaps
+        values = {}
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if rest.strip().endswith('kB'):
+                    values[key] = int(rest.split()[0])
+        values['Private'] = values['Private_Clean'] + values['Private_Dirty']
+        return values
+
+    def print_rows(self, rows, workers):
+        mb = 1024
+        self.stdout.write(
+            f"{'config':<17} {'startup s':>9} {'master RSS':>10} {'worker RSS':>10} {'worker PSS':>10} "
+            f"{'worker own':>10} {f'total PSS ({workers}w)':>16}"
+        )
+        for label, row in rows.items():
+            self.stdout.write(
+                f"{label:<17} {row['startup']:>9.2f} {row['master_rss'] / mb:>8.1f}MB {row['worker_rss'] / mb:>8.1f}MB "
+                f"{row['worker_pss'] / mb:>8.1f}MB {row['worker_private'] / mb:>8.1f}MB {row['total_pss'] / mb:>14.1f}MB"
+            )
+        before, after = rows['default'], rows['gunicorn.conf.py']
+        self.stdout.write(self.style.SUCCESS(
+            f"Per worker: {(before['worker_private'] - after['worker_private']) / mb:.1f}MB less private memory; "
+            f"all {workers} workers up {before['startup'] - after['startup']:.2f}s sooner"
+        ))
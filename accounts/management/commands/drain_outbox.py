@@ -0,0 +1,50 @@
+import logging
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.outbox import BATCH_SIZE, drain
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued OutboundEmail rows over a reused SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the outbox is empty")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls with --loop")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                try:
+                    processed = drain(connection, batch_size=options['batch_size'])
+                except Exception:
+                    if not options['loop']:
+                        raise
+                    # Database or mail server trouble; try again next poll
+                    logger.exception("Outbox drain failed")
+                    connection.close()
+                    close_old_connections()
+                    time.sleep(options['interval'])
+                    continue
+                total += processed
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                # Idle: don't hold the SMTP session open between polls
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} queued emails"))
@@ -0,0 +1,204 @@
+import csv
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.account_numbers import account_numbers_for
+from accounts.models import User, Wallet
+from accounts.serializers import NIN_PATTERN, NG_PHONE_PATTERN
+from accounts.sharding import bulk_create_wallets, shards
+from accounts.utils import phone_hash
+from accounts.workers import process_pool
+
+REQUIRED_COLUMNS = ['email', 'phone_number', 'password', 'pin', 'first_name', 'last_name', 'nin', 'date_of_birth']
+# What UserSerializer.validate enforces
+MIN_AGE = 15
+
+
+@contextmanager
+def atomic_everywhere():
+    """One transaction on default and on every wallet shard, so users and their wallets commit together"""
+    with ExitStack() as stack:
+        for alias in dict.fromkeys([DEFAULT_DB_ALIAS, *shards()]):
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def hash_credentials(row):
+    """Runs in a pool worker: (password, pin) -> (password hash, pin hash)"""
+    password, pin = row
+    return make_password(password), make_password(pin)
+
+
+class Command(BaseCommand):
+    help = "Bulk onboard users (and their wallets) from a CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="CSV with columns: " + ', '.join(REQUIRED_COLUMNS) + " [, address]")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help="Hashing processes (default: CPU count)")
+        parser.add_argument('--errors', help="Write per-row errors to this CSV instead of stderr")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; nothing is hashed or written")
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.dry_run = options['dry_run']
+        self.seen = {'email': set(), 'phone_number': set(), 'nin': set()}
+        self.created = 0
+        self.error_count = 0
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        self.error_writer = csv.writer(error_file or sys.stderr)
+        self.error_writer.writerow(['line', 'field', 'error'])
+
+        start = timezone.now()
+        try:
+            with open(options['file'], newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+                if missing:
+                    raise CommandError(f"Missing columns: {', '.join(missing)}")
+
+                with process_pool(options['workers']) as self.pool:
+                    chunk = []
+                    # Line 1 is the header
+                    for line, row in enumerate(reader, start=2):
+                        cleaned = self.validate_row(line, row)
+                        if cleaned:
+                            chunk.append((line, cleaned))
+                        if len(chunk) >= self.chunk_size:
+                            self.import_chunk(chunk)
+                            chunk = []
+                    if chunk:
+                        self.import_chunk(chunk)
+        finally:
+            if error_file:
+                error_file.close()
+
+        elapsed = (timezone.now() - start).total_seconds()
+        rate = self.created / elapsed * 60 if elapsed else 0
+        verb = "Validated" if self.dry_run else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.created} users in {elapsed:.1f}s ({rate:,.0f}/min); {self.error_count} rows rejected"
+        ))
+
+    def reject(self, line, field, message):
+        self.error_count += 1
+        self.error_writer.writerow([line, field, message])
+
+    def validate_row(self, line, row):
+        """UserSerializer's rules and the password validators, without its per-row uniqueness queries"""
+        row = {k: (v or '').strip() for k, v in row.items() if k}
+        for column in REQUIRED_COLUMNS:
+            if not row.get(column):
+                return self.reject(line, column, "This field is required")
+
+        row['email'] = User.objects.normalize_email(row['email'])
+        try:
+            # AUTH_PASSWORD_VALIDATORS, as for a password change
+            validate_password(row['password'], User(
+                email=row['email'], first_name=row['first_name'], last_name=row['last_name'],
+            ))
+        except ValidationError as e:
+            return self.reject(line, 'password', ' '.join(e.messages))
+        if len(row['pin']) != 4 or not row['pin'].isdigit():
+            return self.reject(line, 'pin', "PIN must be exactly 4 digits")
+        if not re.match(NIN_PATTERN, row['nin']):
+            return self.reject(line, 'nin', "NIN must be 11 digits")
+        if not re.match(NG_PHONE_PATTERN, row['phone_number']):
+            return self.reject(line, 'phone_number', "Please enter a valid Nigerian phone number")
+        try:
+            row['date_of_birth'] = date.fromisoformat(row['date_of_birth'])
+        except ValueError:
+            return self.reject(line, 'date_of_birth', "Date must be YYYY-MM-DD")
+        if (timezone.now().date() - row['date_of_birth']).days / 365 < MIN_AGE:
+            return self.reject(line, 'date_of_birth', f"You must be at least {MIN_AGE} years old")
+
+        for field, seen in self.seen.items():
+            if row[field] in seen:
+                return self.reject(line, field, "Duplicate value in file")
+        for field, seen in self.seen.items():
+            seen.add(row[field])
+        return row
+
+    def existing(self, chunk):
+        """One IN query per unique column for the whole chunk"""
+        return {
+            field: set(User.objects.filter(**{f'{field}__in': [row[field] for _, row in chunk]}).values_list(field, flat=True))
+            for field in self.seen
+        }
+
+    def import_chunk(self, chunk):
+        taken = self.existing(chunk)
+        lines, rows = [], []
+        for line, row in chunk:
+            for field, values in taken.items():
+                if row[field] in values:
+                    self.reject(line, field, "Already registered")
+                    break
+            else:
+                lines.append(line)
+                rows.append(row)
+
+        if self.dry_run or not rows:
+            self.created += len(rows) if self.dry_run else 0
+            return
+
+        hashes = self.pool.map(hash_credentials, [(r['password'], r['pin']) for r in rows], chunksize=32)
+        account_numbers = account_numbers_for([row['phone_number'] for row in rows])
+        users = [
+            User(
+                email=row['email'],
+                phone_number=row['phone_number'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                nin=row['nin'],
+                date_of_birth=row['date_of_birth'],
+                address=row.get('address', ''),
+                password=password_hash,
+                pin=pin_hash,
+                phone_hash=phone_hash(row['phone_number']),  # bulk_create skips User.save
+                wallet_account_number=account_number,
+            )
+            for row, (password_hash, pin_hash), account_number in zip(rows, hashes, account_numbers)
+        ]
+
+        try:
+            with atomic_everywhere():
+                # Postgres and SQLite >= 3.35 return the new primary keys
+                User.objects.bulk_create(users, batch_size=self.chunk_size)
+                bulk_create_wallets(
+                    [Wallet(user=user, account_number=user.wallet_account_number) for user in users],
+                    batch_size=self.chunk_size,
+                )
+        except IntegrityError:
+            # Someone signed up with one of these since existing() looked;
+            # find out which rows by inserting the chunk one row at a time
+            self.import_rows(lines, rows, users)
+        else:
+            self.created += len(users)
+        self.stdout.write(f"  {self.created} users imported...")
+
+    def import_rows(self, lines, rows, users):
+        for line, row, user in zip(lines, rows, users):
+            # The rolled back bulk insert may have set a primary key already
+            user.pk = None
+            user._state.adding = True
+            try:
+                with atomic_everywhere():
+                    User.objects.bulk_create([user])
+                    bulk_create_wallets([Wallet(user=user, account_number=user.wallet_account_number)])
+            except IntegrityError as e:
+                taken = self.existing([(line, row)])
+                field = next((f for f, values in taken.items() if values), '')
+                self.reject(line, field, "Already registered" if field else str(e))
+            else:
+                self.created += 1
@@ -0,0 +1,64 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.nin import STUB_IDENTITY
+
+
+class Command(BaseCommand):
+    help = "Run a local fake NIN vendor API for accounts.nin.HTTPNINProvider"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.5, help="Seconds to sleep per lookup, like the real vendor")
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        stdout = self.stdout
+        lookups = {'count': 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    nin = json.loads(self.rfile.read(length)).get('nin', '')
+                except ValueError:
+                    nin = ''
+                time.sleep(latency)
+                lookups['count'] += 1
+
+                # NINs starting with 0 don't exist, so the not-found path can be exercised
+                if len(nin) != 11 or not nin.isdigit() or nin.startswith('0'):
+                    self._reply(404, {'status': 'not_found'})
+                    return
+                self._reply(200, {
+                    'status': 'success',
+                    'data': {
+                        'nin': nin,
+                        **STUB_IDENTITY,
+                        'verification_date': timezone.now().isoformat(),
+                    },
+                })
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                stdout.write(f"[lookup #{lookups['count']}] " + format % args)
+
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(f"NIN stub vendor listening on http://127.0.0.1:{options['port']}/v1/nin/verify")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
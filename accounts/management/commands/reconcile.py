@@ -0,0 +1,93 @@
+import csv
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, wait
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Wallet
+from accounts.reconcile import Checkpoint, reconcile_range
+from accounts.sharding import shards
+from accounts.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = "Check that every wallet balance equals the sum of its transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help="Wallet ids per range")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Processes (default: CPU count; 0 checks in this process)")
+        parser.add_argument('--checkpoint', help="Progress file; an existing one is resumed")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+        parser.add_argument('--report', help="Write mismatches to this CSV instead of stdout")
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        if path and os.path.exists(path) and not options['restart']:
+            checkpoint = Checkpoint.load(path)
+            self.stdout.write(f"Resuming: {len(checkpoint.done)}/{checkpoint.total_ranges} ranges already checked")
+        else:
+            max_ids = {
+                alias: Wallet.objects.using(alias).aggregate(max_id=Max('pk'))['max_id'] or 0 for alias in shards()
+            }
+            checkpoint = Checkpoint(path, options['chunk_size'], max_ids)
+
+        start = timezone.now()
+        try:
+            if options['workers'] == 0:
+                for alias, lo, hi in checkpoint.ranges():
+                    self.finish(checkpoint, *reconcile_range(alias, lo, hi))
+            else:
+                self.run_pool(checkpoint, options['workers'])
+        except KeyboardInterrupt:
+            checkpoint.save()
+            raise CommandError(f"Interrupted; rerun with --checkpoint {path} to resume" if path else "Interrupted")
+        elapsed = (timezone.now() - start).total_seconds()
+
+        self.write_report(checkpoint.mismatches, options['report'])
+        summary = f"Checked {checkpoint.checked:,} wallets in {elapsed:.1f}s"
+        if checkpoint.mismatches:
+            raise CommandError(f"{summary}: {len(checkpoint.mismatches)} balances don't match their transactions")
+        self.stdout.write(self.style.SUCCESS(f"{summary}: all balances match"))
+
+    def run_pool(self, checkpoint, workers):
+        ranges = checkpoint.ranges()
+        with process_pool(workers) as pool:
+            # A bounded window of ranges in flight, so millions of wallets don't
+            # mean millions of queued futures
+            window = (workers or os.cpu_count()) * 4
+            pending = set()
+            while True:
+                for alias, lo, hi in ranges:
+                    pending.add(pool.submit(reconcile_range, alias, lo, hi))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.finish(checkpoint, *future.result())
+
+    def finish(self, checkpoint, alias, start, checked, mismatches):
+        checkpoint.record(alias, start, checked, mismatches)
+        checkpoint.save()
+        done = len(checkpoint.done)
+        if done % 100 == 0 or done == checkpoint.total_ranges:
+            self.stdout.write(f"  {done}/{checkpoint.total_ranges} ranges, {checkpoint.checked:,} wallets")
+
+    def write_report(self, mismatches, path):
+        report_file = open(path, 'w', newline='') if path else None
+        try:
+            if not mismatches and not report_file:
+                return
+            writer = csv.writer(report_file or sys.stdout)
+            writer.writerow(['shard', 'wallet_id', 'account_number', 'balance', 'transactions_total', 'difference'])
+            for alias, pk, account_number, balance, total in sorted(mismatches):
+                writer.writerow([alias, pk, account_number, balance, total, Decimal(balance) - Decimal(total)])
+        finally:
+            if report_file:
+                report_file.close()
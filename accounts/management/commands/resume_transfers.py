@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts import ledger
+
+
+class Command(BaseCommand):
+    help = "Finish cross-shard transfers left PENDING or DEBITED by crashed or failed requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=60.0,
+                            help="Only sagas untouched for this many seconds (leave in-flight requests alone)")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting")
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        older_than = timedelta(seconds=options['older_than'])
+        totals = {}
+        try:
+            while True:
+                for state, count in ledger.resume_transfers(older_than).items():
+                    totals[state] = totals.get(state, 0) + count
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        summary = ', '.join(f"{count} {state.lower()}" for state, count in sorted(totals.items())) or "nothing to do"
+        self.stdout.write(self.style.SUCCESS(f"Resumed transfers: {summary}"))
@@ -0,0 +1,321 @@
+import bisect
+import csv
+import io
+import itertools
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from accounts.banks import BANKS, OWO_BANK_CODE
+from accounts.benchmark import non_bench_databases
+from accounts.beneficiaries import use_weight
+from accounts.models import Beneficiary, Statement, Transaction, User, Wallet
+from accounts.sharding import bulk_create_wallets, shards
+from accounts.utils import phone_hash
+
+EMAIL = 'load{}@load.owo.test'
+PASSWORD = 'load-password-1'
+PIN = '4826'
+MAX_USERS = 10_000_000  # phone numbers 0906 0000000 - 0906 9999999
+
+FIRST_NAMES = (
+    'Adaeze', 'Chinedu', 'Emeka', 'Funmilayo', 'Ibrahim', 'Ifeoma', 'Kelechi', 'Ngozi', 'Oluwaseun', 'Tunde',
+    'Yetunde', 'Zainab', 'Abubakar', 'Chiamaka', 'Damilola', 'Folake', 'Halima', 'Obinna', 'Sade', 'Uche',
+)
+LAST_NAMES = (
+    'Adeyemi', 'Okafor', 'Bello', 'Eze', 'Ogunleye', 'Nwosu', 'Abdullahi', 'Okonkwo', 'Balogun', 'Musa',
+    'Onyekachi', 'Adebayo', 'Ibekwe', 'Lawal', 'Obi', 'Salami', 'Umeh', 'Yusuf', 'Akande', 'Chukwu',
+)
+EXTERNAL_BANKS = [code for code, _ in BANKS if code != OWO_BANK_CODE]
+BANK_NAME = dict(BANKS)
+
+TRANSACTION_COLUMNS = ('wallet_id', 'amount', 'type', 'description', 'timestamp', 'counterparty', 'account_number')
+
+
+def phone_for(index):
+    return f'0906{index:07d}'
+
+
+def name_for(index):
+    return FIRST_NAMES[index % len(FIRST_NAMES)], LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+
+
+class ZipfSampler:
+    """Draws user indexes so that a few accounts receive most of the transfers"""
+
+    def __init__(self, rng, population, exponent):
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, population + 1)))
+        self.total = self.cumulative[-1]
+        # Popularity rank -> user index, so the hot accounts are spread out
+        self.users = list(range(population))
+        rng.shuffle(self.users)
+
+    def __call__(self):
+        rank = bisect.bisect_left(self.cumulative, self.rng.random() * self.total)
+        return self.users[min(rank, len(self.users) - 1)]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the timestamps we generate instead of stamping now()"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Generate production-scale synthetic users, wallets, beneficiaries, transactions and statements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--txns-per-user', type=int, default=100)
+        parser.add_argument('--beneficiaries-per-user', type=int, default=8)
+        parser.add_argument('--statements-per-user', type=int, default=3, help="Monthly statements, most recent first")
+        parser.add_argument('--days', type=int, default=365, help="History length")
+        parser.add_argument('--end', type=datetime.fromisoformat, default=None,
+                            help="Newest timestamp (default: today 00:00 UTC); fix it for byte-identical reruns")
+        parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent for transfer counterparties")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-users', type=int, default=2000, help="Users generated per batch")
+        parser.add_argument('--batch-size', type=int, default=10000, help="Rows per bulk_create / COPY")
+        parser.add_argument('--offset', type=int, default=None,
+                            help="First user index (default: after the load users already in the database)")
+        parser.add_argument('--no-copy', action='store_true', help="Use bulk_create for transactions on Postgres too")
+        parser.add_argument('--i-know-this-is-not-prod', action='store_true',
+                            help="Allow seeding a database whose name doesn't contain 'test' or 'bench'")
+
+    def handle(self, *args, **options):
+        if not options['i_know_this_is_not_prod']:
+            unsafe = non_bench_databases()
+            if unsafe:
+                names = ', '.join(f"{alias} ({connections[alias].settings_dict['NAME']})" for alias in unsafe)
+                raise CommandError(
+                    f"Refusing to seed load users (all with password {PASSWORD!r}) into {names}: the name doesn't "
+                    f"contain 'test' or 'bench'. Point DATABASE_URL at a load-test database, or pass "
+                    f"--i-know-this-is-not-prod if it really isn't production."
+                )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.use_copy = {
+            alias: connections[alias].vendor == 'postgresql' and not options['no_copy'] for alias in shards()
+        }
+        self.days = options['days']
+        end = options['end'] or datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end = end if end.tzinfo else end.replace(tzinfo=dt_timezone.utc)
+
+        offset = options['offset']
+        if offset is None:
+            offset = User.objects.filter(email__endswith='@load.owo.test').count()
+        count = options['users']
+        if offset + count > MAX_USERS:
+            raise CommandError(f"At most {MAX_USERS:,} load users")
+        self.offset, self.count = offset, count
+
+        # Counterparties are drawn from the whole generated population
+        self.pick_counterparty = ZipfSampler(self.rng, count, options['zipf'])
+        # One hash for everyone: hashing millions of passwords is not what we're load testing
+        self.password_hash = make_password(PASSWORD)
+        self.pin_hash = make_password(PIN)
+
+        self.totals = {'users': 0, 'transactions': 0, 'beneficiaries': 0, 'statements': 0}
+        start = time.perf_counter()
+        for chunk_start in range(0, count, options['chunk_users']):
+            indexes = range(chunk_start, min(chunk_start + options['chunk_users'], count))
+            # Wallets and transactions go to their shards; a chunk commits on all of them or none
+            with ExitStack() as stack:
+                for alias in shards():
+                    stack.enter_context(transaction.atomic(using=alias))
+                self.load_chunk(indexes, options)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  {self.totals['users']:,} users, {self.totals['transactions']:,} transactions "
+                f"({self.totals['transactions'] / elapsed:,.0f} txn/s)"
+            )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {self.totals['users']:,} users, {self.totals['transactions']:,} transactions, "
+            f"{self.totals['beneficiaries']:,} beneficiaries and {self.totals['statements']:,} statements "
+            f"in {elapsed:.1f}s (via {'COPY' if all(self.use_copy.values()) else 'bulk_create'})"
+        ))
+
+    def user_fields(self, index):
+        """Deterministic identity of generated user `index` (relative to the offset)"""
+        n = self.offset + index
+        first_name, last_name = name_for(n)
+        phone = phone_for(n)
+        return n, first_name, last_name, phone, phone[1:]
+
+    def timestamp(self):
+        # Skewed towards the present: u**2 puts half the activity in the last quarter
+        age = self.days * self.rng.random() ** 2
+        return self.end - timedelta(days=age)
+
+    def load_chunk(self, indexes, options):
+        users = []
+        for index in indexes:
+            n, first_name, last_name, phone, _ = self.user_fields(index)
+            users.append(User(
+                email=EMAIL.format(n), phone_number=phone, phone_hash=phone_hash(phone),
+                first_name=first_name, last_name=last_name, nin=f'6{n:010d}',
+                date_of_birth=datetime(1960 + n % 45, 1 + n % 12, 1 + n % 28).date(),
+                password=self.password_hash, pin=self.pin_hash, wallet_account_number=phone[1:],
+                date_joined=self.end - timedelta(days=self.days + self.rng.random() * 30),
+            ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        wallets = bulk_create_wallets(
+            [Wallet(user=user, account_number=user.wallet_account_number) for user in users],
+            batch_size=self.batch_size,
+        )
+
+        beneficiaries, statements = [], []
+        # Rows stream out one user at a time; each shard's are written in batches
+        pending = defaultdict(list)
+        for alias, row in self.transaction_rows(indexes, wallets, options, beneficiaries, statements):
+            batch = pending[alias]
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.write_transactions(alias, batch)
+                pending[alias] = []
+        for alias, batch in pending.items():
+            if batch:
+                self.write_transactions(alias, batch)
+
+        by_shard = defaultdict(list)
+        for wallet in wallets:
+            by_shard[wallet._state.db].append(wallet)
+        for alias, group in by_shard.items():
+            Wallet.objects.using(alias).bulk_update(group, ['balance'], batch_size=self.batch_size)
+        with explicit_timestamps(*(Beneficiary._meta.get_field(f) for f in ('created_at', 'last_used'))):
+            Beneficiary.objects.bulk_create(beneficiaries, batch_size=self.batch_size)
+        with explicit_timestamps(Statement._meta.get_field('generated_at')):
+            Statement.objects.bulk_create(statements, batch_size=self.batch_size)
+
+        self.totals['users'] += len(users)
+        self.totals['beneficiaries'] += len(beneficiaries)
+        self.totals['statements'] += len(statements)
+
+    def transaction_rows(self, indexes, wallets, options, beneficiaries, statements):
+        """
+        Yield (shard alias, transaction tuple in TRANSACTION_COLUMNS order),
+        one user at a time. As a side effect, set each wallet's balance to the sum of its
+        rows and collect the user's beneficiaries and monthly statements.
+        """
+        rng = self.rng
+        per_user = options['txns_per_user']
+        for index, wallet in zip(indexes, wallets):
+            _, first_name, last_name, _, account_number = self.user_fields(index)
+            own_name = f'{first_name} {last_name}'
+            months = {}  # (year, month) -> [count, income, expense]
+            used = {}  # (account number, bank code) -> (name, uses, last used)
+
+            rows = []
+            outflow = Decimal('0.00')
+            for _ in range(max(per_user - 1, 0)):
+                at = self.timestamp()
+                kind = rng.random()
+                amount = Decimal(f'{rng.lognormvariate(8, 1.2):.2f}')  # median ~N3,000
+                if kind < 0.45:
+                    other = self.pick_counterparty()
+                    if other == index:
+                        other = (other + 1) % self.count
+                    _, o_first, o_last, _, o_account = self.user_fields(other)
+                    o_name = f'{o_first} {o_last}'
+                    if rng.random() < 0.8:
+                        bank_code = OWO_BANK_CODE
+                    else:
+                        # Same popular people, banking elsewhere
+                        bank_code = EXTERNAL_BANKS[other % len(EXTERNAL_BANKS)]
+                    row = (wallet.pk, -amount, 'TRANSFER', f'Transfer to {o_name}', at, o_name, o_account)
+                    name, uses, last = used.get((o_account, bank_code), (o_name, 0, at))
+                    used[(o_account, bank_code)] = (name, uses + 1, max(last, at))
+                elif kind < 0.70:
+                    other = rng.randrange(self.count)
+                    _, o_first, o_last, _, o_account = self.user_fields(other)
+                    o_name = f'{o_first} {o_last}'
+                    row = (wallet.pk, amount, 'TRANSFER', f'Transfer from {o_name}', at, o_name, o_account)
+                elif kind < 0.95:
+                    bill = 'AIRTIME' if rng.random() < 0.6 else 'DATA'
+                    amount = Decimal(rng.choice((100, 200, 500, 1000, 2000, 5000)))
+                    row = (wallet.pk, -amount, bill, f'{bill.capitalize()} purchase for 0803{rng.randrange(10**7):07d}', at, None, None)
+                else:
+                    row = (wallet.pk, amount * 5, 'DEPOSIT', 'Wallet funding', at, None, None)
+                if row[1] < 0:
+                    outflow -= row[1]
+                rows.append(row)
+
+            # Opening deposit, before everything else, big enough that the
+            # balance never goes negative
+            opening_at = self.end - timedelta(days=self.days + 1)
+            opening = (outflow + Decimal(f'{rng.lognormvariate(9, 1):.2f}')).quantize(Decimal('0.01'))
+            rows.append((wallet.pk, opening, 'DEPOSIT', 'Opening deposit', opening_at, None, None))
+
+            balance = Decimal('0.00')
+            for row in rows:
+                balance += row[1]
+                month = months.setdefault((row[4].year, row[4].month), [0, Decimal('0.00'), Decimal('0.00')])
+                month[0] += 1
+                month[1 if row[1] > 0 else 2] += abs(row[1])
+                yield wallet._state.db, row
+            wallet.balance = balance
+            self.totals['transactions'] += len(rows)
+
+            # Most used counterparties become saved beneficiaries
+            top = sorted(used.items(), key=lambda item: -item[1][1])[:options['beneficiaries_per_user']]
+            for (o_account, bank_code), (name, uses, last) in top:
+                beneficiaries.append(Beneficiary(
+                    user_id=wallet.user_id, name=name, account_number=o_account, bank_code=bank_code,
+                    bank_name=BANK_NAME[bank_code], created_at=last - timedelta(days=rng.random() * 60),
+                    last_used=last, transfer_count=uses, score=uses * use_weight(last),
+                ))
+
+            for (year, month), (n_txns, income, expense) in sorted(months.items(), reverse=True)[:options['statements_per_user']]:
+                period_start = datetime(year, month, 1).date()
+                period_end = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).date()
+                statements.append(Statement(
+                    user_id=wallet.user_id, period_start=period_start, period_end=period_end,
+                    total_transactions=n_txns, total_income=income, total_expense=expense,
+                    net_change=income - expense, statement_id=f'STM-L{self.offset + index:07d}{year % 100:02d}{month:02d}',
+                    generated_at=datetime(year, month, 1, tzinfo=dt_timezone.utc) + timedelta(days=32),
+                ))
+
+    def write_transactions(self, alias, batch):
+        if self.use_copy[alias]:
+            self.copy_transactions(alias, batch)
+        else:
+            with explicit_timestamps(Transaction._meta.get_field('timestamp')):
+                Transaction.objects.using(alias).bulk_create(
+                    [Transaction(**dict(zip(TRANSACTION_COLUMNS, row))) for row in batch],
+                    batch_size=self.batch_size,
+                )
+
+    def copy_transactions(self, alias, batch):
+        """Stream rows into Postgres with COPY ... FROM STDIN"""
+        sql = f"COPY {Transaction._meta.db_table} ({', '.join(TRANSACTION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        with connections[alias].cursor() as cursor:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow(['' if value is None else value for value in row[:4]] + [
+                    row[4].isoformat(), row[5] or '', row[6] or '',
+                ])
+            buffer.seek(0)
+            if hasattr(cursor, 'copy_expert'):  # psycopg2
+                cursor.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
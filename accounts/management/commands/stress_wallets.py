@@ -0,0 +1,87 @@
+import json
+import logging
+import tempfile
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from accounts import stress
+from accounts.benchmark import use_file_test_databases
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent transfers and bill payments at a few wallets from several threads "
+        "and processes, then check that no money was created or lost"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=8)
+        parser.add_argument('--balance', type=Decimal, default=Decimal('1000.00'), help="Opening balance per wallet")
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--processes', type=int, default=2, help="0 runs every thread in this process")
+        parser.add_argument('--threads', type=int, default=8, help="Threads per process")
+        parser.add_argument('--bill-ratio', type=float, default=0.2)
+        parser.add_argument('--external-ratio', type=float, default=0.1, help="Share of transfers to other banks")
+        parser.add_argument('--max-amount', type=int, default=50, help="Largest amount per operation (naira)")
+        parser.add_argument('--provider-delay', type=float, default=0.0,
+                            help="Simulated bill provider latency (default 0; the app default is 1s)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--report', metavar='PATH', help="Also write the report as JSON")
+
+    def handle(self, *args, **options):
+        if options['wallets'] < 2:
+            raise CommandError("Need at least 2 wallets")
+
+        # Always a fresh, file-backed database: never the configured one
+        use_file_test_databases(tempfile.mkdtemp(prefix='owo-stress-'), 'stress')
+
+        # Refusals are expected and counted; don't log a warning for each
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+            with override_settings(DEBUG=False, REST_FRAMEWORK=rest_framework,
+                                   OWO_BILL_PROVIDER_DELAY=options['provider_delay']):
+                wallets = stress.seed_stress_wallets(options['wallets'], options['balance'])
+                report = stress.run(
+                    wallets, options['operations'], threads=options['threads'], processes=options['processes'],
+                    seed=options['seed'], bill_ratio=options['bill_ratio'],
+                    external_ratio=options['external_ratio'], max_amount=options['max_amount'],
+                )
+                report['problems'] = stress.check(wallets, options['balance'] * len(wallets), report['external_out'])
+        finally:
+            request_logger.setLevel(previous_level)
+            teardown_databases(old_config, verbosity=0)
+
+        self.print_report(report)
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+        if report['outcomes'][stress.FAILED]:
+            raise CommandError(f"{report['outcomes'][stress.FAILED]} operations failed")
+        if report['problems']:
+            raise CommandError("Balance invariants violated:\n  " + "\n  ".join(report['problems']))
+        self.stdout.write(self.style.SUCCESS("Balances consistent and money conserved"))
+
+    def print_report(self, report):
+        outcomes, latency, lock = report['outcomes'], report['latency_ms'], report['lock_wait_ms']
+        self.stdout.write(
+            f"\n{report['operations']} operations from {report['processes']} processes x {report['threads']} threads "
+            f"in {report['elapsed_s']}s: {report['ops_per_s']} ops/s\n"
+            f"  succeeded {outcomes[stress.OK]}, refused (insufficient funds) {outcomes[stress.REFUSED]}, "
+            f"failed {outcomes[stress.FAILED]}\n"
+            f"  latency   p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms\n"
+            f"  lock wait total {lock['total']} ms, mean {lock['mean']} ms, p95 {lock['p95']} ms, p99 {lock['p99']} ms\n"
+            f"  paid out of the system {report['external_out']}"
+        )
+        for example in report['error_examples']:
+            self.stdout.write(self.style.WARNING(f"  e.g. {example}"))
+        for problem in report['problems']:
+            self.stdout.write(self.style.ERROR(f"  {problem}"))
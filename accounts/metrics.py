@@ -0,0 +1,194 @@
+"""
+In-process request metrics, exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware samples OWO_METRICS_SAMPLE_RATE of requests. For each one
+it records wall time, DB query count and DB time per URL name, and adds a
+Server-Timing header. With the rate at 0 the middleware removes itself at
+startup, so it costs nothing.
+
+Each process keeps its own counts. A scrape reaches whichever gunicorn
+worker accepts it, so without OWO_METRICS_DIR it sees one worker's counts
+and they jump between scrapes. With OWO_METRICS_DIR set (a directory every
+worker can write, e.g. on tmpfs), each worker writes its counts to its own
+file there at most once a second and /metrics serves the sum over all the
+files. A dead worker's file stays, so totals never go backwards until
+gunicorn clears the directory on its next start (gunicorn.conf.py).
+"""
+import glob
+import json
+import os
+import secrets
+import threading
+import time
+
+from django.conf import settings
+
+# Request duration buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ('duration', 'db_time', 'db_queries', 'statuses')
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None, flush_interval=1.0):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._flushed_at = 0.0
+        self._pid = None
+        self._file_name = None
+
+    def record(self, view, method, status, duration, db_time, db_queries):
+        key = (view, method)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RequestStats()
+            stats.duration.observe(duration)
+            stats.db_time += db_time
+            stats.db_queries += db_queries
+            status_class = f'{status // 100}xx'
+            stats.statuses[status_class] = stats.statuses.get(status_class, 0) + 1
+        if self.directory and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: (list(s.duration.counts), s.duration.total, s.duration.count, s.db_time, s.db_queries, dict(s.statuses))
+                for key, s in self._stats.items()
+            }
+
+    def worker_file(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # First flush in this worker. The suffix keeps a worker that reuses
+            # a dead one's pid from overwriting its counts.
+            self._pid, self._file_name = pid, f'{pid}-{secrets.token_hex(4)}.json'
+        return os.path.join(self.directory, self._file_name)
+
+    def flush(self):
+        """Write this process's counts to its file in `directory`"""
+        self._flushed_at = time.monotonic()
+        rows = [[view, method, *values] for (view, method), values in self.snapshot().items()]
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.worker_file()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(rows, f)
+        os.replace(path + '.tmp', path)
+
+    def combined_snapshot(self):
+        """snapshot() summed over every worker's file, or this process's alone without a directory"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    rows = json.load(f)
+            except OSError:  # cleared since the glob
+                continue
+            for view, method, counts, total, count, db_time, db_queries, statuses in rows:
+                into = merged.setdefault((view, method), [[0] * len(counts), 0.0, 0, 0.0, 0, {}])
+                into[0] = [a + b for a, b in zip(into[0], counts)]
+                into[1] += total
+                into[2] += count
+                into[3] += db_time
+                into[4] += db_queries
+                for status_class, n in statuses.items():
+                    into[5][status_class] = into[5].get(status_class, 0) + n
+        return {key: tuple(values) for key, values in merged.items()}
+
+    def render(self):
+        """Prometheus text exposition format 0.0.4"""
+        lines = [
+            '# HELP owo_request_duration_seconds Wall time of sampled requests.',
+            '# TYPE owo_request_duration_seconds histogram',
+        ]
+        snapshot = sorted(self.combined_snapshot().items())
+        for (view, method), (counts, total, count, _, _, _) in snapshot:
+            labels = f'view="{view}",method="{method}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'owo_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'owo_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'owo_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines += [
+            '# HELP owo_request_db_seconds_total DB time spent by sampled requests.',
+            '# TYPE owo_request_db_seconds_total counter',
+        ]
+        for (view, method), (_, _, _, db_time, _, _) in snapshot:
+            lines.append(f'owo_request_db_seconds_total{{view="{view}",method="{method}"}} {db_time:.6f}')
+
+        lines += [
+            '# HELP owo_request_db_queries_total DB queries run by sampled requests.',
+            '# TYPE owo_request_db_queries_total counter',
+        ]
+        for (view, method), (_, _, _, _, db_queries, _) in snapshot:
+            lines.append(f'owo_request_db_queries_total{{view="{view}",method="{method}"}} {db_queries}')
+
+        lines += [
+            '# HELP owo_requests_total Sampled requests by status class.',
+            '# TYPE owo_requests_total counter',
+        ]
+        for (view, method), (_, _, _, _, _, statuses) in snapshot:
+            for status_class, n in sorted(statuses.items()):
+                lines.append(f'owo_requests_total{{view="{view}",method="{method}",status="{status_class}"}} {n}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+registry = MetricsRegistry(directory=getattr(settings, 'OWO_METRICS_DIR', '') or None)
+
+
+class QueryTimer:
+    """connection.execute_wrapper() callback that counts and times queries"""
+
+    __slots__ = ('count', 'elapsed')
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.count += 1
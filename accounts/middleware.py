@@ -0,0 +1,213 @@
+import json
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+from .log import new_request_id, request_id, request_sampled
+from .metrics import QueryTimer, registry
+from .replicas import pin_to_primary, replicas
+from .utils import cache_is_process_local
+
+REQUEST_ID_RE = re.compile(r'^[\w.-]{1,64}$')
+
+HEALTHZ_PATHS = ('/healthz', '/healthz/')
+API_HEALTH_PATH = '/api/auth/health/'
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under WSGI and ASGI: `__call__`
+    for a sync chain, `acall` for an async one. Under ASGI a sync-only
+    middleware makes Django run everything below it in a thread, which
+    would undo the async views (accounts/async_api.py).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
+
+
+class ProbeMiddleware(HybridMiddleware):
+    """
+    Answer load balancer probes before any other middleware runs (sessions,
+    CSRF, auth, DRF). Keep this first in MIDDLEWARE. The URL routes for the same
+    paths stay in place as a fallback if the middleware is removed.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Everything except the timestamp is rendered once
+        self.api_health_prefix = json.dumps({
+            'status': 'healthy',
+            'service': 'OWO Banking API',
+            'version': '1.0.0',
+        })[:-1].encode() + b', "timestamp": "'
+
+    def call(self, request):
+        response = self.probe(request)
+        return self.get_response(request) if response is None else response
+
+    async def acall(self, request):
+        response = self.probe(request)
+        return await self.get_response(request) if response is None else response
+
+    def probe(self, request):
+        path = request.path_info
+        if path in HEALTHZ_PATHS:
+            return self.respond(b'OK', 'text/html; charset=utf-8')
+        if path == API_HEALTH_PATH and request.method == 'GET':
+            body = self.api_health_prefix + timezone.now().isoformat().encode() + b'"}'
+            return self.respond(body, 'application/json')
+        return None
+
+    @staticmethod
+    def respond(body, content_type):
+        response = HttpResponse(body, content_type=content_type)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record wall time, DB query count and DB time for a sample of requests
+    (OWO_METRICS_SAMPLE_RATE, 0-1) into accounts.metrics and add a
+    Server-Timing header. Unsampled requests pay for one random() call; with
+    the rate at 0 Django drops the middleware entirely.
+
+    Sync only: the query timer hooks the connections of the thread running
+    the request. Under ASGI, turning it on puts requests back on threads.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = float(getattr(settings, 'OWO_METRICS_SAMPLE_RATE', 0))
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        registry.record(view, request.method, response.status_code, duration, timer.elapsed, timer.count)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={timer.elapsed * 1000:.1f};desc="{timer.count} queries"'
+        )
+        return response
+
+
+class RequestIdMiddleware(HybridMiddleware):
+    """
+    Tag everything logged while handling a request with its id (see
+    accounts/log.py). A well-formed X-Request-ID from the proxy is reused,
+    otherwise one is generated; either way it is returned in the response.
+    Also makes the per-request decision for sampled log events.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = float(getattr(settings, 'OWO_LOG_SAMPLE_RATE', 0.01))
+
+    def call(self, request):
+        tokens = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(tokens)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    async def acall(self, request):
+        # Context variables follow the request through sync_to_async threads
+        tokens = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(tokens)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    def start(self, request):
+        incoming = request.META.get('HTTP_X_REQUEST_ID', '')
+        rid = incoming if REQUEST_ID_RE.match(incoming) else new_request_id()
+        request.request_id = rid
+        return request_id.set(rid), request_sampled.set(random.random() < self.sample_rate)
+
+    @staticmethod
+    def finish(tokens):
+        id_token, sampled_token = tokens
+        request_id.reset(id_token)
+        request_sampled.reset(sampled_token)
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """
+    Pin a user to the primary database for a few seconds after any unsafe
+    request, so their next reads see what they just wrote even on views that
+    read from replicas (see accounts/replicas.py). Without replicas Django
+    drops the middleware.
+    """
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        if cache_is_process_local():
+            raise ImproperlyConfigured(
+                "Read replicas need a shared cache for primary pins: set CACHE_URL "
+                "(redis://...) so every worker sees a pin set by the others."
+            )
+        super().__init__(get_response)
+
+    def call(self, request):
+        response = self.get_response(request)
+        self.pin(request)
+        return response
+
+    async def acall(self, request):
+        response = await self.get_response(request)
+        self.pin(request)
+        return response
+
+    @staticmethod
+    def pin(request):
+        if request.method not in SAFE_METHODS:
+            # DRF copies the user it authenticated (e.g. from a JWT) onto the request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user)
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+SEQUENCE_NAME = 'accounts_account_number_block_seq'
+
+
+def create_block_counter(apps, schema_editor):
+    """
+    Start at the first block. Blocks holding legacy random account numbers
+    are skipped as they come up (accounts/account_numbers.py), rather than
+    starting past the largest one and losing every block below it.
+    """
+    AccountNumberSequence = apps.get_model('accounts', 'AccountNumberSequence')
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} START WITH 1")
+    else:
+        AccountNumberSequence.objects.using(schema_editor.connection.alias).create(name='wallet', next_block=0)
+
+
+def drop_block_counter(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS {SEQUENCE_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_block', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_block_counter, drop_block_counter),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:29
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+HALF_LIFE_DAYS = 14
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_scores(apps, schema_editor):
+    # Approximate history: every past transfer counted at last_used
+    Beneficiary = apps.get_model('accounts', 'Beneficiary')
+    db = schema_editor.connection.alias
+    batch = []
+    for beneficiary in Beneficiary.objects.using(db).only('id', 'last_used', 'transfer_count').iterator(chunk_size=2000):
+        days = (beneficiary.last_used - EPOCH).total_seconds() / 86400
+        beneficiary.score = max(beneficiary.transfer_count, 1) * 2 ** (days / HALF_LIFE_DAYS)
+        batch.append(beneficiary)
+        if len(batch) >= 2000:
+            Beneficiary.objects.using(db).bulk_update(batch, ['score'])
+            batch = []
+    if batch:
+        Beneficiary.objects.using(db).bulk_update(batch, ['score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_accountnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beneficiary',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='beneficiary',
+            index=models.Index(fields=['user', '-score', '-id'], name='beneficiary_rank_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
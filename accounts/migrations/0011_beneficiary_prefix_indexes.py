@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:31
+
+from django.db import migrations
+
+# Match the SQL Django emits for istartswith/startswith on each backend so the
+# planner can use these for the beneficiary typeahead.
+POSTGRES_INDEXES = {
+    'beneficiary_name_prefix_idx': '(user_id, (UPPER(name::text)) text_pattern_ops)',
+    'beneficiary_nick_prefix_idx': '(user_id, (UPPER(nickname::text)) text_pattern_ops)',
+    'beneficiary_acct_prefix_idx': '(user_id, (account_number::text) text_pattern_ops)',
+}
+# SQLite's LIKE is case-insensitive and can only use a NOCASE index
+SQLITE_INDEXES = {
+    'beneficiary_name_prefix_idx': '(user_id, name COLLATE NOCASE)',
+    'beneficiary_nick_prefix_idx': '(user_id, nickname COLLATE NOCASE)',
+    'beneficiary_acct_prefix_idx': '(user_id, account_number COLLATE NOCASE)',
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    indexes = {'postgresql': POSTGRES_INDEXES, 'sqlite': SQLITE_INDEXES}.get(vendor, {})
+    for name, columns in indexes.items():
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON accounts_beneficiary {columns}")
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        for name in POSTGRES_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_beneficiary_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+from accounts.utils import phone_hash
+
+
+def backfill_phone_hashes(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    db = schema_editor.connection.alias
+    batch = []
+    for user in User.objects.using(db).only('id', 'phone_number').iterator(chunk_size=2000):
+        user.phone_hash = phone_hash(user.phone_number)
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.using(db).bulk_update(batch, ['phone_hash'])
+            batch = []
+    if batch:
+        User.objects.using(db).bulk_update(batch, ['phone_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_beneficiary_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_phone_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_wallet_account_numbers(apps, schema_editor):
+    # Runs before any wallet has moved off default, so one UPDATE covers everyone
+    User = apps.get_model('accounts', 'User')
+    Wallet = apps.get_model('accounts', 'Wallet')
+    db = schema_editor.connection.alias
+    account_number = Wallet.objects.using(db).filter(user=OuterRef('pk')).values('account_number')[:1]
+    User.objects.using(db).update(wallet_account_number=Coalesce(Subquery(account_number), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_phone_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender_account', models.CharField(max_length=10)),
+                ('recipient_account', models.CharField(max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('debit_entry', models.JSONField(default=dict)),
+                ('credit_entry', models.JSONField(default=dict)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('DEBITED', 'Debited'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('COMPENSATED', 'Compensated')], default='PENDING', max_length=12)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='reference',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='wallet_account_number',
+            field=models.CharField(blank=True, default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(backfill_wallet_account_numbers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='wallet',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='wallet', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference__isnull', False)), fields=('reference',), name='transaction_reference_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='shardtransfer',
+            index=models.Index(fields=['state', 'updated_at'], name='shardtransfer_state_idx'),
+        ),
+    ]
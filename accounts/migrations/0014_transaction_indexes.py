@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+INDEXES = [
+    models.Index(fields=['timestamp'], name='transaction_time_idx'),
+    models.Index(fields=['wallet', '-timestamp'], name='transaction_wallet_time_idx'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    Transaction = apps.get_model('accounts', 'Transaction')
+    # On PostgreSQL build them without blocking writes to a large table
+    concurrently = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    for index in INDEXES:
+        schema_editor.execute(index.create_sql(Transaction, schema_editor, **concurrently))
+
+
+def drop_indexes(apps, schema_editor):
+    Transaction = apps.get_model('accounts', 'Transaction')
+    concurrently = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    for index in INDEXES:
+        schema_editor.execute(index.remove_sql(Transaction, schema_editor, **concurrently))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0013_wallet_shards'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes)],
+            state_operations=[
+                migrations.AddIndex(model_name='transaction', index=index) for index in INDEXES
+            ],
+        ),
+    ]
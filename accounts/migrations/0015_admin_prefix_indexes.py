@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# WalletAdmin searches these columns with __startswith (LIKE 'prefix%')
+COLUMNS = {
+    'wallet_account_prefix_idx': ('accounts_wallet', 'account_number'),
+    'user_email_prefix_idx': ('accounts_user', 'email'),
+    'user_phone_prefix_idx': ('accounts_user', 'phone_number'),
+}
+
+
+def has_pattern_index(cursor, table, column):
+    # Django adds a "<column>_like" index like this for unique CharFields it created itself
+    cursor.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s", [table])
+    return any(f'({column} varchar_pattern_ops)' in definition for definition, in cursor.fetchall())
+
+
+def create_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, (table, column) in COLUMNS.items():
+        if vendor == 'postgresql':
+            # The unique indexes use the database collation, which LIKE can't
+            # range-scan outside the C locale; varchar_pattern_ops can
+            with schema_editor.connection.cursor() as cursor:
+                if has_pattern_index(cursor, table, column):
+                    continue
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column} varchar_pattern_ops)"
+            )
+        elif vendor == 'sqlite':
+            # SQLite's LIKE is case-insensitive and can only use a NOCASE index
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column} COLLATE NOCASE)")
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    concurrently = 'CONCURRENTLY ' if vendor == 'postgresql' else ''
+    if vendor in ('postgresql', 'sqlite'):
+        for name in COLUMNS:
+            schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0014_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
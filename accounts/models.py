@@ -1,6 +1,7 @@
+from asgiref.sync import sync_to_async
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-import random
+from django.utils import timezone
 
     
 class UserManager(BaseUserManager):
@@ -45,6 +46,10 @@ class User(AbstractUser):
     is_nin_verified = models.BooleanField(default=False)
     is_email_verified = models.BooleanField(default=False)
     pin = models.CharField(max_length=128, blank=True, null=True)  # 4-digit PIN
+    # SHA-256 of the normalized phone number, for contact matching
+    phone_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # Copy of Wallet.account_number, which decides the wallet's shard (accounts/sharding.py)
+    wallet_account_number = models.CharField(max_length=10, blank=True, default='', editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['phone_number']
@@ -67,6 +72,14 @@ class User(AbstractUser):
     )
     
     objects = UserManager()
+    
+    def save(self, *args, **kwargs):
+        from .utils import phone_hash
+        self.phone_hash = phone_hash(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_hash'}
+        super().save(*args, **kwargs)
 
 class Beneficiary(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='beneficiaries')
@@ -78,10 +91,22 @@ class Beneficiary(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     last_used = models.DateTimeField(auto_now=True)
     transfer_count = models.IntegerField(default=0)
+    # Frecency: sum of exponentially growing per-use weights, see accounts/beneficiaries.py
+    score = models.FloatField(default=0)
     
     class Meta:
         unique_together = ['user', 'account_number', 'bank_code']
         verbose_name_plural = 'Beneficiaries'
+        indexes = [
+            models.Index(fields=['user', '-score', '-id'], name='beneficiary_rank_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.score:
+            # Adding a beneficiary counts as one use
+            from .beneficiaries import use_weight
+            self.score = use_weight()
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.name} ({self.account_number}) - {self.user.email}"
@@ -108,29 +133,169 @@ class Statement(models.Model):
     def __str__(self):
         return f"Statement {self.statement_id} - {self.user.email}"
     
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        if self._db is not None:
+            return super().create(**kwargs)
+        # Let the router place the wallet by its account number (or the
+        # transaction by its wallet) instead of routing on the model alone
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+
+class WalletManager(models.Manager.from_queryset(ShardedQuerySet)):
+    def get_by_account(self, account_number):
+        """The wallet with this account number, with its user (raises Wallet.DoesNotExist)"""
+        from .sharding import is_sharded, shard_for
+
+        if not is_sharded():
+            return self.select_related('user').get(account_number=account_number)
+        # No join across databases: the user is a second query, on default
+        wallet = self.using(shard_for(account_number)).get(account_number=account_number)
+        wallet.user
+        return wallet
+
+    async def aget_by_account(self, account_number):
+        return await sync_to_async(self.get_by_account)(account_number)
+
+    async def aget_for_user(self, user):
+        """`user.wallet` for async code, from the wallet's shard (raises Wallet.DoesNotExist)"""
+        from .sharding import shard_for_user
+
+        return await self.db_manager(shard_for_user(user)).aget(user_id=user.pk)
+
+
 class Wallet(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet')
+    # Wallets may live on another database than their user, so no DB-level constraint
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet', db_constraint=False)
     # 10 digit account number
     account_number = models.CharField(max_length=10, unique=True, editable=False)
     # ALWAYS use DecimalField for money
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     pin = models.CharField(max_length=4, null=True, blank=True)
 
+    objects = WalletManager()
+
+    def __str__(self):
+        # Labels admin autocomplete results; anything about the user would cost a query per wallet
+        return self.account_number
+
+    @staticmethod
+    def account_number_for(phone_number):
+        from .account_numbers import account_numbers_for
+        # Phone-derived when possible and free; allocated numbers can never collide with these
+        return account_numbers_for([phone_number])[0]
+
     def save(self, *args, **kwargs):
+        adding = self._state.adding
         if not self.account_number:
-            if self.user.phone_number and len(self.user.phone_number) >= 10:
-                 self.account_number = self.user.phone_number[-10:]
-            else:
-                 self.account_number = str(random.randint(1000000000, 9999999999))
+            self.account_number = self.user.wallet_account_number or self.account_number_for(self.user.phone_number)
+        if adding and 'using' not in kwargs:
+            from .sharding import is_sharded, shard_for
+            if is_sharded():
+                # Assigning `user` already set _state.db, from a user that may
+                # not know its account number yet; the account number decides
+                kwargs['using'] = shard_for(self.account_number)
         super().save(*args, **kwargs)
+        if adding and self.user.wallet_account_number != self.account_number:
+            User.objects.filter(pk=self.user_id).update(wallet_account_number=self.account_number)
+            self.user.wallet_account_number = self.account_number
 
 class Transaction(models.Model):
+    TYPES = ('TRANSFER', 'AIRTIME', 'DATA', 'DEPOSIT')
+
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
-    # TRANSFER, AIRTIME, DATA, DEPOSIT
+    # One of TYPES
     type = models.CharField(max_length=20) 
     description = models.CharField(max_length=255)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     counterparty = models.CharField(max_length=255, blank=True, null=True)
-    account_number = models.CharField(max_length=20, blank=True, null=True)
\ No newline at end of file
+    account_number = models.CharField(max_length=20, blank=True, null=True)
+    # Idempotency key for saga steps (accounts/ledger.py); NULL for everything else
+    reference = models.CharField(max_length=40, blank=True, null=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reference'], condition=models.Q(reference__isnull=False), name='transaction_reference_uniq',
+            ),
+        ]
+        indexes = [
+            # Newest first: the admin list, and one wallet's history (recent
+            # transactions, real-time data, statements)
+            models.Index(fields=['timestamp'], name='transaction_time_idx'),
+            models.Index(fields=['wallet', '-timestamp'], name='transaction_wallet_time_idx'),
+        ]
+
+
+class ShardTransfer(models.Model):
+    """An internal transfer between wallets on different shards, run as a saga by accounts.ledger"""
+    PENDING = 'PENDING'          # recorded, sender not debited yet
+    DEBITED = 'DEBITED'          # sender debited, recipient not credited yet
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'            # nothing moved
+    COMPENSATED = 'COMPENSATED'  # sender debited, then refunded
+    STATE_CHOICES = [(s, s.title()) for s in (PENDING, DEBITED, COMPLETED, FAILED, COMPENSATED)]
+
+    sender_account = models.CharField(max_length=10)
+    recipient_account = models.CharField(max_length=10)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Transaction fields for the two ledger rows, so a resumed saga writes the same ones
+    debit_entry = models.JSONField(default=dict)
+    credit_entry = models.JSONField(default=dict)
+    state = models.CharField(max_length=12, choices=STATE_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'updated_at'], name='shardtransfer_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sender_account} -> {self.recipient_account} {self.amount} ({self.state})"
+
+class OutboundEmail(models.Model):
+    """Email outbox: written in the caller's transaction, delivered by accounts.outbox"""
+    STATUS_PENDING = 'PENDING'
+    STATUS_SENT = 'SENT'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class AccountNumberSequence(models.Model):
+    """Block counter for accounts.account_numbers where there is no native DB sequence"""
+    name = models.CharField(max_length=50, unique=True)
+    next_block = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: next block {self.next_block}"
@@ -0,0 +1,162 @@
+"""
+NIN identity lookups behind a pluggable provider, with a result cache and
+request coalescing.
+
+Vendor lookups are slow and billed per call, so:
+  - results are cached by an HMAC of the NIN (the raw NIN never becomes a
+    cache key) for OWO_NIN_CACHE_TTL seconds;
+  - concurrent lookups of the same NIN in one process share one upstream call;
+  - registration reads the cache to set User.is_nin_verified, so a NIN that
+    was just verified costs no further upstream calls.
+
+Providers implement `async def lookup(nin)` and return the vendor's identity
+record, or None when the NIN does not exist. A NIN only verifies when the
+record has a first name, last name and date of birth and all three equal
+what the user supplied. Pick a provider with OWO_NIN_PROVIDER:
+  accounts.nin.StubNINProvider - simulated, in process (default); every NIN
+                                 belongs to STUB_IDENTITY
+  accounts.nin.HTTPNINProvider - JSON API at OWO_NIN_PROVIDER_URL; point it
+                                 at `manage.py nin_stub_server` locally
+"""
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+
+CACHE_TTL = getattr(settings, 'OWO_NIN_CACHE_TTL', 86400)
+NEGATIVE_CACHE_TTL = 600
+MATCHED_FIELDS = ('first_name', 'last_name', 'date_of_birth')
+
+# Who every NIN belongs to in the simulated vendors (StubNINProvider, nin_stub_server)
+STUB_IDENTITY = {'first_name': 'JOHN', 'last_name': 'DOE', 'date_of_birth': '1990-01-01'}
+
+
+class NINProviderError(Exception):
+    pass
+
+
+class BaseNINProvider:
+    async def lookup(self, nin):
+        raise NotImplementedError
+
+
+class StubNINProvider(BaseNINProvider):
+    """Simulated vendor: every well-formed NIN exists and belongs to STUB_IDENTITY"""
+
+    latency = 0
+
+    async def lookup(self, nin):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {
+            "nin": nin,
+            **STUB_IDENTITY,
+            "verification_date": timezone.now().isoformat(),
+        }
+
+
+class HTTPNINProvider(BaseNINProvider):
+    def __init__(self, url=None, api_key=None, timeout=10):
+        self.url = url or settings.OWO_NIN_PROVIDER_URL
+        self.api_key = api_key or getattr(settings, 'OWO_NIN_API_KEY', '')
+        self.timeout = timeout
+
+    def _post(self, nin):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({'nin': nin}).encode(),
+            headers={'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'},
+            method='POST',
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise NINProviderError(f"NIN provider returned {e.code}") from e
+        except (urllib.error.URLError, TimeoutError, ValueError) as e:
+            raise NINProviderError(str(e)) from e
+
+        if payload.get('status') != 'success':
+            return None
+        return payload.get('data')
+
+    async def lookup(self, nin):
+        # urllib is blocking; keep it off the event loop
+        return await asyncio.to_thread(self._post, nin)
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = import_string(getattr(settings, 'OWO_NIN_PROVIDER', 'accounts.nin.StubNINProvider'))()
+    return _provider
+
+
+def cache_key(nin):
+    return 'nin:v1:' + salted_hmac('accounts.nin', nin).hexdigest()
+
+
+_MISSING = object()
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def lookup_nin(nin):
+    """Cached, coalesced provider lookup. Returns the identity record or None."""
+    key = cache_key(nin)
+    cached = cache.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        return future.result()
+
+    try:
+        record = async_to_sync(get_provider().lookup)(nin)
+        cache.set(key, record, CACHE_TTL if record else NEGATIVE_CACHE_TTL)
+        future.set_result(record)
+        return record
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
+def matches(record, first_name='', last_name='', date_of_birth=None):
+    """Compare what the user typed with the vendor record; anything missing on either side is a mismatch"""
+    supplied = {'first_name': first_name, 'last_name': last_name, 'date_of_birth': date_of_birth}
+    for field in MATCHED_FIELDS:
+        expected, actual = supplied[field], record.get(field)
+        if not expected or not actual:
+            return False
+        if str(actual).strip().upper() != str(expected).strip().upper():
+            return False
+    return True
+
+
+def cached_verification(nin, first_name='', last_name='', date_of_birth=None):
+    """True only if a recent lookup found this NIN with matching details; never calls the provider"""
+    record = cache.get(cache_key(nin)) if nin else None
+    return bool(record) and matches(record, first_name, last_name, date_of_birth)
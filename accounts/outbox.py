@@ -0,0 +1,159 @@
+"""
+Transactional email outbox.
+
+queue_email() writes an OutboundEmail row in the caller's transaction, so a
+rolled-back registration never sends mail and a slow SMTP server never holds
+a request (or its DB transaction) open. After commit the in-process worker
+thread is woken; `manage.py drain_outbox --loop` runs the same loop as a
+dedicated process.
+
+Rows are claimed by pushing next_attempt_at forward by a lease, so a worker
+that dies mid-send just lets the lease expire and the row is retried.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'OWO_EMAIL_OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'OWO_EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+BACKOFF_BASE = 30  # seconds; doubled per attempt
+BACKOFF_MAX = 3600
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def queue_email(subject, body, from_email, to):
+    """Record an email to send once the current transaction commits"""
+    email = OutboundEmail.objects.create(subject=subject, body=body, from_email=from_email, to=to)
+    transaction.on_commit(wake_worker)
+    return email
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX))
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Lease up to batch_size due emails to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        batch = list(due)
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[e.pk for e in batch]).update(next_attempt_at=now + CLAIM_LEASE)
+    return batch
+
+
+def drain(connection=None, batch_size=BATCH_SIZE):
+    """
+    Send one batch over a single SMTP connection. Returns the number of rows
+    processed (sent or rescheduled) so callers can loop until it hits zero.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0
+
+    own_connection = connection is None
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        for index, email in enumerate(batch):
+            try:
+                # Opens the session, or reopens it after a failed send; a no-op while it is up
+                connection.open()
+            except Exception as e:
+                # SMTP is unreachable: reschedule the rest of the batch with
+                # backoff instead of leaving it leased
+                logger.warning("Outbox: could not connect to the mail server: %s", e)
+                for pending in batch[index:]:
+                    _record_failure(pending, e)
+                break
+            message = EmailMessage(email.subject, email.body, email.from_email, [email.to], connection=connection)
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                _record_failure(email, e)
+                # The connection may be unusable after an SMTP error
+                connection.close()
+            else:
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(),
+                    attempts=email.attempts + 1, last_error='',
+                )
+    finally:
+        if own_connection:
+            connection.close()
+    return len(batch)
+
+
+def _record_failure(email, error):
+    attempts = email.attempts + 1
+    status = OutboundEmail.STATUS_FAILED if attempts >= MAX_ATTEMPTS else OutboundEmail.STATUS_PENDING
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=status, attempts=attempts, last_error=str(error)[:2000],
+        next_attempt_at=timezone.now() + backoff(attempts),
+    )
+    logger.warning("Outbox email %s to %s failed (attempt %s): %s", email.pk, email.to, attempts, error)
+
+
+class OutboxWorker(threading.Thread):
+    """Background drainer that keeps one SMTP connection open while there is work"""
+
+    def __init__(self, poll_interval=30):
+        super().__init__(name='owo-email-outbox', daemon=True)
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            self.drain_all()
+
+    def drain_all(self):
+        connection = None
+        try:
+            while not self.stopping.is_set():
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                if not drain(connection):
+                    break
+        except Exception:
+            logger.exception("Outbox drain failed")
+        finally:
+            if connection is not None:
+                connection.close()
+            close_old_connections()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def wake_worker():
+    """Start the in-process worker on first use and tell it there is mail"""
+    global _worker
+    if not getattr(settings, 'OWO_EMAIL_OUTBOX_WORKER', True):
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker()
+            _worker.start()
+    _worker.wakeup.set()
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+PIN_TOKEN_SALT = 'accounts.pin.step-up'
+PIN_TOKEN_TTL = getattr(settings, 'PIN_STEP_UP_TOKEN_TTL', 300)  # seconds
+
+
+def verify_pin(user, raw_pin):
+    """Check a PIN against user.pin, rehashing it if the hasher settings changed"""
+    if not raw_pin or not user.pin:
+        return False
+
+    def setter(raw):
+        user.pin = make_password(raw)
+        user.save(update_fields=['pin'])
+
+    return check_password(raw_pin, user.pin, setter)
+
+
+def _pin_fingerprint(user):
+    # Bound to the stored hash so a PIN change invalidates outstanding tokens
+    return salted_hmac(PIN_TOKEN_SALT, user.pin or '').hexdigest()[:16]
+
+
+def issue_pin_token(user):
+    """Signed, short-lived proof that the user just passed a PIN check"""
+    return signing.dumps({'u': user.pk, 'p': _pin_fingerprint(user)}, salt=PIN_TOKEN_SALT)
+
+
+def check_pin_token(user, token):
+    try:
+        payload = signing.loads(token, salt=PIN_TOKEN_SALT, max_age=PIN_TOKEN_TTL)
+    except signing.BadSignature:  # also covers SignatureExpired
+        return False
+    return payload.get('u') == user.pk and constant_time_compare(payload.get('p', ''), _pin_fingerprint(user))
+
+
+def authorize_pin(user, data):
+    """
+    Accept either a raw `pin` or a `pin_token` from an earlier step-up.
+    A valid token skips the Argon2 check entirely.
+    """
+    token = data.get('pin_token')
+    if token and check_pin_token(user, token):
+        return True
+    return verify_pin(user, data.get('pin'))
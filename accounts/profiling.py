@@ -0,0 +1,135 @@
+"""
+On-demand request profiling.
+
+A request runs under cProfile when:
+  - a staff user (admin session or JWT) sends `X-Owo-Profile: 1` or
+    `?__profile=1`, or
+  - it falls in the OWO_PROFILE_SAMPLE_RATE random sample (0 by default).
+
+Each profile is written as a .pstats file to OWO_PROFILE_DIR. The directory
+is a ring: only the newest OWO_PROFILE_MAX_FILES files are kept. Staff can
+list, summarize and download them at /admin/profiles/. Unprofiled requests
+pay for one header lookup and one substring check.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import secrets
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .middleware import HybridMiddleware
+from .utils import staff_user
+
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.pstats$')
+
+
+def profile_dir():
+    return Path(getattr(settings, 'OWO_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def list_profiles():
+    """Newest first: (name, size in bytes, modified timestamp)"""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    entries = [
+        (entry.name, entry.stat().st_size, entry.stat().st_mtime)
+        for entry in os.scandir(directory)
+        if PROFILE_NAME_RE.match(entry.name)
+    ]
+    return sorted(entries, key=lambda e: e[2], reverse=True)
+
+
+def profile_path(name):
+    """Path of a stored profile, or None for unknown / unsafe names"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def summarize(path, limit=60):
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Keep after AuthenticationMiddleware so admin sessions can trigger it.
+    Under ASGI the profile covers the event loop thread only, which also
+    runs other requests while this one waits.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = float(getattr(settings, 'OWO_PROFILE_SAMPLE_RATE', 0))
+        self.max_files = int(getattr(settings, 'OWO_PROFILE_MAX_FILES', 50))
+
+    def call(self, request):
+        requested, sampled = self.wanted(request)
+        if not sampled and not (requested and staff_user(request)):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, profiler, start)
+
+    async def acall(self, request):
+        requested, sampled = self.wanted(request)
+        # staff_user() may load the session user from the database
+        if not sampled and not (requested and await sync_to_async(staff_user)(request)):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, profiler, start)
+
+    def wanted(self, request):
+        requested = (
+            request.META.get('HTTP_X_OWO_PROFILE') == '1'
+            or '__profile=1' in request.META.get('QUERY_STRING', '')
+        )
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return requested, sampled
+
+    def finish(self, request, response, profiler, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name if match else None) or 'unmatched'
+        # The random part keeps two fast requests in the same second from sharing a file
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{secrets.token_hex(3)}-{view}-{elapsed_ms:.0f}ms.pstats"
+        self.save(profiler, name)
+        response['X-Owo-Profile-Id'] = name
+        return response
+
+    def save(self, profiler, name):
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(directory / name))
+
+        # Ring buffer: drop the oldest files beyond the limit
+        for old_name, _, _ in list_profiles()[self.max_files:]:
+            try:
+                (directory / old_name).unlink()
+            except FileNotFoundError:
+                pass  # another worker got there first
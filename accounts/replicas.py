@@ -0,0 +1,95 @@
+"""
+Read replicas for read-heavy endpoints.
+
+Replicas are the DATABASES aliases in OWO_READ_REPLICAS (built from
+DATABASE_REPLICA_URLS in settings). With none configured, nothing here has
+any effect.
+
+Reads go to a replica only when a view opts in. Either mix ReplicaReadMixin
+into an APIView, so every query of its safe-method requests reads from one
+replica, or pass a queryset through `.using(read_alias(user))`. Writes
+always go to the primary.
+
+Replicas lag. So that a user always sees their own writes (a fresh
+transfer in their history), every unsafe request from a user pins them to
+the primary for OWO_REPLICA_PIN_SECONDS (see ReplicaPinMiddleware). The pin
+lives in the default cache, which must be shared (CACHE_URL) for a pin set
+by one worker to be seen by the others; ReplicaPinMiddleware refuses to
+start on the per-process local-memory cache.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'owo:replica-pin:{}'
+
+# Replica alias chosen for the current request, or None for the primary
+replica_alias = contextvars.ContextVar('owo_replica_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'OWO_READ_REPLICAS', ())
+
+
+def pin_to_primary(user):
+    cache.set(PIN_KEY.format(user.pk), 1, getattr(settings, 'OWO_REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user):
+    return cache.get(PIN_KEY.format(user.pk)) is not None
+
+
+def read_alias(user):
+    """Where `user` may read from right now: a replica, or the primary if they wrote recently"""
+    aliases = replicas()
+    if not aliases or (user.is_authenticated and is_pinned(user)):
+        return DEFAULT_DB_ALIAS
+    return random.choice(aliases)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        if obj1._state.db in (DEFAULT_DB_ALIAS, *replicas()) and obj2._state.db in (DEFAULT_DB_ALIAS, *replicas()):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema by replication
+        return False if db in replicas() else None
+
+
+class ReplicaReadMixin:
+    """
+    APIView mixin: GET/HEAD/OPTIONS requests read from one replica, picked
+    after authentication, unless the user is pinned to the primary. Only for
+    views whose safe methods never write.
+    """
+
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            alias = read_alias(request.user)
+            if alias != DEFAULT_DB_ALIAS:
+                self._replica_token = replica_alias.set(alias)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Also when the view raised: the next request on this thread must not inherit it
+            if self._replica_token is not None:
+                replica_alias.reset(self._replica_token)
+                self._replica_token = None
@@ -5,6 +5,28 @@ from django.utils import timezone
 import re
 
 from .models import Beneficiary 
+from .bloom import registration_index
+from .nin import cached_verification
+from .utils import relative_time
+from .banks import OWO_BANK_CODE, bank_name
+from rest_framework.validators import UniqueValidator
+
+# Shared with the bulk import command
+NIN_PATTERN = r'^\d{11}$'
+NG_PHONE_PATTERN = r'^0[7-9][0-1]\d{8}$'
+
+
+class IndexedUniqueValidator(UniqueValidator):
+    """UniqueValidator that skips the query when the registration index rules the value out"""
+
+    def __init__(self, field):
+        super().__init__(queryset=User.objects.all())
+        self.indexed_field = field
+
+    def __call__(self, value, serializer_field):
+        if not registration_index.might_contain(self.indexed_field, value):
+            return
+        super().__call__(value, serializer_field)
 
 class UserSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(write_only=True, required=True)
@@ -22,8 +44,10 @@ class UserSerializer(serializers.ModelSerializer):
             'password': {'write_only': True},
             'first_name': {'required': True},
             'last_name': {'required': True},
-            'nin': {'required': True},
+            'nin': {'required': True, 'validators': [IndexedUniqueValidator('nin')]},
             'date_of_birth': {'required': True},
+            'email': {'validators': [IndexedUniqueValidator('email')]},
+            'phone_number': {'validators': [IndexedUniqueValidator('phone_number')]},
         }
     
     def validate(self, data):
@@ -46,12 +70,12 @@ class UserSerializer(serializers.ModelSerializer):
         
         # NIN validation
         nin = data.get('nin', '')
-        if not re.match(r'^\d{11}$', nin):
+        if not re.match(NIN_PATTERN, nin):
             raise serializers.ValidationError({"nin": "NIN must be 11 digits"})
         
         # Phone validation for Nigeria
         phone = data.get('phone_number', '')
-        if not re.match(r'^0[7-9][0-1]\d{8}$', phone):
+        if not re.match(NG_PHONE_PATTERN, phone):
             raise serializers.ValidationError({"phone_number": "Please enter a valid Nigerian phone number"})
         
         # Age validation (must be at least 18)
@@ -81,6 +105,15 @@ class UserSerializer(serializers.ModelSerializer):
             nin=validated_data.get('nin', ''),
             date_of_birth=validated_data.get('date_of_birth'),
             address=validated_data.get('address', ''),
+            # Chosen up front so creating the wallet doesn't have to update the user
+            wallet_account_number=Wallet.account_number_for(validated_data['phone_number']),
+            # Verified moments ago via /verify-nin/? Reuse that result instead of calling the vendor again
+            is_nin_verified=cached_verification(
+                validated_data.get('nin'),
+                validated_data.get('first_name', ''),
+                validated_data.get('last_name', ''),
+                validated_data.get('date_of_birth'),
+            ),
         )
         
         # Create wallet for the new user
@@ -118,22 +151,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         ]
 
     def get_formatted_time(self, obj):
-        now = timezone.now()
-        diff = now - obj.timestamp
-
-        if diff.days == 0:
-            if diff.seconds < 60:
-                return "Just now"
-            elif diff.seconds < 3600:
-                return f"{diff.seconds // 60}m ago"
-            else:
-                return f"{diff.seconds // 3600}h ago"
-        elif diff.days == 1:
-            return "Yesterday"
-        elif diff.days < 7:
-            return f"{diff.days}d ago"
-        else:
-            return obj.timestamp.strftime("%b %d")
+        return relative_time(obj.timestamp)
 
     def get_formatted_amount(self, obj):
         amount = abs(obj.amount)
@@ -219,7 +237,7 @@ class BeneficiarySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'last_used', 'transfer_count', 'is_owobank']
     
     def get_is_owobank(self, obj):
-        return obj.bank_code == '050'
+        return obj.bank_code == OWO_BANK_CODE
     
     def validate(self, data):
         # Check for duplicates
@@ -237,9 +255,13 @@ class CreateBeneficiarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Beneficiary
         fields = ['name', 'account_number', 'bank_code', 'bank_name', 'nickname']
+        extra_kwargs = {'bank_name': {'required': False}}
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
+        # Fill the display name from the bank directory when the client omits it
+        if not validated_data.get('bank_name'):
+            validated_data['bank_name'] = bank_name(validated_data['bank_code'])
         return super().create(validated_data)
 
 class VerifyAccountSerializer(serializers.Serializer):
@@ -0,0 +1,102 @@
+"""
+Wallets and their transactions, partitioned across database aliases.
+
+OWO_WALLET_SHARDS lists the aliases (built from DATABASE_SHARD_URLS in
+settings; 'default' is always shard 0). A wallet lives on
+shard_for(account_number), a stable hash of its account number, and its
+transactions live with it. Users, beneficiaries, statements and everything
+else stay on 'default'. With one shard, which is the default, nothing is
+routed and the app behaves exactly as before.
+
+Each user row carries its wallet's account number (User.wallet_account_number),
+so going from an authenticated user to their shard costs no query.
+ShardRouter uses it when code follows the relation (`user.wallet`), and
+uses the wallet's own database for `wallet.transactions`. Code that starts
+from a bare account number asks the manager:
+Wallet.objects.get_by_account(...).
+
+Queries that span wallets (admin changelists, reports) see one shard at a
+time; `accounts.reconcile` walks every shard. Changing the number of
+shards moves wallets and needs a data migration, which is not provided here.
+
+Transfers between shards can't share a transaction. They run as a saga
+instead; see accounts/ledger.py.
+"""
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def shards():
+    return getattr(settings, 'OWO_WALLET_SHARDS', None) or [DEFAULT_DB_ALIAS]
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def shard_for(account_number):
+    aliases = shards()
+    if len(aliases) == 1:
+        return aliases[0]
+    # crc32 is stable across processes and Python versions, unlike hash()
+    return aliases[zlib.crc32(account_number.encode()) % len(aliases)]
+
+
+def shard_for_user(user):
+    """The shard holding `user`'s wallet, from the user row alone"""
+    return shard_for(user.wallet_account_number) if user.wallet_account_number else DEFAULT_DB_ALIAS
+
+
+def bulk_create_wallets(wallets, batch_size=None):
+    """bulk_create wallets (account numbers set) on their shards"""
+    by_shard = defaultdict(list)
+    for wallet in wallets:
+        by_shard[shard_for(wallet.account_number)].append(wallet)
+    for alias, group in by_shard.items():
+        type(group[0]).objects.using(alias).bulk_create(group, batch_size=batch_size)
+    return wallets
+
+
+class ShardRouter:
+    """Routes Wallet and Transaction by shard; does nothing with a single shard"""
+
+    def _db(self, model, hints):
+        from .models import Transaction, User, Wallet
+
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if model not in (Wallet, Transaction):
+            # Following a relation from a wallet or transaction back to a user,
+            # beneficiary, ...: those live on default, not on the instance's shard
+            if isinstance(instance, (Wallet, Transaction)):
+                return DEFAULT_DB_ALIAS
+            return None
+        if instance is None:
+            return None
+        if isinstance(instance, User):
+            return shard_for_user(instance)
+        if instance._state.db:
+            return instance._state.db
+        if isinstance(instance, Wallet) and instance.account_number:
+            return shard_for(instance.account_number)
+        if isinstance(instance, Transaction):
+            wallet = instance._state.fields_cache.get('wallet')
+            if wallet is not None:
+                return self._db(Wallet, {'instance': wallet})
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A wallet on any shard may point at a user on default
+        if is_sharded() and {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, *shards()}:
+            return True
+        return None
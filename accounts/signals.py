@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .beneficiaries import invalidate_search
+from .bloom import registration_index
+from .models import Beneficiary, User
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, **kwargs):
+    # On updates too: a changed email or phone number is taken from now on
+    registration_index.add(instance)
+
+
+@receiver(post_save, sender=Beneficiary)
+@receiver(post_delete, sender=Beneficiary)
+def invalidate_beneficiary_search(sender, instance, **kwargs):
+    invalidate_search(instance.user_id)
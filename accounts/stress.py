@@ -0,0 +1,246 @@
+"""
+Concurrency stress harness for wallet balances (`manage.py stress_wallets`).
+
+Worker processes each run several threads. Every thread fires random
+internal transfers, external transfers and bill payments between a small set
+of wallets, calling TransferView and BillPaymentView in process (no HTTP) so
+that contention on the wallet rows is the only bottleneck. The wallets are
+deliberately few and their balances small, so requests collide and many
+are refused for insufficient funds.
+
+Afterwards check() verifies that
+  - no wallet balance is negative,
+  - every balance equals the sum of its transactions, and
+  - money was conserved: the total only went down by the external transfers
+    and bills that succeeded.
+
+"Lock wait" is the time spent in statements that take or wait for write
+locks: BEGIN IMMEDIATE on SQLite, wallet UPDATEs and SELECT ... FOR UPDATE.
+"""
+import multiprocessing
+import random
+import threading
+import time
+from decimal import Decimal
+
+from .benchmark import percentile
+
+STRESS_EMAIL = 'stress{}@stress.owo.test'
+STRESS_PIN = '4826'
+
+OK = 'ok'
+REFUSED = 'insufficient_funds'
+FAILED = 'failed'
+
+
+def seed_stress_wallets(count, balance):
+    """
+    Create `count` users whose wallets hold `balance`, with an opening deposit
+    so balances match their transactions. Returns [(user_id, account_number, pin_token)].
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction as db_transaction
+
+    from .models import Transaction, User, Wallet
+    from .pin import issue_pin_token
+
+    pin_hash = make_password(STRESS_PIN)
+    wallets = []
+    with db_transaction.atomic():
+        for i in range(count):
+            user = User.objects.create(
+                email=STRESS_EMAIL.format(i), phone_number=f'0905{i:07d}',
+                first_name='Stress', last_name=f'User{i}', pin=pin_hash,
+            )
+            wallet = Wallet.objects.create(user=user, balance=balance)
+            Transaction.objects.create(wallet=wallet, amount=balance, type='DEPOSIT', description='Stress opening balance')
+            wallets.append((user.pk, wallet.account_number, issue_pin_token(user)))
+    return wallets
+
+
+class LockTimer:
+    """connection.execute_wrapper() callback timing lock-taking statements"""
+
+    __slots__ = ('elapsed',)
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip()[:32].upper()
+        if not (statement.startswith(('BEGIN', 'UPDATE "ACCOUNTS_WALLET"')) or 'FOR UPDATE' in sql.upper()):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+class Worker(threading.Thread):
+    def __init__(self, wallets, operations, seed, bill_ratio, external_ratio, max_amount):
+        super().__init__(daemon=True)
+        self.wallets = wallets
+        self.operations = operations
+        self.rng = random.Random(seed)
+        self.bill_ratio = bill_ratio
+        self.external_ratio = external_ratio
+        self.max_amount = max_amount
+        self.latencies = []
+        self.lock_waits = []
+        self.outcomes = {OK: 0, REFUSED: 0, FAILED: 0}
+        self.external_out = Decimal('0.00')
+        self.error_examples = []
+
+    def run(self):
+        from django.db import connection
+
+        try:
+            for _ in range(self.operations):
+                self.run_one(connection)
+        finally:
+            connection.close()
+
+    def run_one(self, connection):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        from .models import User
+        from .views import BillPaymentView, TransferView
+
+        user_id, _, pin_token = self.rng.choice(self.wallets)
+        amount = Decimal(self.rng.randint(100, self.max_amount * 100)) / 100
+        roll = self.rng.random()
+        if roll < self.bill_ratio:
+            view, path, external = BillPaymentView, 'bill/', True
+            data = {'type': 'AIRTIME', 'amount': str(amount), 'phone_number': '08031234567', 'pin_token': pin_token}
+        elif roll < self.bill_ratio + self.external_ratio:
+            view, path, external = TransferView, 'transfer/', True
+            data = {'amount': str(amount), 'account_number': '0123456789', 'bank_code': '058',
+                    'recipient_name': 'External Payee', 'pin_token': pin_token}
+        else:
+            recipient = self.rng.choice([w for w in self.wallets if w[0] != user_id])
+            view, path, external = TransferView, 'transfer/', False
+            data = {'amount': str(amount), 'account_number': recipient[1], 'bank_code': '050', 'pin_token': pin_token}
+
+        request = APIRequestFactory().post('/api/auth/' + path, data, format='json')
+        timer = LockTimer()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                # Load the user per request, as JWT authentication does; a cached
+                # user.wallet would hide stale reads
+                force_authenticate(request, user=User.objects.get(pk=user_id))
+                response = view.as_view()(request)
+            status, body = response.status_code, response.data
+        except Exception as e:
+            status, body = 599, repr(e)
+        self.latencies.append(time.perf_counter() - start)
+        self.lock_waits.append(timer.elapsed)
+
+        if status == 200:
+            self.outcomes[OK] += 1
+            if external:
+                self.external_out += amount
+        elif status == 400 and isinstance(body, dict) and body.get('error') == 'Insufficient funds':
+            self.outcomes[REFUSED] += 1
+        else:
+            self.outcomes[FAILED] += 1
+            if len(self.error_examples) < 5:
+                self.error_examples.append(f'{path} {status} {str(body)[:200]}')
+
+
+def run_process(index, wallets, threads, operations, seed, bill_ratio, external_ratio, max_amount):
+    """Run `threads` workers sharing `operations`; returns their merged results"""
+    workers = [
+        Worker(wallets, operations // threads + (i < operations % threads), f'{seed}:{index}:{i}',
+               bill_ratio, external_ratio, max_amount)
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return {
+        'latencies': [x for w in workers for x in w.latencies],
+        'lock_waits': [x for w in workers for x in w.lock_waits],
+        'outcomes': {key: sum(w.outcomes[key] for w in workers) for key in (OK, REFUSED, FAILED)},
+        'external_out': sum((w.external_out for w in workers), Decimal('0.00')),
+        'error_examples': [e for w in workers for e in w.error_examples],
+    }
+
+
+def _run_process(args):
+    return run_process(*args)
+
+
+def run(wallets, operations, threads=8, processes=2, seed=0, bill_ratio=0.2, external_ratio=0.1, max_amount=50):
+    """
+    Spread `operations` over `processes` forked processes of `threads` threads
+    each (processes=0 runs the threads in this process). Returns a report dict.
+    """
+    from django.db import connections
+
+    jobs = max(processes, 1)
+    args = [
+        (i, wallets, threads, operations // jobs + (i < operations % jobs), seed, bill_ratio, external_ratio, max_amount)
+        for i in range(jobs)
+    ]
+    start = time.perf_counter()
+    if processes:
+        # Children must open their own connections
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.map(_run_process, args)
+    else:
+        results = [_run_process(args[0])]
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(x for r in results for x in r['latencies'])
+    lock_waits = sorted(x for r in results for x in r['lock_waits'])
+    return {
+        'operations': len(latencies),
+        'processes': processes,
+        'threads': threads,
+        'elapsed_s': round(elapsed, 2),
+        'ops_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'outcomes': {key: sum(r['outcomes'][key] for r in results) for key in (OK, REFUSED, FAILED)},
+        'latency_ms': {f'p{p}': round(percentile(latencies, p) * 1000, 2) for p in (50, 95, 99)},
+        'lock_wait_ms': {
+            'total': round(sum(lock_waits) * 1000, 2),
+            'mean': round(sum(lock_waits) / len(lock_waits) * 1000, 2) if lock_waits else 0.0,
+            'p95': round(percentile(lock_waits, 95) * 1000, 2),
+            'p99': round(percentile(lock_waits, 99) * 1000, 2),
+        },
+        'external_out': str(sum((r['external_out'] for r in results), Decimal('0.00'))),
+        'error_examples': [e for r in results for e in r['error_examples']][:10],
+    }
+
+
+def check(wallets, initial_total, external_out):
+    """Balance invariants after a run, as human-readable problems (empty when all hold)"""
+    from django.db.models import Sum
+
+    from .models import Transaction, Wallet
+
+    user_ids = [user_id for user_id, _, _ in wallets]
+    balances = dict(Wallet.objects.filter(user_id__in=user_ids).values_list('pk', 'balance'))
+    sums = dict(
+        Transaction.objects.filter(wallet_id__in=balances).values('wallet_id')
+        .annotate(total=Sum('amount')).values_list('wallet_id', 'total')
+    )
+
+    problems = []
+    for wallet_id, balance in sorted(balances.items()):
+        if balance < 0:
+            problems.append(f"wallet {wallet_id}: negative balance {balance}")
+        # SQLite sums decimals as floats
+        total = Decimal(str(sums.get(wallet_id) or 0)).quantize(Decimal('0.01'))
+        if balance != total:
+            problems.append(f"wallet {wallet_id}: balance {balance} != sum of transactions {total}")
+
+    final_total = sum(balances.values(), Decimal('0.00'))
+    expected = initial_total - Decimal(external_out)
+    if final_total != expected:
+        problems.append(f"money not conserved: total {final_total}, expected {expected} "
+                        f"({initial_total} minus {external_out} paid out)")
+    return problems
@@ -1,3 +1,2191 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .benchmark import LoadDriver, compare, parse_mix, percentile, seed_bench_users
+
+
+# Stands in for Redis where a test needs a cache every worker would share
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'owo-test-cache'),
+}}
+
+
+def _report(**endpoints):
+    return {'meta': {}, 'endpoints': endpoints}
+
+
+def _row(p50=10.0, p95=20.0, p99=30.0, rps=100.0, count=100, errors=0):
+    return {'count': count, 'errors': errors, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'rps': rps}
+
+
+class BenchmarkMathTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('transfer=20,transactions=80'), {'transfer': 20.0, 'transactions': 80.0})
+        with self.assertRaises(ValueError):
+            parse_mix('withdraw=1')
+
+    def test_compare_within_threshold(self):
+        baseline = _report(transfer=_row())
+        current = _report(transfer=_row(p50=11.0, p95=23.0, p99=35.0, rps=85.0))
+        self.assertEqual(compare(current, baseline, threshold=0.2), [])
+
+    def test_compare_flags_latency_and_throughput_regressions(self):
+        baseline = _report(transfer=_row())
+        current = _report(transfer=_row(p95=30.0, rps=50.0))
+        problems = compare(current, baseline, threshold=0.2)
+        self.assertEqual(problems, ['transfer: p95_ms 20.0 -> 30.0', 'transfer: rps 100.0 -> 50.0'])
+
+    def test_compare_flags_errors_and_ignores_new_endpoints(self):
+        current = _report(bill=_row(errors=5))
+        self.assertEqual(compare(current, _report(), max_error_rate=0.01), ['bill: 5/100 requests failed'])
+
+    @override_settings(OWO_WALLET_SHARDS=['default'])
+    def test_seeding_refuses_databases_not_named_for_benchmarks(self):
+        from unittest import mock
+
+        from django.core.management import CommandError, call_command
+        from django.db import connections
+
+        from .benchmark import non_bench_databases
+
+        command = 'accounts.management.commands.bench_api'
+        for name, unsafe in (('owobank', ['default']), ('/srv/db/owo.sqlite3', ['default']),
+                             ('test_owobank', []), ('/srv/db/owo_bench.sqlite3', [])):
+            with mock.patch.dict(connections['default'].settings_dict, NAME=name):
+                self.assertEqual(non_bench_databases(), unsafe, name)
+
+        with mock.patch.dict(connections['default'].settings_dict, NAME='owobank'), \
+                mock.patch(f'{command}.seed_bench_users') as seed, \
+                mock.patch(f'{command}.Command.drive', return_value=_report()), \
+                mock.patch(f'{command}.Command.print_report'):
+            with self.assertRaisesMessage(CommandError, "Refusing to seed"):
+                call_command('bench_api', url='http://127.0.0.1:8000/api/auth/', seed_users=True)
+            seed.assert_not_called()
+
+            call_command('bench_api', url='http://127.0.0.1:8000/api/auth/', seed_users=True,
+                         i_know_this_is_not_prod=True)
+            seed.assert_called_once_with(20)
+
+
+@override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}, OWO_WALLET_SHARDS=['default'],
+    OWO_BANK_VERIFY_DELAY=0,
+)
+class BenchmarkSmokeTests(LiveServerTestCase):
+    """A tiny run of the bench_api driver, so the scenarios keep matching the API"""
+
+    def test_driver_runs_every_scenario(self):
+        users = seed_bench_users(3, transactions_per_user=5)
+        # Bill payments sleep for their simulated provider call; keep the run short
+        mix = {'login': 1, 'transfer': 1, 'transactions': 1, 'statement': 1, 'verify_account': 1, 'profile': 1, 'real_time': 1}
+        driver = LoadDriver(self.live_server_url + '/api/auth/', users, mix=mix, concurrency=1, max_requests=70)
+        report = driver.run()
+
+        self.assertEqual(set(report['endpoints']), set(mix))
+        for scenario, row in report['endpoints'].items():
+            self.assertEqual(row['errors'], 0, f"{scenario}: {report['error_examples'].get(scenario)}")
+
+
+class QueryBudgetHarness:
+    """
+    Pins the exact number of queries each endpoint runs, at several table
+    sizes. A count that changes with the number of rows is an N+1; a count that
+    drifts from its budget is a regression (or an improvement, so lower the
+    budget).
+
+    Subclasses define CASES: name -> (budget, request). `request` is called
+    with the test case and returns the response. Each request runs in a
+    savepoint that is rolled back, so cases never see each other's writes.
+    """
+
+    ROW_COUNTS = (1, 10, 1000)
+    CASES = {}
+
+    def seed(self, rows):
+        raise NotImplementedError
+
+    def measure(self, request):
+        from django.core.cache import cache
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+
+        from .bloom import registration_index
+
+        cache.clear()
+        # Steady state: the registration index is built once per process
+        registration_index.build()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = request(self)
+            transaction.set_rollback(True)
+        return response, queries
+
+    def check_budgets(self):
+        seeded = 0
+        for rows in self.ROW_COUNTS:
+            self.seed(rows - seeded)
+            seeded = rows
+            for name, (budget, request) in self.CASES.items():
+                with self.subTest(case=name, rows=rows):
+                    response, queries = self.measure(request)
+                    self.assertLess(response.status_code, 400, f"{name}: {getattr(response, 'content', b'')[:300]}")
+                    self.assertEqual(
+                        len(queries), budget,
+                        f"{name} at {rows} rows ran {len(queries)} queries, budget is {budget}:\n"
+                        + '\n'.join(q['sql'] for q in queries.captured_queries),
+                    )
+
+
+def _seed_users(prefix, count, start):
+    from decimal import Decimal
+
+    from django.contrib.auth.hashers import make_password
+
+    from .models import Transaction, User, Wallet
+    from .sharding import bulk_create_wallets
+    from .utils import phone_hash
+
+    password = make_password('pass-word-1')
+    users = User.objects.bulk_create([
+        User(
+            email=f'{prefix}{i}@example.com', phone_number=f'0816{i:07d}', phone_hash=phone_hash(f'0816{i:07d}'),
+            first_name='Seed', last_name=f'User{i}', nin=f'7{i:010d}', password=password,
+            wallet_account_number=f'816{i:07d}',
+        )
+        for i in range(start, start + count)
+    ])
+    wallets = bulk_create_wallets([
+        Wallet(user=user, account_number=user.wallet_account_number, balance=Decimal('1000.00')) for user in users
+    ])
+    for wallet in wallets:
+        Transaction.objects.create(wallet=wallet, amount=Decimal('-10.00'), type='TRANSFER', description='Seed')
+
+
+def _api(method, path, data=None):
+    # '{test.x}' placeholders in the path and data are filled from the test case
+    def request(test):
+        payload = {k: v.format(test=test) if isinstance(v, str) else v for k, v in (data or {}).items()}
+        return getattr(test.api, method)('/api/auth/' + path.format(test=test), payload or None, format='json')
+    return request
+
+
+# Budgets are for one database: no replicas, one wallet shard
+@override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}, OWO_READ_REPLICAS=(), OWO_WALLET_SHARDS=['default'],
+)
+class EndpointQueryBudgetTests(QueryBudgetHarness, TestCase):
+    CASES = {
+        'export_statement': (2, _api('get', 'statement/export/{test.statement.statement_id}/json')),
+        'test_export': (1, _api('get', 'statement/test/STM-1/json')),
+        'health-check': (0, _api('get', 'health/')),
+        'generate_statement': (10, _api('post', 'statement/generate/', {'period': 'this_year'})),
+        'statement_history': (2, _api('get', 'statement/history/')),
+        'debug_request': (1, _api('get', 'debug-request/')),
+        'banks_list': (1, _api('get', 'banks/')),
+        'beneficiaries_list': (2, _api('get', 'beneficiaries/')),
+        'beneficiaries_list_top': (2, _api('get', 'beneficiaries/?top=5')),
+        'beneficiaries_list_page': (2, _api('get', 'beneficiaries/?page_size=20')),
+        'search_beneficiaries': (2, _api('get', 'beneficiaries/search/?q=Ben')),
+        'create_beneficiary': (4, _api('post', 'beneficiaries/create/', {
+            'name': 'New Person', 'account_number': '0123456789', 'bank_code': '058',
+        })),
+        'delete_beneficiary': (5, _api('delete', 'beneficiaries/{test.beneficiary.id}/delete/')),
+        'update_beneficiary': (5, _api('put', 'beneficiaries/{test.beneficiary.id}/update/', {'nickname': 'Bobby'})),
+        'contacts_match': (3, _api('post', 'contacts/match/', {'phone_numbers': ['08030000001', '08169999999']})),
+        'verify_account': (2, _api('get', 'verify-account/?account_number={test.bob.wallet.account_number}')),
+        'verify_account_post': (2, _api('post', 'verify-account/', {
+            'account_number': '{test.bob.wallet.account_number}', 'bank_code': '050',
+        })),
+        # Includes checking that the phone-derived account number is free
+        'register': (9, _api('post', 'register/', {
+            'email': 'new@example.com', 'phone_number': '08050000009', 'password': 'pass-word-1', 'password2': 'pass-word-1',
+            'pin': '5937', 'pin2': '5937', 'first_name': 'New', 'last_name': 'User',
+            'nin': '12345678909', 'date_of_birth': '1990-01-01',
+        })),
+        # The lookup is always a query, so "available" is never stale
+        'register_availability': (2, _api('get', 'register/availability/?email=free@example.com&nin=12345678901')),
+        'login': (1, _api('post', 'login/', {'email': 'alice@example.com', 'password': 'pass-word-1'})),
+        'wallet': (2, _api('get', 'wallet/')),
+        'transfer': (10, _api('post', 'transfer/', {
+            'amount': '5.00', 'account_number': '{test.bob.wallet.account_number}', 'pin': '4826',
+        })),
+        'bill': (7, _api('post', 'bill/', {'type': 'AIRTIME', 'amount': '100', 'phone_number': '08031234567', 'pin': '4826'})),
+        'profile': (2, _api('get', 'profile/')),
+        'transactions': (3, _api('get', 'transactions/')),
+        'real_time_data': (4, _api('get', 'real-time-data/')),
+        'verify_nin': (1, _api('post', 'verify-nin/', {
+            'nin': '12345678901', 'first_name': 'John', 'last_name': 'Doe', 'date_of_birth': '1990-01-01',
+        })),
+        'update_pin': (2, _api('post', 'update-pin/', {'old_pin': '4826', 'new_pin': '5937', 'confirm_pin': '5937'})),
+        'pin_step_up': (1, _api('post', 'pin/step-up/', {'pin': '4826'})),
+    }
+
+    def setUp(self):
+        from django.contrib.auth.hashers import make_password
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from .models import Beneficiary, Statement, User, Wallet
+
+        self.alice = User.objects.create_user('alice@example.com', '08030000000', 'pass-word-1', pin=make_password('4826'))
+        self.bob = User.objects.create_user('bob@example.com', '08030000001', 'pass-word-1', first_name='Bob')
+        for user in (self.alice, self.bob):
+            Wallet.objects.create(user=user, balance=1000000)
+        self.statement = Statement.objects.create(user=self.alice, period_start='2026-01-01', period_end='2026-01-31')
+        self.beneficiary = Beneficiary.objects.create(
+            user=self.alice, name='Bob', account_number=self.bob.wallet.account_number, bank_code='050', bank_name='Owo Bank',
+        )
+        self.seeded = 0
+
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+
+    def seed(self, rows):
+        from decimal import Decimal
+
+        from .models import Beneficiary, Statement, Transaction
+
+        start = self.seeded
+        self.seeded += rows
+        Transaction.objects.bulk_create([
+            Transaction(wallet=self.alice.wallet, amount=Decimal('25.00') * (-1) ** i, type='TRANSFER', description=f'Row {i}')
+            for i in range(start, start + rows)
+        ])
+        Beneficiary.objects.bulk_create([
+            Beneficiary(user=self.alice, name=f'Ben {i}', account_number=f'{i:010d}', bank_code='058', bank_name='GTBank', score=i)
+            for i in range(start, start + rows)
+        ])
+        Statement.objects.bulk_create([
+            Statement(user=self.alice, period_start='2026-01-01', period_end='2026-01-31', statement_id=f'STM-SEED{i}')
+            for i in range(start, start + rows)
+        ])
+        _seed_users('seed', rows, start)
+
+    def test_every_url_has_a_budget(self):
+        from . import urls
+
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names - set(self.CASES), set())
+
+    @override_settings(OWO_BILL_PROVIDER_DELAY=0)
+    def test_query_budgets(self):
+        self.check_budgets()
+
+
+def _quiet_request_log(test):
+    # Expected 4xx responses would otherwise log a warning each
+    import logging
+
+    logger = logging.getLogger('django.request')
+    test.addCleanup(logger.setLevel, logger.level)
+    logger.setLevel(logging.ERROR)
+
+
+def _changelist(model_name, query=''):
+    # '{test.x}' placeholders in the query are filled from the test case
+    def request(test):
+        return test.client.get(f'/admin/accounts/{model_name}/' + query.format(test=test))
+    return request
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class AdminChangelistQueryBudgetTests(QueryBudgetHarness, TestCase):
+    CASES = {
+        'user': (5, _changelist('user')),
+        'wallet': (4, _changelist('wallet')),
+        'transaction': (4, _changelist('transaction')),
+        # + the wallet's label, and the date drill-down within that wallet
+        'transaction_by_wallet': (7, _changelist('transaction', '?wallet={test.wallet_id}')),
+        'transaction_search': (4, _changelist('transaction', '?q=staff-seed0@example.com&type=TRANSFER')),
+        'statement': (5, _changelist('statement')),
+        'outboundemail': (5, _changelist('outboundemail')),
+    }
+
+    def setUp(self):
+        from .models import User
+
+        self.admin = User.objects.create_superuser('admin@example.com', '08030000099', 'pass-word-1')
+        self.client.force_login(self.admin)
+        self.seeded = 0
+
+    def seed(self, rows):
+        from .models import OutboundEmail, Statement, User
+
+        start = self.seeded
+        self.seeded += rows
+        _seed_users('staff-seed', rows, start)
+        users = User.objects.filter(email__startswith='staff-seed').order_by('-id')[:rows]
+        if not start:
+            self.wallet_id = users[0].wallet.pk
+        Statement.objects.bulk_create([
+            Statement(user=user, period_start='2026-01-01', period_end='2026-01-31', statement_id=f'STM-ADMIN{user.pk}')
+            for user in users
+        ])
+        OutboundEmail.objects.bulk_create([
+            OutboundEmail(subject='Hi', body='Hello', from_email='admin@owo.bank', to=f'user{i}@example.com')
+            for i in range(start, start + rows)
+        ])
+
+    def test_every_accounts_model_admin_has_a_budget(self):
+        from django.contrib import admin
+
+        registered = {model._meta.model_name for model in admin.site._registry if model._meta.app_label == 'accounts'}
+        self.assertEqual(registered - set(self.CASES), set())
+
+    def test_query_budgets(self):
+        self.check_budgets()
+
+    def test_wallet_search_uses_prefix_indexes(self):
+        from django.db import connection
+
+        from .models import User, Wallet
+
+        if connection.vendor != 'sqlite':
+            self.skipTest("plan text checked on SQLite only")
+        # LIKE is case-insensitive on SQLite, so only the NOCASE indexes from migration 0015 can serve it
+        for queryset, name in ((Wallet.objects.filter(account_number__startswith='803'), 'wallet_account_prefix_idx'),
+                               (User.objects.filter(email__startswith='ada'), 'user_email_prefix_idx'),
+                               (User.objects.filter(phone_number__startswith='0803'), 'user_phone_prefix_idx')):
+            self.assertIn(f'USING INDEX {name}', queryset.explain())
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class LedgerTests(TestCase):
+    def setUp(self):
+        from decimal import Decimal
+
+        from .models import User, Wallet
+
+        self.alice = Wallet.objects.create(
+            user=User.objects.create_user('ledger-a@example.com', '08030000101', 'pass-word-1'), balance=Decimal('50.00'),
+        )
+        self.bob = Wallet.objects.create(
+            user=User.objects.create_user('ledger-b@example.com', '08030000102', 'pass-word-1'), balance=Decimal('0.00'),
+        )
+
+    def test_debit_refuses_overdraft(self):
+        from decimal import Decimal
+
+        from . import ledger
+
+        ledger.debit(self.alice, Decimal('50.00'))
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.debit(self.alice, Decimal('0.01'))
+        self.assertEqual(ledger.balance(self.alice), Decimal('0.00'))
+
+    def test_move_is_all_or_nothing_in_either_lock_order(self):
+        from decimal import Decimal
+
+        from . import ledger
+
+        from .models import Transaction
+
+        entry = {'type': 'TRANSFER', 'description': 'Ledger test'}
+        # Bob has the higher pk, so moving from him credits Alice first
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.move(self.bob, self.alice, Decimal('10.00'), entry, entry)
+        self.assertEqual(ledger.balance(self.alice), Decimal('50.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+        ledger.move(self.alice, self.bob, Decimal('20.00'), entry, entry)
+        debit = ledger.move(self.bob, self.alice, Decimal('5.00'), entry, entry)
+        self.assertEqual((ledger.balance(self.alice), ledger.balance(self.bob)), (Decimal('35.00'), Decimal('15.00')))
+        self.assertEqual((debit.wallet_id, debit.amount), (self.bob.pk, Decimal('-5.00')))
+        self.assertEqual(Transaction.objects.count(), 4)
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'], OWO_BILL_PROVIDER_DELAY=0,
+                   REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+class BillPaymentTests(TestCase):
+    def setUp(self):
+        from decimal import Decimal
+
+        from rest_framework.test import APIClient
+
+        from .models import User, Wallet
+        from .pin import issue_pin_token
+
+        _quiet_request_log(self)
+        user = User.objects.create_user('bill@example.com', '08030000111', 'pass-word-1')
+        self.wallet = Wallet.objects.create(user=user, balance=Decimal('50.00'))
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+        self.purchase = {'type': 'AIRTIME', 'amount': '20.00', 'phone_number': '08031234567',
+                         'pin_token': issue_pin_token(user)}
+
+    def test_provider_failure_reverses_the_debit(self):
+        from decimal import Decimal
+        from unittest import mock
+
+        from . import bills, ledger
+        from .models import Transaction
+
+        with mock.patch.object(bills.StubBillProvider, 'purchase', side_effect=bills.BillProviderError("declined")):
+            response = self.api.post('/api/auth/bill/', self.purchase, format='json')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(ledger.balance(self.wallet), Decimal('50.00'))
+        debit, reversal = Transaction.objects.order_by('pk')
+        self.assertEqual((debit.amount, reversal.amount), (Decimal('-20.00'), Decimal('20.00')))
+        self.assertEqual(reversal.description, 'Reversal: Airtime purchase for 08031234567')
+
+        # Reversing again is a no-op
+        ledger.reverse(self.wallet, debit)
+        self.assertEqual(ledger.balance(self.wallet), Decimal('50.00'))
+
+    def test_successful_purchase_stays_debited(self):
+        from decimal import Decimal
+
+        from . import ledger
+
+        response = self.api.post('/api/auth/bill/', self.purchase, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['new_balance'], '30.00')
+        self.assertEqual(ledger.balance(self.wallet), Decimal('30.00'))
+
+
+class WalletStressTests(SimpleTestCase):
+    """
+    A small `manage.py stress_wallets` run. It needs its own file-backed
+    database shared by several processes, so it runs as a subprocess.
+    """
+
+    def test_concurrent_transfers_and_bills_keep_balances_consistent(self):
+        import json
+        import subprocess
+        import sys
+        import tempfile
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as report_file:
+            result = subprocess.run(
+                [sys.executable, '-m', 'django', 'stress_wallets', '--wallets', '4', '--balance', '200',
+                 '--operations', '400', '--processes', '2', '--threads', '4', '--report', report_file.name],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=600,
+            )
+            self.assertEqual(result.returncode, 0, result.stdout[-2000:] + result.stderr[-2000:])
+            report = json.load(report_file)
+
+        self.assertEqual(report['operations'], 400)
+        self.assertEqual(report['problems'], [])
+        self.assertEqual(report['outcomes']['failed'], 0)
+        # Balances are small enough that some requests must be refused
+        self.assertGreater(report['outcomes']['insufficient_funds'], 0)
+        self.assertGreater(report['outcomes']['ok'], 0)
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class ReconcileTests(TestCase):
+    def setUp(self):
+        from decimal import Decimal
+
+        from .models import Transaction, Wallet
+
+        _seed_users('reconcile', 5, 0)
+        self.wallets = list(Wallet.objects.filter(user__email__startswith='reconcile').order_by('pk'))
+        # _seed_users leaves each wallet with one -10.00 transfer
+        for wallet in self.wallets:
+            Transaction.objects.create(wallet=wallet, amount=Decimal('30.00'), type='DEPOSIT', description='In')
+        Wallet.objects.filter(pk__in=[w.pk for w in self.wallets]).update(balance=Decimal('20.00'))
+
+    def reconcile(self, **options):
+        import io
+
+        from django.core.management import call_command
+
+        call_command('reconcile', workers=0, chunk_size=2, stdout=io.StringIO(), **options)
+
+    def test_consistent_balances_pass(self):
+        self.reconcile()
+
+    def test_mismatches_are_reported(self):
+        import csv
+        import os
+        import tempfile
+
+        from django.core.management import CommandError
+
+        from .models import Wallet
+
+        broken = self.wallets[1]
+        Wallet.objects.filter(pk=broken.pk).update(balance='19.50')
+        report = os.path.join(tempfile.mkdtemp(), 'mismatches.csv')
+        with self.assertRaisesMessage(CommandError, "1 balances don't match"):
+            self.reconcile(report=report)
+        with open(report, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(
+            [(r['wallet_id'], r['balance'], r['transactions_total'], r['difference']) for r in rows],
+            [(str(broken.pk), '19.50', '20.00', '-0.50')],
+        )
+
+    def test_resumes_from_checkpoint(self):
+        import os
+        import tempfile
+
+        from .models import Wallet
+        from .reconcile import Checkpoint
+
+        path = os.path.join(tempfile.mkdtemp(), 'reconcile.json')
+        max_id = self.wallets[-1].pk
+        # Pretend a previous run finished every range but the last one
+        checkpoint = Checkpoint(path, 2, {'default': max_id})
+        last = max_id // 2 * 2
+        for alias, start, _ in checkpoint.ranges():
+            if start != last:
+                checkpoint.record(alias, start, 0, [])
+        checkpoint.save()
+
+        # A mismatch in an already checked range is not revisited
+        Wallet.objects.filter(pk=self.wallets[0].pk).update(balance='1.00')
+        self.reconcile(checkpoint=path)
+
+        resumed = Checkpoint.load(path)
+        self.assertEqual(len(resumed.done), resumed.total_ranges)
+        self.assertEqual(resumed.checked, Wallet.objects.filter(pk__gte=last).count())
+
+
+@override_settings(OWO_READ_REPLICAS=('replica',), OWO_REPLICA_PIN_SECONDS=5, CACHES=SHARED_CACHES)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        from .models import User
+
+        cache.clear()
+        self.user = User.objects.create_user('replica@example.com', '08030000201', 'pass-word-1')
+
+    def probe(self, method):
+        """Where a ReplicaReadMixin view's queries would be routed"""
+        from rest_framework.response import Response
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from rest_framework.views import APIView
+
+        from .models import Transaction
+        from .replicas import ReplicaReadMixin, ReplicaRouter
+
+        class ProbeView(ReplicaReadMixin, APIView):
+            def get(self, request):
+                return Response({'db': ReplicaRouter().db_for_read(Transaction)})
+
+            post = get
+
+        request = getattr(APIRequestFactory(), method)('/probe/')
+        force_authenticate(request, user=self.user)
+        return ProbeView.as_view()(request).data['db']
+
+    def test_safe_requests_read_from_a_replica(self):
+        from .models import Transaction
+        from .replicas import ReplicaRouter
+
+        self.assertEqual(self.probe('get'), 'replica')
+        self.assertIsNone(self.probe('post'))
+        # Nothing leaks out of the request
+        self.assertIsNone(ReplicaRouter().db_for_read(Transaction))
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from .middleware import ReplicaPinMiddleware
+        from .replicas import read_alias
+
+        self.assertEqual(read_alias(self.user), 'replica')
+        request = RequestFactory().post('/api/auth/transfer/')
+        request.user = self.user
+        ReplicaPinMiddleware(lambda request: HttpResponse())(request)
+
+        self.assertEqual(read_alias(self.user), 'default')
+        self.assertIsNone(self.probe('get'))
+
+    def test_pins_need_a_shared_cache(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from django.http import HttpResponse
+
+        from .middleware import ReplicaPinMiddleware
+
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local), self.assertRaises(ImproperlyConfigured):
+            ReplicaPinMiddleware(lambda request: HttpResponse())
+
+    def test_writes_always_go_to_the_primary(self):
+        from .models import Transaction
+        from .replicas import ReplicaRouter, replica_alias
+
+        token = replica_alias.set('replica')
+        try:
+            self.assertEqual(ReplicaRouter().db_for_write(Transaction), 'default')
+            self.assertFalse(ReplicaRouter().allow_migrate('replica', 'accounts'))
+        finally:
+            replica_alias.reset(token)
+
+
+@skipUnless('replica_1' in settings.DATABASES, "set DATABASE_REPLICA_URLS to run against a replica alias")
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}, CACHES=SHARED_CACHES)
+class ReplicaReadAfterWriteTests(TransactionTestCase):
+    """
+    End to end against a real replica alias (a TEST MIRROR of the primary).
+    The replica has its own connection, so the writes must be committed.
+    """
+
+    databases = '__all__'
+
+    def test_fresh_transfer_is_read_from_the_primary(self):
+        from django.core.cache import cache
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from .models import User
+        from .pin import issue_pin_token
+
+        cache.clear()
+        _seed_users('replica-rw', 2, 0)
+        alice, bob = User.objects.filter(email__startswith='replica-rw').order_by('pk')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(alice)}')
+
+        with CaptureQueriesContext(connections['replica_1']) as replica_queries:
+            client.get('/api/auth/transactions/')
+        self.assertTrue(replica_queries.captured_queries)
+
+        response = client.post('/api/auth/transfer/', {
+            'amount': '5.00', 'account_number': bob.wallet.account_number, 'pin_token': issue_pin_token(alice),
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        with CaptureQueriesContext(connections['replica_1']) as replica_queries:
+            response = client.get('/api/auth/transactions/')
+        self.assertEqual(replica_queries.captured_queries, [])
+        self.assertEqual(response.json()[0]['amount'], '-5.00')
+
+
+@override_settings(OWO_WALLET_SHARDS=['default', 'shard_a', 'shard_b'])
+class ShardRoutingTests(SimpleTestCase):
+    def test_account_numbers_spread_stably_over_shards(self):
+        import zlib
+        from collections import Counter
+
+        from .sharding import shard_for
+
+        placed = Counter(shard_for(f'816{i:07d}') for i in range(3000))
+        self.assertEqual(set(placed), {'default', 'shard_a', 'shard_b'})
+        self.assertGreater(min(placed.values()), 800)
+        # crc32, not hash(): the same in every process
+        self.assertEqual(shard_for('8160000000'), ['default', 'shard_a', 'shard_b'][zlib.crc32(b'8160000000') % 3])
+
+    def test_wallets_and_transactions_follow_the_account_number(self):
+        from .models import Beneficiary, Transaction, User, Wallet
+        from .sharding import ShardRouter, shard_for
+
+        router = ShardRouter()
+        user = User(email='shard@example.com', wallet_account_number='8160000042')
+        wallet = Wallet(user=user, account_number='8160000042')
+        alias = shard_for('8160000042')
+
+        self.assertEqual(router.db_for_write(Wallet, instance=wallet), alias)
+        self.assertEqual(router.db_for_read(Wallet, instance=user), alias)  # user.wallet
+        self.assertEqual(router.db_for_write(Transaction, instance=Transaction(wallet=wallet)), alias)
+        # Back from a wallet to its user, and anything else: default
+        self.assertEqual(router.db_for_read(User, instance=wallet), 'default')
+        self.assertIsNone(router.db_for_read(Beneficiary))
+
+    @override_settings(OWO_WALLET_SHARDS=['default'])
+    def test_one_shard_routes_nothing(self):
+        from .models import Wallet
+        from .sharding import ShardRouter
+
+        self.assertIsNone(ShardRouter().db_for_write(Wallet, instance=Wallet(account_number='8160000042')))
+
+
+@skipUnless('shard_1' in settings.DATABASES, "set DATABASE_SHARD_URLS to run against a second shard")
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+class CrossShardTransferTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        from decimal import Decimal
+
+        from .models import User, Wallet
+        from .sharding import shard_for
+
+        # One user per shard
+        phones = {}
+        for i in range(100):
+            phones.setdefault(shard_for(f'817{i:07d}'), f'0817{i:07d}')
+        self.alice, self.bob = (
+            User.objects.create_user(f'cross-{n}@example.com', phones[alias], 'pass-word-1', first_name=n.title())
+            for n, alias in (('alice', 'default'), ('bob', 'shard_1'))
+        )
+        for user in (self.alice, self.bob):
+            Wallet.objects.create(user=user, balance=Decimal('100.00'))
+
+    def transfer(self, amount):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from .pin import issue_pin_token
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+        return client.post('/api/auth/transfer/', {
+            'amount': amount, 'account_number': self.bob.wallet_account_number,
+            'pin_token': issue_pin_token(self.alice),
+        }, format='json')
+
+    def wallets(self):
+        from .models import Wallet
+
+        return [Wallet.objects.get_by_account(user.wallet_account_number) for user in (self.alice, self.bob)]
+
+    def balances(self):
+        return tuple(str(wallet.balance) for wallet in self.wallets())
+
+    def test_transfer_across_shards(self):
+        from decimal import Decimal
+
+        from . import ledger
+        from .models import ShardTransfer, Transaction
+
+        response = self.transfer('30.00')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['new_balance'], '70.00')
+        self.assertEqual(self.balances(), ('70.00', '130.00'))
+        self.assertEqual(list(ShardTransfer.objects.values_list('state', flat=True)), [ShardTransfer.COMPLETED])
+        # Each leg is written on its wallet's shard
+        self.assertEqual(Transaction.objects.using('shard_1').get().counterparty, 'Alice')
+
+        # A saga whose debit is refused fails without moving anything
+        entry = {'type': 'TRANSFER', 'description': 'Too much'}
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.move(*self.wallets(), Decimal('500.00'), entry, entry)
+        self.assertEqual(ShardTransfer.objects.latest('pk').state, ShardTransfer.FAILED)
+        self.assertEqual(self.balances(), ('70.00', '130.00'))
+
+    def test_failed_credit_is_resumed_once(self):
+        from datetime import timedelta
+        from unittest import mock
+
+        from django.db import OperationalError
+
+        from . import ledger
+        from .models import ShardTransfer
+
+        credit = ledger.credit
+        with mock.patch.object(ledger, 'credit', side_effect=OperationalError("shard_1 is down")):
+            response = self.transfer('30.00')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(self.balances(), ('70.00', '100.00'))
+        self.assertEqual(ShardTransfer.objects.get().state, ShardTransfer.DEBITED)
+
+        self.assertIs(ledger.credit, credit)
+        self.assertEqual(ledger.resume_transfers(timedelta(0)), {ShardTransfer.COMPLETED: 1})
+        self.assertEqual(ledger.resume_transfers(timedelta(0)), {})
+        self.assertEqual(self.balances(), ('70.00', '130.00'))
+
+    def test_failed_debit_fails_cleanly(self):
+        from datetime import timedelta
+        from unittest import mock
+
+        from django.db import OperationalError
+
+        from . import ledger
+        from .models import ShardTransfer
+
+        _quiet_request_log(self)
+        with mock.patch.object(ledger, 'debit', side_effect=OperationalError("server closed the connection")), \
+                self.assertLogs('accounts.ledger', 'WARNING'):
+            response = self.transfer('30.00')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn('not debited', response.json()['error'])
+        self.assertEqual(self.balances(), ('100.00', '100.00'))
+        self.assertEqual(ShardTransfer.objects.get().state, ShardTransfer.FAILED)
+
+        # The shard is unreachable, so nobody knows whether the debit applied
+        with mock.patch.object(ledger, 'debit', side_effect=OperationalError("server closed the connection")), \
+                mock.patch.object(ledger, 'step_applied', side_effect=OperationalError("could not connect")), \
+                self.assertLogs('accounts.ledger', 'WARNING'):
+            response = self.transfer('30.00')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(ShardTransfer.objects.latest('pk').state, ShardTransfer.PENDING)
+        # ... until resume_transfers finds it never did
+        self.assertEqual(ledger.resume_transfers(timedelta(0)), {ShardTransfer.FAILED: 1})
+        self.assertEqual(self.balances(), ('100.00', '100.00'))
+
+    def test_failed_refund_is_resumed(self):
+        from datetime import timedelta
+        from decimal import Decimal
+        from unittest import mock
+
+        from django.db import OperationalError
+
+        from . import ledger
+        from .models import ShardTransfer
+
+        entry = {'type': 'TRANSFER', 'description': 'To a closed account'}
+        saga = ShardTransfer.objects.create(
+            sender_account=self.alice.wallet_account_number, recipient_account='8179999999', amount=Decimal('30.00'),
+            debit_entry=entry, credit_entry=entry,
+        )
+        # The recipient is gone, and the sender's shard drops the refund
+        with mock.patch.object(ledger, 'credit', side_effect=OperationalError("server closed the connection")), \
+                self.assertLogs('accounts.ledger', 'WARNING'), \
+                self.assertRaisesMessage(ledger.TransferFailed, "refund is being processed"):
+            ledger.run_saga(saga)
+        saga.refresh_from_db()
+        self.assertEqual(saga.state, ShardTransfer.DEBITED)
+        self.assertEqual(self.balances(), ('70.00', '100.00'))
+
+        self.assertEqual(ledger.resume_transfers(timedelta(0)), {ShardTransfer.COMPENSATED: 1})
+        self.assertEqual(self.balances(), ('100.00', '100.00'))
+
+
+@override_settings(OWO_BANK_VERIFY_DELAY=0.2)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        from .models import Transaction, User, Wallet
+
+        self.alice = User.objects.create_user('async-a@example.com', '08030000301', 'pass-word-1', first_name='Alice')
+        self.bob = User.objects.create_user('async-b@example.com', '08030000302', 'pass-word-1', first_name='Bob')
+        for user in (self.alice, self.bob):
+            Wallet.objects.create(user=user, balance='100.00')
+        Transaction.objects.create(wallet=self.alice.wallet, amount='-5.00', type='TRANSFER', description='Async')
+
+    async def both(self, name, method, path, data=None):
+        """(sync view's data, async view's data) for the same request"""
+        from asgiref.sync import sync_to_async
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        from . import views
+
+        def request():
+            request = getattr(APIRequestFactory(), method)(path, data, format='json')
+            force_authenticate(request, user=self.alice)
+            return request
+
+        sync_response = await sync_to_async(getattr(views, name).as_view())(request())
+        async_response = await getattr(views, 'Async' + name).as_view()(request())
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        return sync_response.data, async_response.data
+
+    async def test_async_variants_answer_like_the_sync_views(self):
+        account = self.bob.wallet_account_number
+        for name, method, path, data in [
+            ('VerifyAccountView', 'get', f'/?account_number={account}', None),
+            ('VerifyAccountView', 'get', '/?account_number=8999999999', None),
+            ('VerifyAccountView', 'post', '/', {'account_number': account, 'bank_code': '050'}),
+            ('VerifyAccountView', 'post', '/', {'account_number': '0123456789', 'bank_code': '058'}),
+            ('UserProfileView', 'get', '/', None),
+            ('RealTimeDataView', 'get', '/', None),
+        ]:
+            with self.subTest(view=name, method=method, data=data):
+                sync_data, async_data = await self.both(name, method, path, data)
+                sync_data.pop('last_updated', None)
+                async_data.pop('last_updated', None)
+                self.assertEqual(async_data, sync_data)
+
+    async def test_bank_lookups_wait_concurrently(self):
+        import asyncio
+        import time
+
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        from .views import AsyncVerifyAccountView
+
+        view = AsyncVerifyAccountView.as_view()
+
+        async def verify():
+            request = APIRequestFactory().post('/', {'account_number': '0123456789', 'bank_code': '058'}, format='json')
+            force_authenticate(request, user=self.alice)
+            return await view(request)
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(verify() for _ in range(10)))
+        # One event loop; one after the other would take 10 x 0.2s
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual({r.data['user_name'] for r in responses}, {'Jane Smith'})
+
+
+class StartupTests(SimpleTestCase):
+    def test_url_conf_does_not_import_pdf_rendering(self):
+        # Every worker imports the URLconf; reportlab belongs to the export path only
+        import subprocess
+        import sys
+
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, django; django.setup(); import config.urls; print('reportlab' in sys.modules)"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_warm_up_queries_only_for_the_registration_index(self):
+        # SimpleTestCase fails on any query; the index build is covered by RegistrationIndexTests
+        import sys
+        from unittest import mock
+
+        from .warmup import warm_up
+
+        with mock.patch('accounts.warmup.registration_index') as index:
+            warm_up()
+        index.build.assert_called_once_with()
+        self.assertIn('argon2', sys.modules)
+
+
+class PinTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.hashers import make_password
+        from rest_framework.test import APIClient
+
+        from .models import User
+        from .throttling import get_backend
+
+        get_backend().reset()
+        _quiet_request_log(self)
+        self.user = User.objects.create_user('pin@example.com', '08030000401', 'pass-word-1')
+        self.user.pin = make_password('4826')
+        self.user.save()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_step_up_issues_a_token_authorize_pin_accepts(self):
+        from .pin import authorize_pin
+
+        response = self.api.post('/api/auth/pin/step-up/', {'pin': '4826'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(authorize_pin(self.user, {'pin_token': response.data['pin_token']}))
+        self.assertFalse(authorize_pin(self.user, {'pin_token': 'forged'}))
+
+        self.assertEqual(self.api.post('/api/auth/pin/step-up/', {'pin': '0000'}, format='json').status_code, 401)
+
+    def test_token_expires(self):
+        import time
+        from unittest import mock
+
+        from .pin import PIN_TOKEN_TTL, check_pin_token, issue_pin_token
+
+        token = issue_pin_token(self.user)
+        with mock.patch('time.time', return_value=time.time() + PIN_TOKEN_TTL + 5):
+            self.assertFalse(check_pin_token(self.user, token))
+
+    def test_pin_change_invalidates_tokens(self):
+        from .pin import check_pin_token, issue_pin_token
+
+        token = issue_pin_token(self.user)
+        response = self.api.post(
+            '/api/auth/update-pin/', {'old_pin': '4826', 'new_pin': '3917', 'confirm_pin': '3917'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertFalse(check_pin_token(self.user, token))
+
+    def test_verify_rehashes_legacy_hashes(self):
+        from django.contrib.auth.hashers import make_password
+
+        from .models import User
+        from .pin import verify_pin
+
+        self.user.pin = make_password('4826', hasher='pbkdf2_sha256')
+        self.user.save()
+        self.assertTrue(verify_pin(self.user, '4826'))
+        self.assertTrue(User.objects.get(pk=self.user.pk).pin.startswith('argon2$'))
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'pin': '3/hour'}})
+    def test_pin_guesses_are_throttled(self):
+        statuses = [
+            self.api.post('/api/auth/pin/step-up/', {'pin': f'{guess:04d}'}, format='json').status_code
+            for guess in range(4)
+        ]
+        self.assertEqual(statuses, [401, 401, 401, 429])
+        # Shares the budget with PIN changes
+        response = self.api.post(
+            '/api/auth/update-pin/', {'old_pin': '4826', 'new_pin': '3917', 'confirm_pin': '3917'}, format='json',
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'pin': '3/hour'}})
+    def test_raw_pin_transfers_share_the_pin_budget(self):
+        from .pin import issue_pin_token
+
+        transfer = {'amount': '5.00', 'account_number': '0000000000'}
+        statuses = [
+            self.api.post('/api/auth/transfer/', {**transfer, 'pin': f'{guess:04d}'}, format='json').status_code
+            for guess in range(3)
+        ]
+        self.assertEqual(statuses, [400, 400, 400])
+        response = self.api.post('/api/auth/transfer/', {**transfer, 'pin': '0003'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        response = self.api.post('/api/auth/bill/', {'type': 'AIRTIME', 'amount': '5.00', 'pin': '0004'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        # A step-up token isn't a guess
+        response = self.api.post(
+            '/api/auth/transfer/', {**transfer, 'pin_token': issue_pin_token(self.user)}, format='json',
+        )
+        self.assertNotEqual(response.status_code, 429)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        from .throttling import get_backend
+
+        get_backend().reset()
+        _quiet_request_log(self)
+
+    def test_token_bucket_refills_evenly(self):
+        from unittest import mock
+
+        from .throttling import MemoryBackend
+
+        backend = MemoryBackend()
+        with mock.patch('accounts.throttling.time') as clock:
+            clock.monotonic.return_value = 100.0
+            self.assertEqual([backend.consume('k', 3, 60)[0] for _ in range(4)], [True, True, True, False])
+            # One token every 20s
+            self.assertAlmostEqual(backend.consume('k', 3, 60)[1], 20.0)
+            clock.monotonic.return_value = 110.0
+            self.assertFalse(backend.consume('k', 3, 60)[0])
+            clock.monotonic.return_value = 120.0
+            self.assertTrue(backend.consume('k', 3, 60)[0])
+            self.assertFalse(backend.consume('k', 3, 60)[0])
+            # Other keys have their own bucket
+            self.assertTrue(backend.consume('other', 3, 60)[0])
+
+    def test_sliding_window_weights_the_previous_window(self):
+        from unittest import mock
+
+        from .throttling import CacheBackend
+
+        backend = CacheBackend()
+        with mock.patch('accounts.throttling.time') as clock:
+            clock.time.return_value = 600.0  # start of a 60s window
+            self.assertEqual(sum(backend.consume('sliding-test', 10, 60)[0] for _ in range(11)), 10)
+            allowed, wait = backend.consume('sliding-test', 10, 60)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 60.0)
+
+            # A quarter into the next window 7.5 of the previous 10 still count
+            clock.time.return_value = 675.0
+            self.assertEqual([backend.consume('sliding-test', 10, 60)[0] for _ in range(4)], [True, True, True, False])
+            # ... until 30% of it has slid out
+            self.assertAlmostEqual(backend.consume('sliding-test', 10, 60)[1], 3.0)
+
+    def test_sliding_window_counts_concurrent_requests_once_each(self):
+        from .throttling import CacheBackend
+
+        backend = CacheBackend()
+        # Another worker's request lands between this one's read and its increment
+        real_incr = backend.cache.incr
+
+        def incr(key, delta=1):
+            backend.cache.incr = real_incr
+            real_incr(key)
+            return real_incr(key, delta)
+
+        backend.cache.incr = incr
+        self.assertTrue(backend.consume('race-test', 2, 60)[0])
+        self.assertFalse(backend.consume('race-test', 2, 60)[0])
+
+    @override_settings(OWO_RATE_LIMIT_BACKEND='cache', CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_cache_backend_needs_a_shared_cache(self):
+        from unittest import mock
+
+        from django.core.exceptions import ImproperlyConfigured
+
+        from .throttling import get_backend
+
+        with mock.patch('accounts.throttling._backend', None), self.assertRaises(ImproperlyConfigured):
+            get_backend()
+        with mock.patch('accounts.throttling._backend', None), override_settings(CACHES=SHARED_CACHES):
+            self.assertEqual(type(get_backend()).__name__, 'CacheBackend')
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'login_ip': '2/min'}})
+    def test_forwarded_for_cannot_be_rotated(self):
+        from rest_framework.test import APIClient
+
+        api = APIClient()
+        statuses = [
+            api.post(
+                '/api/auth/login/', {'email': f'user{n}@example.com', 'password': 'wrong'}, format='json',
+                # The proxy appends the address it saw; everything before it is the client's to invent
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{n}, 203.0.113.7',
+            ).status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses, [401, 401, 429])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'login': '2/min'}})
+    def test_login_is_limited_per_email_with_retry_after(self):
+        from rest_framework.test import APIClient
+
+        api = APIClient()
+        statuses = [
+            api.post('/api/auth/login/', {'email': 'Victim@example.com', 'password': 'wrong'}, format='json').status_code
+            for _ in range(2)
+        ]
+        self.assertEqual(statuses, [401, 401])
+        # Same account, however it is spelled
+        response = api.post('/api/auth/login/', {'email': ' victim@example.com', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # Another account from the same client is unaffected
+        response = api.post('/api/auth/login/', {'email': 'other@example.com', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        from .outbox import queue_email
+
+        self.emails = [queue_email('Hi', 'Hello', 'admin@owo.bank', f'user{i}@example.com') for i in range(3)]
+
+    def failing_connection(self, fail_open=False):
+        from unittest import mock
+
+        connection = mock.Mock()
+        if fail_open:
+            connection.open.side_effect = ConnectionRefusedError("Connection refused")
+        connection.send_messages.side_effect = OSError("550 mailbox unavailable")
+        return connection
+
+    def test_claim_leases_rows_to_one_worker(self):
+        from django.utils import timezone
+
+        from .models import OutboundEmail
+        from .outbox import CLAIM_LEASE, claim_batch
+
+        first = claim_batch(batch_size=2)
+        self.assertEqual(len(first), 2)
+        leased = OutboundEmail.objects.filter(pk__in=[e.pk for e in first])
+        self.assertTrue(all(e.next_attempt_at > timezone.now() + CLAIM_LEASE / 2 for e in leased))
+        # Leased rows are not handed out again
+        self.assertEqual([e.pk for e in claim_batch(batch_size=2)], [self.emails[2].pk])
+        self.assertEqual(claim_batch(), [])
+
+    def test_sends_over_one_connection(self):
+        from django.core import mail
+
+        from .models import OutboundEmail
+        from .outbox import drain
+
+        self.assertEqual(drain(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {OutboundEmail.STATUS_SENT})
+
+    def test_failed_send_is_retried_with_backoff(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .models import OutboundEmail
+        from .outbox import backoff, drain
+
+        self.assertEqual([backoff(n).total_seconds() for n in (1, 2, 3, 20)], [30, 60, 120, 3600])
+        with self.assertLogs('accounts.outbox', 'WARNING'):
+            drain(self.failing_connection())
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_PENDING, 1))
+            self.assertIn('550', email.last_error)
+            self.assertLess(abs(email.next_attempt_at - timezone.now() - timedelta(seconds=30)), timedelta(seconds=5))
+
+    def test_last_attempt_dead_letters(self):
+        from .models import OutboundEmail
+        from .outbox import MAX_ATTEMPTS, drain
+
+        OutboundEmail.objects.update(attempts=MAX_ATTEMPTS - 1)
+        with self.assertLogs('accounts.outbox', 'WARNING'):
+            drain(self.failing_connection())
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {OutboundEmail.STATUS_FAILED})
+
+    def test_unreachable_server_reschedules_the_whole_batch(self):
+        from .models import OutboundEmail
+        from .outbox import CLAIM_LEASE, drain
+
+        connection = self.failing_connection(fail_open=True)
+        with self.assertLogs('accounts.outbox', 'WARNING'):
+            self.assertEqual(drain(connection), 3)
+        self.assertEqual(connection.open.call_count, 1)
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_PENDING, 1))
+            # Backoff, not the claim lease
+            self.assertLess(email.next_attempt_at - email.created_at, CLAIM_LEASE)
+
+    def test_drain_loop_survives_errors(self):
+        import io
+        from unittest import mock
+
+        from django.core.management import call_command
+
+        with mock.patch('accounts.management.commands.drain_outbox.drain', side_effect=[OSError("down"), 0]), \
+                mock.patch('accounts.management.commands.drain_outbox.time.sleep', side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('accounts.management.commands.drain_outbox', 'ERROR'):
+            out = io.StringIO()
+            call_command('drain_outbox', loop=True, interval=0, stdout=out)
+        self.assertIn("Processed 0", out.getvalue())
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class AccountNumberTests(TestCase):
+    def skip_unless_counter_row(self):
+        from django.db import connection
+
+        if connection.vendor == 'postgresql':
+            self.skipTest("Postgres reserves blocks with a sequence, outside the transaction")
+
+    def test_nuban_check_digit(self):
+        from .account_numbers import is_valid_nuban, nuban_check_digit
+
+        # 0*3 + 5*7 + 0*3 + 1*3 (serial 100000000) = 38 -> 2
+        self.assertEqual(nuban_check_digit(100000000), 2)
+        self.assertTrue(is_valid_nuban('1000000002'))
+        self.assertFalse(is_valid_nuban('1000000003'))
+        self.assertFalse(is_valid_nuban('100000000'))
+        self.assertFalse(is_valid_nuban('10000000a2'))
+        self.assertEqual(nuban_check_digit(100000000, bank_code='058'), (10 - (5 * 7 + 8 * 3 + 1 * 3) % 10) % 10)
+
+    def test_blocks_holding_legacy_numbers_are_skipped(self):
+        from .account_numbers import BLOCK_SIZE, SERIAL_START, reserve_block
+        from .models import User, Wallet
+
+        self.skip_unless_counter_row()
+        first = reserve_block()
+        legacy = SERIAL_START + (first + 1) * BLOCK_SIZE + 42
+        user = User.objects.create_user('legacy@example.com', '08030001001', 'pass-word-1')
+        Wallet.objects.create(user=user, account_number=f'{legacy:09d}7')
+        self.assertEqual(reserve_block(), first + 2)
+
+    def test_rolled_back_block_is_not_adopted(self):
+        from django.db import transaction
+
+        from .account_numbers import BlockAllocator, is_valid_nuban
+
+        self.skip_unless_counter_row()
+        allocator = BlockAllocator()
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            rolled_back = allocator.allocate()
+            1 / 0
+        self.assertEqual(allocator._range, [0, 0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                # Nothing was committed, so the same block and serial come up again
+                self.assertEqual(allocator.allocate(), rolled_back)
+        # ... and this time the block is shared once committed
+        self.assertEqual(allocator.allocate()[:9], f'{int(rolled_back[:9]) + 1:09d}')
+        self.assertTrue(is_valid_nuban(rolled_back))
+
+    def test_exhausted_number_space_is_an_error(self):
+        from unittest import mock
+
+        from .account_numbers import BLOCK_SIZE, SERIAL_START, BlockAllocator
+
+        with mock.patch('accounts.account_numbers.SERIAL_END', SERIAL_START + 2 * BLOCK_SIZE), \
+                mock.patch('accounts.account_numbers._next_block', return_value=2), \
+                self.assertRaisesMessage(RuntimeError, "Account number space exhausted"):
+            BlockAllocator().allocate()
+
+    def test_phone_spellings_of_a_taken_number_get_an_allocated_one(self):
+        from .account_numbers import is_valid_nuban
+        from .models import User, Wallet
+
+        user = User.objects.create_user('first@example.com', '08031234567', 'pass-word-1')
+        Wallet.objects.create(user=user)
+        self.assertEqual(user.wallet.account_number, '8031234567')
+
+        number = Wallet.account_number_for('+234 803 123 4567')
+        self.assertNotEqual(number, '8031234567')
+        self.assertTrue(is_valid_nuban(number))
+        self.assertEqual(Wallet.account_number_for('08039999999'), '8039999999')
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class ImportUsersTests(TestCase):
+    HEADER = 'email,phone_number,password,pin,first_name,last_name,nin,date_of_birth\n'
+
+    def row(self, i, **overrides):
+        values = {
+            'email': f'import{i}@example.com', 'phone_number': f'0803000{i:04d}', 'password': 'pass-word-1',
+            'pin': '1234', 'first_name': 'Ada', 'last_name': 'Obi', 'nin': f'{i:011d}', 'date_of_birth': '1990-01-01',
+        }
+        values.update(overrides)
+        return ','.join(values.values()) + '\n'
+
+    def run_import(self, *rows, **options):
+        import csv
+        import io
+        import os
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path, errors = os.path.join(tmp, 'users.csv'), os.path.join(tmp, 'errors.csv')
+            with open(path, 'w') as f:
+                f.write(self.HEADER + ''.join(rows))
+            # Threads: forked workers would have the pool close the test's connection
+            with mock.patch('accounts.management.commands.import_users.process_pool',
+                            lambda workers: ThreadPoolExecutor(max_workers=2)):
+                call_command('import_users', path, errors=errors, stdout=io.StringIO(), **options)
+            with open(errors) as f:
+                return [(int(line), field) for line, field, _ in list(csv.reader(f))[1:]]
+
+    def test_validation(self):
+        from datetime import date
+
+        from .models import User
+
+        too_young = date.today().replace(year=date.today().year - 14).isoformat()
+        errors = self.run_import(
+            self.row(1, pin='12a4'),
+            self.row(2, phone_number='12345'),
+            self.row(3, nin='123'),
+            self.row(4, date_of_birth=too_young),
+            self.row(5, password='short'),
+            self.row(6, email=''),
+            # AUTH_PASSWORD_VALIDATORS: common, all digits, close to the email
+            self.row(7, password='password'),
+            self.row(8, password='4829163750'),
+            self.row(9, password='import9example'),
+            dry_run=True,
+        )
+        self.assertEqual(errors, [(2, 'pin'), (3, 'phone_number'), (4, 'nin'), (5, 'date_of_birth'),
+                                  (6, 'password'), (7, 'email'), (8, 'password'), (9, 'password'), (10, 'password')])
+        self.assertFalse(User.objects.exists())
+
+    def test_duplicates_in_file_and_database(self):
+        from .models import User
+
+        User.objects.create_user('import9@example.com', '08030009999', 'pass-word-1')
+        errors = self.run_import(
+            self.row(1),
+            self.row(2, email='import1@example.com'),
+            self.row(3, nin=f'{1:011d}'),
+            self.row(9),
+            chunk_size=2,
+        )
+        self.assertEqual(errors, [(3, 'email'), (4, 'nin'), (5, 'email')])
+        self.assertEqual(User.objects.filter(email__startswith='import').count(), 2)
+
+    def test_import_creates_users_and_wallets(self):
+        from django.contrib.auth.hashers import check_password
+
+        from .models import User, Wallet
+
+        self.assertEqual(self.run_import(*(self.row(i) for i in range(1, 6)), chunk_size=2), [])
+        users = User.objects.filter(email__startswith='import').order_by('email')
+        self.assertEqual(users.count(), 5)
+        user = users[0]
+        self.assertTrue(user.check_password('pass-word-1'))
+        self.assertTrue(check_password('1234', user.pin))
+        self.assertTrue(user.phone_hash)
+        self.assertEqual(Wallet.objects.get(user=user).account_number, user.wallet_account_number)
+
+    def test_signup_race_is_reported_per_row(self):
+        from unittest import mock
+
+        from .models import User, Wallet
+
+        # Registered after the command checked for existing users
+        User.objects.create_user('import2@example.com', '08030008888', 'pass-word-1')
+        empty = {'email': set(), 'phone_number': set(), 'nin': set()}
+        with mock.patch('accounts.management.commands.import_users.Command.existing',
+                        side_effect=[empty, {**empty, 'email': {'import2@example.com'}}]):
+            errors = self.run_import(*(self.row(i) for i in range(1, 4)))
+        self.assertEqual(errors, [(3, 'email')])
+        self.assertEqual(Wallet.objects.filter(user__email__in=['import1@example.com', 'import3@example.com']).count(), 2)
+
+
+@skipUnless(len(settings.OWO_WALLET_SHARDS) > 1, "set DATABASE_SHARD_URLS to import across shards")
+class ShardedImportTests(TestCase):
+    databases = '__all__'
+    HEADER = ImportUsersTests.HEADER
+    row = ImportUsersTests.row
+    run_import = ImportUsersTests.run_import
+
+    def test_failed_chunk_leaves_nothing_on_any_database(self):
+        from unittest import mock
+
+        from django.db import DatabaseError
+
+        from .models import User, Wallet
+        from .sharding import bulk_create_wallets, shards
+
+        def wallets_then_fail(wallets, batch_size=None):
+            bulk_create_wallets(wallets, batch_size)
+            raise DatabaseError("connection lost")
+
+        rows = [self.row(i) for i in range(1, 9)]
+        with mock.patch('accounts.management.commands.import_users.bulk_create_wallets', wallets_then_fail), \
+                self.assertRaises(DatabaseError):
+            self.run_import(*rows)
+        self.assertFalse(User.objects.filter(email__startswith='import').exists())
+        for alias in shards():
+            self.assertFalse(Wallet.objects.using(alias).exists(), alias)
+
+
+class RegistrationIndexTests(TestCase):
+    def setUp(self):
+        from .bloom import RegistrationIndex
+
+        self.index = RegistrationIndex(refresh_interval=0, refresh_overlap=10)
+
+    def create_users(self, *numbers):
+        # bulk_create: as if another process created them, without the post_save hook
+        from .models import User
+
+        return User.objects.bulk_create([
+            User(email=f'bloom{n}@example.com', phone_number=f'0803100{n:04d}', nin=f'{n:011d}') for n in numbers
+        ])
+
+    def test_refresh_rereads_ids_that_committed_late(self):
+        from .models import User
+
+        self.create_users(1)
+        self.index.build()
+        self.assertFalse(self.index.might_contain('email', 'bloom2@example.com'))
+
+        late = self.create_users(2)[0]
+        # A later id committed first and was already read
+        self.index.last_id = User.objects.get(email='bloom1@example.com').pk + 5
+        self.assertTrue(self.index.might_contain('email', 'bloom2@example.com'))
+        self.assertTrue(self.index.is_registered('nin', late.nin))
+
+    def test_rereading_does_not_fill_the_filter(self):
+        self.create_users(*range(1, 6))
+        self.index.build()
+        counts = {field: f.count for field, f in self.index.filters.items()}
+        for _ in range(3):
+            self.index.refresh()
+        self.assertEqual({field: f.count for field, f in self.index.filters.items()}, counts)
+        self.assertEqual(counts['email'], 5)
+
+    def test_updated_values_are_not_reported_available(self):
+        from unittest import mock
+
+        from rest_framework.test import APIClient
+
+        from .models import User
+
+        user = self.create_users(1)[0]
+        self.index.build()
+        self.index.refresh_interval = 60
+        with mock.patch('accounts.signals.registration_index', self.index):
+            # Saved in this process: indexed straight away
+            user.email = 'renamed@example.com'
+            user.save()
+        self.assertTrue(self.index.might_contain('email', 'renamed@example.com'))
+
+        # Changed by another worker: the index never sees it, the availability check still does
+        User.objects.filter(pk=user.pk).update(phone_number='08039990000')
+        self.assertFalse(self.index.might_contain('phone_number', '08039990000'))
+        response = APIClient().get('/api/auth/register/availability/', {
+            'phone_number': '08039990000', 'email': 'bloom1@example.com', 'nin': user.nin,
+        })
+        self.assertEqual(response.json(), {
+            'email': {'available': True}, 'phone_number': {'available': False}, 'nin': {'available': False},
+        })
+
+    def test_warm_up_builds_the_index(self):
+        from unittest import mock
+
+        from django.db import DatabaseError
+
+        from .warmup import warm_up
+
+        self.create_users(1)
+        with mock.patch('accounts.warmup.registration_index', self.index):
+            warm_up()
+        self.index.refresh_interval = 60
+        with self.assertNumQueries(0):
+            self.assertTrue(self.index.might_contain('phone_number', '08031000001'))
+
+        # An unreachable database doesn't stop the server from starting
+        with mock.patch.object(self.index, 'build', side_effect=DatabaseError("down")), \
+                mock.patch('accounts.warmup.registration_index', self.index), \
+                self.assertLogs('accounts.warmup', 'WARNING'):
+            warm_up()
+
+
+class NINTests(TestCase):
+    IDENTITY = {'first_name': 'John', 'last_name': 'Doe', 'date_of_birth': '1990-01-01'}
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        from .throttling import get_backend
+
+        cache.clear()
+        get_backend().reset()
+        _quiet_request_log(self)
+
+    def provider(self, latency=0, error=None):
+        from unittest import mock
+
+        from .nin import StubNINProvider
+
+        provider = StubNINProvider()
+        provider.latency = latency
+        provider.calls = 0
+        lookup = provider.lookup
+
+        async def counting_lookup(nin):
+            provider.calls += 1
+            if error:
+                raise error
+            return await lookup(nin)
+
+        provider.lookup = counting_lookup
+        patcher = mock.patch('accounts.nin._provider', provider)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return provider
+
+    def test_match_requires_every_field(self):
+        from datetime import date
+
+        from .nin import STUB_IDENTITY, matches
+
+        self.assertTrue(matches(STUB_IDENTITY, 'john', ' Doe', date(1990, 1, 1)))
+        self.assertFalse(matches(STUB_IDENTITY, 'Jane', 'Doe', '1990-01-01'))
+        self.assertFalse(matches(STUB_IDENTITY, 'John', 'Doe', '1990-01-02'))
+        # Missing from what was supplied
+        self.assertFalse(matches(STUB_IDENTITY, 'John', 'Doe'))
+        self.assertFalse(matches(STUB_IDENTITY, '', 'Doe', '1990-01-01'))
+        # ... or from the vendor record
+        self.assertFalse(matches({**STUB_IDENTITY, 'last_name': None}, 'John', 'Doe', '1990-01-01'))
+        self.assertFalse(matches({'nin': '12345678901'}, 'John', 'Doe', '1990-01-01'))
+
+    def test_verify_view(self):
+        from rest_framework.test import APIClient
+
+        provider = self.provider()
+        api = APIClient()
+        response = api.post('/api/auth/verify-nin/', {'nin': '12345678901', **self.IDENTITY}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['last_name'], 'DOE')
+
+        response = api.post('/api/auth/verify-nin/', {**self.IDENTITY, 'nin': '12345678901', 'last_name': 'Roe'},
+                            format='json')
+        self.assertEqual((response.status_code, response.data['verified']), (400, False))
+        response = api.post('/api/auth/verify-nin/', {'nin': '12345678901'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        # All three answered from the cache
+        self.assertEqual(provider.calls, 1)
+
+    def test_provider_errors_are_not_returned(self):
+        from rest_framework.test import APIClient
+
+        from .nin import NINProviderError
+
+        self.provider(error=NINProviderError("401 Unauthorized: key sk_live_123 revoked"))
+        with self.assertLogs('accounts.views.auth', 'WARNING'):
+            response = APIClient().post('/api/auth/verify-nin/', {'nin': '12345678901', **self.IDENTITY}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('details', response.data)
+        self.assertNotIn('sk_live', response.content.decode())
+
+    def test_registration_reuses_a_matching_verification(self):
+        from datetime import date
+
+        from .nin import cached_verification, lookup_nin
+
+        provider = self.provider()
+        self.assertFalse(cached_verification('12345678901', 'John', 'Doe', date(1990, 1, 1)))
+        self.assertEqual(provider.calls, 0)  # never calls the provider
+
+        lookup_nin('12345678901')
+        self.assertTrue(cached_verification('12345678901', 'John', 'Doe', date(1990, 1, 1)))
+        self.assertFalse(cached_verification('12345678901', 'John', 'Doe', date(1991, 1, 1)))
+        self.assertFalse(cached_verification('12345678901', 'John', 'Doe', None))
+        self.assertEqual(provider.calls, 1)
+
+    def test_concurrent_lookups_share_one_call(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .nin import lookup_nin
+
+        provider = self.provider(latency=0.2)
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            records = list(pool.map(lookup_nin, ['12345678901'] * 5))
+        self.assertEqual(provider.calls, 1)
+        self.assertTrue(all(r == records[0] for r in records))
+
+
+class BeneficiarySearchTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        from .models import Beneficiary, User
+
+        cache.clear()
+        self.user = User.objects.create_user('search@example.com', '08030000501', 'pass-word-1')
+        for name, account in (('Ada Eze', '0123456789'), ('Adamu Bello', '0223456789'), ('Adaeze Okafor', '0323456789')):
+            Beneficiary.objects.create(user=self.user, name=name, account_number=account, bank_code='050', bank_name='Owo')
+
+    def search(self, q, limit=10):
+        from .beneficiaries import search_beneficiaries
+        from .views import BeneficiaryListView
+
+        return [row['name'] for row in search_beneficiaries(self.user, q, limit, BeneficiaryListView.format)]
+
+    def test_recent_uses_outrank_old_ones(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .beneficiaries import record_beneficiary_use
+
+        long_ago = timezone.now() - timedelta(days=90)
+        for _ in range(5):
+            record_beneficiary_use(self.user, '0223456789', '050', at=long_ago)
+        record_beneficiary_use(self.user, '0323456789', '050')
+        # One use today beats five from three months (six half-lives) ago
+        self.assertEqual(self.search('ada'), ['Adaeze Okafor', 'Adamu Bello', 'Ada Eze'])
+        self.assertEqual(self.search('03'), ['Adaeze Okafor'])
+
+    def test_longer_query_is_answered_from_the_cached_prefix(self):
+        self.search('ad')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.search('ada')), 3)
+            self.assertEqual(self.search('adae'), ['Adaeze Okafor'])
+            # Same cache entry however the query is spelled
+            self.assertEqual(self.search(' ADAE '), ['Adaeze Okafor'])
+
+    def test_changes_invalidate_cached_results(self):
+        from .beneficiaries import upsert_beneficiary_use
+        from .models import Beneficiary
+
+        self.assertEqual(len(self.search('ada')), 3)
+        Beneficiary.objects.filter(name='Ada Eze').get().delete()
+        self.assertEqual(len(self.search('ada')), 2)
+        upsert_beneficiary_use(self.user, '0423456789', '050', 'Adaobi Nwosu', 'Owo')
+        self.assertEqual(self.search('adao'), ['Adaobi Nwosu'])
+
+    def test_recorded_uses_reorder_cached_results(self):
+        from .beneficiaries import record_beneficiary_use
+
+        self.assertNotEqual(self.search('ada')[0], 'Adamu Bello')
+        record_beneficiary_use(self.user, '0223456789', '050')
+        self.assertEqual(self.search('ada')[0], 'Adamu Bello')
+
+    def test_invalidating_an_uncached_user_is_safe(self):
+        from django.core.cache import cache
+
+        from .beneficiaries import invalidate_search
+
+        invalidate_search(self.user.pk + 1000)
+        self.assertEqual(cache.get(f'bsearch-ver:{self.user.pk + 1000}'), 2)
+
+    def test_cache_keys_are_safe_for_any_query(self):
+        from django.core.cache.backends.base import memcache_key_warnings
+
+        from .beneficiaries import _search_key
+
+        for q in ('ada eze', 'x' * 300, 'ọ̀dúnayọ̀\n'):
+            self.assertEqual(list(memcache_key_warnings(_search_key(1, 1, q))), [])
+        self.assertEqual(self.search('a' * 100), [])
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class ContactMatchTests(TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        from .models import Beneficiary, User, Wallet
+        from .throttling import get_backend
+
+        get_backend().reset()
+        _quiet_request_log(self)
+        self.user = User.objects.create_user('contacts@example.com', '08030000601', 'pass-word-1')
+        self.ada = User.objects.create_user('adaeze.okafor@example.com', '08030000602', 'pass-word-1',
+                                            first_name='Adaeze', last_name='Okafor')
+        self.nameless = User.objects.create_user('tunde.private@example.com', '08030000603', 'pass-word-1')
+        for user in (self.user, self.ada, self.nameless):
+            Wallet.objects.create(user=user)
+        Beneficiary.objects.create(user=self.user, name='Ada', account_number=self.ada.wallet.account_number,
+                                   bank_code='050', bank_name='Owo Bank')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_matches_numbers_and_hashes_with_masked_names(self):
+        from .utils import phone_hash
+
+        response = self.api.post('/api/auth/contacts/match/', {
+            'phone_numbers': ['+234 803 000 0602', '08030000601', '08169999999'],
+            'phone_hashes': [phone_hash('08030000603')],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        matches = {m['input']: m for m in response.data['matches']}
+        # The caller's own number is left out
+        self.assertEqual(set(matches), {'+234 803 000 0602', phone_hash('08030000603')})
+
+        ada = matches['+234 803 000 0602']
+        self.assertEqual((ada['name'], ada['account_number'], ada['is_beneficiary']),
+                         ('A*** O***', self.ada.wallet.account_number, True))
+        nameless = matches[phone_hash('08030000603')]
+        self.assertEqual((nameless['name'], nameless['is_beneficiary']), ('Owo Bank customer', False))
+        self.assertNotIn('tunde', response.content.decode())
+        self.assertNotIn('Okafor', response.content.decode())
+
+    def test_rejects_oversized_and_malformed_requests(self):
+        from .views import ContactMatchView
+
+        response = self.api.post('/api/auth/contacts/match/', {'phone_numbers': '08030000602'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        too_many = [f'0803{i:07d}' for i in range(ContactMatchView.MAX_CONTACTS + 1)]
+        response = self.api.post('/api/auth/contacts/match/', {'phone_numbers': too_many}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'contacts': '2/min'}})
+    def test_is_throttled(self):
+        statuses = [
+            self.api.post('/api/auth/contacts/match/', {'phone_numbers': ['08030000602']}, format='json').status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'], REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+class TransferBeneficiaryHookTests(TransactionTestCase):
+    """The beneficiary hooks run after the transfer commits, so the writes must really commit"""
+
+    def setUp(self):
+        from decimal import Decimal
+
+        from rest_framework.test import APIClient
+
+        from .models import User, Wallet
+
+        self.alice = User.objects.create_user('hook-a@example.com', '08030000701', 'pass-word-1', first_name='Alice')
+        self.bob = User.objects.create_user('hook-b@example.com', '08030000702', 'pass-word-1', first_name='Bob')
+        for user in (self.alice, self.bob):
+            Wallet.objects.create(user=user, balance=Decimal('100.00'))
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def transfer(self, **extra):
+        from .pin import issue_pin_token
+
+        return self.api.post('/api/auth/transfer/', {
+            'amount': '10.00', 'account_number': self.bob.wallet.account_number,
+            'pin_token': issue_pin_token(self.alice), **extra,
+        }, format='json')
+
+    def test_saves_the_beneficiary(self):
+        from .models import Beneficiary
+
+        self.assertEqual(self.transfer(add_beneficiary=True).status_code, 200)
+        self.assertEqual(self.transfer().status_code, 200)
+        beneficiary = Beneficiary.objects.get(user=self.alice)
+        self.assertEqual((beneficiary.name, beneficiary.transfer_count), ('Bob', 2))
+
+    def test_beneficiary_failure_does_not_fail_the_transfer(self):
+        from decimal import Decimal
+        from unittest import mock
+
+        from django.db import DatabaseError
+
+        from .models import Beneficiary, Wallet
+
+        for target, extra in (('upsert_beneficiary_use', {'add_beneficiary': True}), ('record_beneficiary_use', {})):
+            with self.subTest(target), \
+                    mock.patch(f'accounts.views.wallet.{target}', side_effect=DatabaseError("deadlock detected")), \
+                    self.assertLogs('django.db.backends.base', 'ERROR'):
+                response = self.transfer(**extra)
+                self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Wallet.objects.get(user=self.alice).balance, Decimal('80.00'))
+        self.assertFalse(Beneficiary.objects.exists())
+
+
+class ProbeMiddlewareTests(SimpleTestCase):
+    def middleware(self):
+        from .middleware import ProbeMiddleware
+
+        def get_response(request):
+            raise AssertionError(f"{request.path} reached the rest of the stack")
+
+        return ProbeMiddleware(get_response)
+
+    def test_probes_are_answered_without_the_rest_of_the_stack(self):
+        import json
+
+        from django.test import RequestFactory
+
+        middleware = self.middleware()
+        for path in ('/healthz', '/healthz/'):
+            response = middleware(RequestFactory().get(path))
+            self.assertEqual((response.status_code, response.content), (200, b'OK'))
+            self.assertEqual(response['Cache-Control'], 'no-store')
+
+        response = middleware(RequestFactory().get('/api/auth/health/'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        body = json.loads(response.content)
+        self.assertEqual((body['status'], body['service']), ('healthy', 'OWO Banking API'))
+        self.assertIn('timestamp', body)
+
+    def test_probes_under_asgi(self):
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+
+        from .middleware import ProbeMiddleware
+
+        async def get_response(request):
+            raise AssertionError(f"{request.path} reached the rest of the stack")
+
+        response = async_to_sync(ProbeMiddleware(get_response))(RequestFactory().get('/healthz'))
+        self.assertEqual(response.content, b'OK')
+
+    def test_other_requests_pass_through(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from .middleware import ProbeMiddleware
+
+        middleware = ProbeMiddleware(lambda request: HttpResponse('view'))
+        for request in (RequestFactory().get('/api/auth/banks/'), RequestFactory().post('/api/auth/health/')):
+            self.assertEqual(middleware(request).content, b'view')
+
+    def test_first_in_the_stack(self):
+        # Nothing else (sessions, CSRF, request ids, metrics) runs for a probe
+        response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Request-ID', response)
+        self.assertEqual(settings.MIDDLEWARE[0], 'accounts.middleware.ProbeMiddleware')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        from .metrics import registry
+
+        registry.reset()
+        self.addCleanup(registry.reset)
+        _quiet_request_log(self)
+
+    def test_render_is_prometheus_text_format(self):
+        from .metrics import registry
+
+        for duration in (0.003, 0.02, 0.02, 30.0):
+            registry.record('transfer', 'POST', 200, duration, db_time=0.001, db_queries=4)
+        registry.record('transfer', 'POST', 503, 0.2, db_time=0.0, db_queries=0)
+        lines = registry.render().splitlines()
+
+        buckets = [line for line in lines if line.startswith('owo_request_duration_seconds_bucket')]
+        self.assertEqual(buckets[0], 'owo_request_duration_seconds_bucket{view="transfer",method="POST",le="0.005"} 1')
+        self.assertIn('owo_request_duration_seconds_bucket{view="transfer",method="POST",le="0.025"} 3', buckets)
+        # Cumulative, ending with +Inf == count
+        counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(buckets[-1], 'owo_request_duration_seconds_bucket{view="transfer",method="POST",le="+Inf"} 5')
+        self.assertIn('owo_request_duration_seconds_count{view="transfer",method="POST"} 5', lines)
+        self.assertIn('owo_request_duration_seconds_sum{view="transfer",method="POST"} 30.243000', lines)
+        self.assertIn('owo_request_db_queries_total{view="transfer",method="POST"} 16', lines)
+        self.assertIn('owo_requests_total{view="transfer",method="POST",status="2xx"} 4', lines)
+        self.assertIn('owo_requests_total{view="transfer",method="POST",status="5xx"} 1', lines)
+        for name, kind in (('owo_request_duration_seconds', 'histogram'), ('owo_request_db_seconds_total', 'counter'),
+                           ('owo_request_db_queries_total', 'counter'), ('owo_requests_total', 'counter')):
+            self.assertIn(f'# TYPE {name} {kind}', lines)
+
+    def test_workers_sharing_a_directory_are_summed(self):
+        import tempfile
+
+        from .metrics import MetricsRegistry
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Flushing on every record rather than at most once a second
+        worker_a, worker_b = MetricsRegistry(tmp.name, flush_interval=0), MetricsRegistry(tmp.name, flush_interval=0)
+        worker_a.record('transfer', 'POST', 200, 0.02, db_time=0.001, db_queries=4)
+        worker_b.record('transfer', 'POST', 500, 0.2, db_time=0.002, db_queries=3)
+        worker_b.record('banks_list', 'GET', 200, 0.001, db_time=0.0, db_queries=0)
+
+        # Whichever worker is scraped answers for both
+        for worker in (worker_a, worker_b):
+            lines = worker.render().splitlines()
+            self.assertIn('owo_request_duration_seconds_count{view="transfer",method="POST"} 2', lines)
+            self.assertIn('owo_request_db_queries_total{view="transfer",method="POST"} 7', lines)
+            self.assertIn('owo_requests_total{view="transfer",method="POST",status="5xx"} 1', lines)
+            self.assertIn('owo_requests_total{view="banks_list",method="GET",status="2xx"} 1', lines)
+
+    @override_settings(OWO_METRICS_TOKEN='scrape-secret')
+    def test_endpoint_requires_staff_or_the_scrape_token(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from .models import User
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+        staff = User.objects.create_user('metrics@example.com', '08030000801', 'pass-word-1', is_staff=True)
+        token = AccessToken.for_user(staff)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 200)
+        # Admin session
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(OWO_METRICS_SAMPLE_RATE=1)
+    def test_middleware_records_sampled_requests(self):
+        from django.test import Client
+
+        from .metrics import registry
+
+        # A new client loads the middleware with the overridden rate
+        response = Client().get('/api/auth/banks/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        (view, method), stats = next(iter(registry.snapshot().items()))
+        self.assertEqual((view, method, stats[2], stats[5]), ('banks_list', 'GET', 1, {'4xx': 1}))
+
+    def test_middleware_is_dropped_when_sampling_is_off(self):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        from .middleware import MetricsMiddleware
+
+        with self.settings(OWO_METRICS_SAMPLE_RATE=0), self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        from .models import User
+
+        _quiet_request_log(self)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(OWO_PROFILE_DIR=tmp.name))
+        self.staff = User.objects.create_user('profiler@example.com', '08030000901', 'pass-word-1', is_staff=True)
+
+    def profiles(self):
+        from .profiling import list_profiles
+
+        return [name for name, _, _ in list_profiles()]
+
+    def test_only_staff_can_ask_for_a_profile(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = self.client.get('/api/auth/banks/', HTTP_X_OWO_PROFILE='1')
+        self.assertNotIn('X-Owo-Profile-Id', response)
+        self.assertEqual(self.profiles(), [])
+
+        response = self.client.get('/api/auth/banks/?__profile=1',
+                                   HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.staff)}')
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Owo-Profile-Id']
+        self.assertRegex(name, r'^\d{8}-\d{6}-\d+-[0-9a-f]{6}-banks_list-\d+ms\.pstats$')
+        self.assertEqual(self.profiles(), [name])
+
+        # Listed and readable in the admin, by staff only
+        self.assertEqual(self.client.get('/admin/profiles/').status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get('/admin/profiles/'), name)
+        self.assertContains(self.client.get(f'/admin/profiles/{name}?format=txt'), 'function calls')
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fsettings.py').status_code, 404)
+
+    @override_settings(OWO_PROFILE_SAMPLE_RATE=1, OWO_PROFILE_MAX_FILES=2)
+    def test_sampling_keeps_the_newest_profiles(self):
+        import os
+        import time
+
+        from django.test import Client
+
+        from .profiling import profile_dir
+
+        client = Client()
+        names = []
+        for i in range(3):
+            names.append(client.get('/api/auth/banks/')['X-Owo-Profile-Id'])
+            # Distinct mtimes, which decide what is oldest
+            os.utime(profile_dir() / names[-1], (time.time() + i, time.time() + i))
+        self.assertEqual(len(set(names)), 3)
+        self.assertEqual(set(self.profiles()), set(names[1:]))
+
+    def test_unsampled_requests_are_not_profiled(self):
+        from unittest import mock
+
+        with mock.patch('accounts.profiling.cProfile.Profile') as profile:
+            self.client.get('/api/auth/banks/')
+        profile.assert_not_called()
+
+
+class QueuedLoggingTests(SimpleTestCase):
+    def handler(self, **kwargs):
+        import io
+
+        from .log import JSONFormatter, QueueingHandler, RequestIdFilter, SamplingFilter
+
+        stream = io.StringIO()
+        handler = QueueingHandler(stream, **kwargs)
+        handler.setFormatter(JSONFormatter())
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(SamplingFilter(rate=0))
+        self.addCleanup(handler.close)
+        return handler, stream
+
+    def logger(self, handler):
+        import logging
+
+        logger = logging.getLogger(f'accounts.tests.queued.{id(handler)}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def lines(self, handler, stream):
+        import json
+
+        handler._stop()  # drains the queue
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_lines_by_the_listener(self):
+        import threading
+
+        from .log import request_id
+
+        handler, stream = self.handler()
+        logger = self.logger(handler)
+        handler._ensure_listener()
+        target = handler._listener.handlers[0]
+        writers, emit = [], target.emit
+        target.emit = lambda record: (writers.append(threading.current_thread()), emit(record))
+
+        token = request_id.set('req-123')
+        try:
+            logger.info("Transfer of %s done", '5.00', extra={'wallet': 42})
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("Failed")
+        finally:
+            request_id.reset(token)
+        logger.warning("Outside a request")
+
+        first, second, third = self.lines(handler, stream)
+        self.assertEqual(first['msg'], "Transfer of 5.00 done")
+        self.assertEqual((first['level'], first['request_id'], first['wallet']), ('INFO', 'req-123', 42))
+        self.assertRegex(first['ts'], r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z$')
+        self.assertIn('ValueError: boom', second['exc'])
+        self.assertEqual(third['request_id'], '-')
+        # Written off the logging thread
+        self.assertNotIn(threading.current_thread(), writers)
+        self.assertEqual(len(writers), 3)
+
+    def test_sampled_events_follow_the_request_decision(self):
+        from .log import request_sampled
+
+        handler, stream = self.handler()
+        logger = self.logger(handler)
+        for sampled in (True, False):
+            token = request_sampled.set(sampled)
+            try:
+                logger.info("cache hit %s", sampled, extra={'sample': True})
+                logger.warning("slow query %s", sampled, extra={'sample': True})
+            finally:
+                request_sampled.reset(token)
+        # Outside a request, at rate 0
+        logger.info("cache hit outside", extra={'sample': True})
+        self.assertEqual([line['msg'] for line in self.lines(handler, stream)],
+                         ["cache hit True", "slow query True", "slow query False"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        from unittest import mock
+
+        handler, stream = self.handler(maxsize=2)
+        logger = self.logger(handler)
+        # No listener draining the queue
+        with mock.patch.object(handler, '_ensure_listener'):
+            for i in range(5):
+                logger.info("event %d", i)
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (2, 3))
+
+
+@override_settings(OWO_WALLET_SHARDS=['default'])
+class SeedLoadTests(TestCase):
+    OPTIONS = {'users': 6, 'txns_per_user': 12, 'beneficiaries_per_user': 3, 'statements_per_user': 2,
+               'days': 90, 'offset': 0}
+
+    def run_seed_load(self, **options):
+        import io
+        from datetime import datetime, timezone as dt_timezone
+
+        from django.core.management import call_command
+
+        end = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+        call_command('seed_load', stdout=io.StringIO(), end=end, **{**self.OPTIONS, **options})
+
+    def seed(self, **options):
+        """Everything seed_load wrote but the primary keys, then removed again"""
+        from .models import Beneficiary, Statement, Transaction, User, Wallet
+
+        self.run_seed_load(**options)
+        snapshot = {
+            'users': list(User.objects.order_by('email').values_list('email', 'phone_number', 'date_joined')),
+            'wallets': list(Wallet.objects.order_by('account_number').values_list('account_number', 'balance')),
+            'transactions': sorted(Transaction.objects.values_list(
+                'wallet__account_number', 'amount', 'type', 'description', 'timestamp', 'counterparty', 'account_number',
+            )),
+            'beneficiaries': sorted(Beneficiary.objects.values_list(
+                'user__email', 'account_number', 'bank_code', 'transfer_count', 'created_at', 'last_used',
+            )),
+            'statements': sorted(Statement.objects.values_list('statement_id', 'total_transactions', 'net_change')),
+        }
+        for model in (Statement, Beneficiary, Transaction, Wallet, User):
+            model.objects.all().delete()
+        return snapshot
+
+    def test_same_seed_same_data(self):
+        first = self.seed(seed=7)
+        self.assertEqual(len(first['users']), 6)
+        self.assertEqual(len(first['transactions']), 6 * 12)
+        self.assertTrue(first['beneficiaries'])
+        self.assertEqual(self.seed(seed=7), first)
+        self.assertNotEqual(self.seed(seed=8)['transactions'], first['transactions'])
+
+    def test_refuses_databases_not_named_for_load_tests(self):
+        from unittest import mock
+
+        from django.core.management import CommandError
+        from django.db import connections
+
+        from .models import User
+
+        with mock.patch.dict(connections['default'].settings_dict, NAME='owobank'):
+            with self.assertRaisesMessage(CommandError, "Refusing to seed load users"):
+                self.run_seed_load()
+            self.assertFalse(User.objects.exists())
+            self.run_seed_load(users=1, i_know_this_is_not_prod=True)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_balances_match_transactions_and_never_go_negative(self):
+        from decimal import Decimal
+
+        from .models import Wallet
+
+        self.run_seed_load()
+        for wallet in Wallet.objects.all():
+            running = Decimal('0.00')
+            for amount in wallet.transactions.order_by('timestamp', 'id').values_list('amount', flat=True):
+                running += amount
+                self.assertGreaterEqual(running, 0, wallet.account_number)
+            self.assertEqual(running, wallet.balance)
@@ -0,0 +1,203 @@
+"""
+Rate limiting for expensive endpoints (PIN hashing, upstream lookups, login).
+
+Views opt in with `throttle_scope` and `throttle_classes = RATE_LIMITS`.
+Limits come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] using the view's
+scope for the per-user limit and `<scope>_ip` for the per-IP limit. Denied
+requests get a 429 with a Retry-After header from DRF.
+
+Views that accept a raw PIN use PIN_RATE_LIMITS, which also charges any
+request carrying `pin` to the shared 'pin' scope.
+
+Two backends, picked with OWO_RATE_LIMIT_BACKEND:
+  'memory' - token bucket per key, per process (no I/O)
+  'cache'  - sliding-window counter in the default Django cache, shared by
+             every worker that points at the same cache (so not the
+             per-process local-memory cache; see CACHE_URL)
+Both are O(1) per request.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .utils import cache_is_process_local
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)"""
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period]
+
+
+class MemoryBackend:
+    """Token bucket per key; capacity is the limit, refilled evenly over the period"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period):
+        now = time.monotonic()
+        refill = limit / period
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * refill)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0
+            return False, (1 - bucket[0]) / refill
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBackend:
+    """
+    Sliding-window counter: the previous fixed window's count, weighted by how
+    much of it still overlaps the sliding window, plus the current count.
+    The current count is taken with add+incr, so concurrent requests each see
+    their own slot; a denied request gives its slot back.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def consume(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        current_key = f'rl:{key}:{window}'
+        previous_key = f'rl:{key}:{window - 1}'
+
+        previous = self.cache.get(previous_key, 0)
+        self.cache.add(current_key, 0, timeout=period * 2)
+        try:
+            # Requests already counted in this window, before this one
+            current = self.cache.incr(current_key) - 1
+        except ValueError:  # evicted between add and incr
+            self.cache.set(current_key, 1, timeout=period * 2)
+            current = 0
+        elapsed = (now % period) / period
+
+        if previous * (1 - elapsed) + current >= limit:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                pass
+            if current >= limit or not previous:
+                wait = period - (now % period)
+            else:
+                # Time until enough of the previous window has slid out
+                needed = 1 - (limit - current) / previous
+                wait = max(needed - elapsed, 0) * period
+            return False, wait
+        return True, 0
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'OWO_RATE_LIMIT_BACKEND', 'memory')
+                if name == 'cache' and cache_is_process_local():
+                    raise ImproperlyConfigured(
+                        "OWO_RATE_LIMIT_BACKEND='cache' needs a shared cache: set CACHE_URL, "
+                        "or use 'memory' for per-process limits."
+                    )
+                _backend = CacheBackend() if name == 'cache' else MemoryBackend()
+    return _backend
+
+
+class EndpointRateThrottle(BaseThrottle):
+    rate_suffix = ''
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def allow_request(self, request, view):
+        self._wait = 0
+        scope = self.get_scope(request, view)
+        if not scope:
+            return True
+
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope + self.rate_suffix))
+        if rate is None:
+            return True
+
+        allowed, self._wait = get_backend().consume(f'{scope}:{self.get_key(request, view)}', *rate)
+        return allowed
+
+    def wait(self):
+        # Whole seconds for the Retry-After header
+        return math.ceil(self._wait) if self._wait else None
+
+
+class UserRateThrottle(EndpointRateThrottle):
+    """Per authenticated user; anonymous callers fall back to view.throttle_user_field or IP"""
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        field = getattr(view, 'throttle_user_field', None)
+        if field and request.data.get(field):
+            return f'{field}:{str(request.data[field]).strip().lower()}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPRateThrottle(EndpointRateThrottle):
+    rate_suffix = '_ip'
+
+    def get_key(self, request, view):
+        return f'ip:{self.get_ident(request)}'
+
+
+class RawPinMixin:
+    """
+    Charge requests that carry a raw `pin` to the 'pin' scope, whatever the
+    view's own scope, so every endpoint that checks a PIN shares one guessing
+    budget. Requests authorized with a pin_token aren't charged.
+    """
+
+    def get_scope(self, request, view):
+        return 'pin' if request.data.get('pin') else None
+
+
+class RawPinUserRateThrottle(RawPinMixin, UserRateThrottle):
+    pass
+
+
+class RawPinIPRateThrottle(RawPinMixin, IPRateThrottle):
+    pass
+
+
+RATE_LIMITS = [UserRateThrottle, IPRateThrottle]
+# For views that accept a raw PIN as well as a pin_token
+PIN_RATE_LIMITS = RATE_LIMITS + [RawPinUserRateThrottle, RawPinIPRateThrottle]
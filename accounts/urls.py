@@ -1,15 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView
 from .views import (
     UserProfileView, NINVerificationView, GenerateStatementView, 
     ExportStatementView, StatementHistoryView, TestExportView,
-    RegisterView, WalletInfoView, TransferView, BillPaymentView, 
-    RecentTransactionsView, VerifyAccountView, RealTimeDataView, UpdatePinView, 
+    RegisterView, RegistrationAvailabilityView, LoginView, WalletInfoView, TransferView, BillPaymentView, 
+    RecentTransactionsView, VerifyAccountView, RealTimeDataView, UpdatePinView, PinStepUpView, 
     DebugRequestView, HealthCheckView,
-    BankListView, BeneficiaryListView,  # REMOVED duplicate VerifyAccountView here
-    CreateBeneficiaryView, DeleteBeneficiaryView, UpdateBeneficiaryView
+    BankListView, BeneficiaryListView, BeneficiarySearchView,  # REMOVED duplicate VerifyAccountView here
+    CreateBeneficiaryView, DeleteBeneficiaryView, UpdateBeneficiaryView,
+    ContactMatchView, AsyncVerifyAccountView, AsyncRealTimeDataView, AsyncUserProfileView
 )
 
+if settings.OWO_ASYNC_VIEWS:
+    # Native async variants for ASGI workers (accounts/async_api.py)
+    VerifyAccountView, RealTimeDataView, UserProfileView = (
+        AsyncVerifyAccountView, AsyncRealTimeDataView, AsyncUserProfileView
+    )
+
 urlpatterns = [
     path('statement/export/<str:statement_id>/<str:format>', 
          ExportStatementView.as_view(), 
@@ -31,15 +38,18 @@ urlpatterns = [
     # Beneficiary URLs
     path('banks/', BankListView.as_view(), name='banks_list'),
     path('beneficiaries/', BeneficiaryListView.as_view(), name='beneficiaries_list'),
+    path('beneficiaries/search/', BeneficiarySearchView.as_view(), name='search_beneficiaries'),
     path('beneficiaries/create/', CreateBeneficiaryView.as_view(), name='create_beneficiary'),
     path('beneficiaries/<int:beneficiary_id>/delete/', DeleteBeneficiaryView.as_view(), name='delete_beneficiary'),
     path('beneficiaries/<int:beneficiary_id>/update/', UpdateBeneficiaryView.as_view(), name='update_beneficiary'),
+    path('contacts/match/', ContactMatchView.as_view(), name='contacts_match'),
     # KEEP ONLY ONE verify-account path (for POST requests)
     path('verify-account/', VerifyAccountView.as_view(), name='verify_account'),
 
     # All other URLs
     path('register/', RegisterView.as_view(), name='register'),
-    path('login/', TokenObtainPairView.as_view(), name='login'),
+    path('register/availability/', RegistrationAvailabilityView.as_view(), name='register_availability'),
+    path('login/', LoginView.as_view(), name='login'),
     path('wallet/', WalletInfoView.as_view(), name='wallet'),
     path('transfer/', TransferView.as_view(), name='transfer'),
     path('bill/', BillPaymentView.as_view(), name='bill'),
@@ -49,4 +59,5 @@ urlpatterns = [
     path('real-time-data/', RealTimeDataView.as_view(), name='real_time_data'),
     path('verify-nin/', NINVerificationView.as_view(), name='verify_nin'),
     path('update-pin/', UpdatePinView.as_view(), name='update_pin'),
+    path('pin/step-up/', PinStepUpView.as_view(), name='pin_step_up'),
 ]
\ No newline at end of file
@@ -0,0 +1,73 @@
+import hashlib
+
+from django.utils import timezone
+
+
+def relative_time(value, now=None):
+    """'Just now', '5m ago', '3h ago', 'Yesterday', '4d ago' or 'Jan 05'"""
+    diff = (now or timezone.now()) - value
+
+    if diff.days == 0:
+        if diff.seconds < 60:
+            return "Just now"
+        elif diff.seconds < 3600:
+            return f"{diff.seconds // 60}m ago"
+        else:
+            return f"{diff.seconds // 3600}h ago"
+    elif diff.days == 1:
+        return "Yesterday"
+    elif diff.days < 7:
+        return f"{diff.days}d ago"
+    return value.strftime("%b %d")
+
+
+def normalize_phone(value):
+    """'+234 803 123 4567', '2348031234567', '8031234567' -> '08031234567'; None if not Nigerian"""
+    digits = ''.join(ch for ch in str(value) if ch.isdigit())
+    if digits.startswith('234') and len(digits) == 13:
+        digits = digits[3:]
+    if len(digits) == 10 and digits[0] in '789':
+        return '0' + digits
+    if len(digits) == 11 and digits[0] == '0':
+        return digits
+    return None
+
+
+def phone_hash(phone_number):
+    """SHA-256 hex of the normalized number, as sent by the contact-sync client"""
+    normalized = normalize_phone(phone_number)
+    return hashlib.sha256(normalized.encode()).hexdigest() if normalized else ''
+
+
+def masked_name(first_name, last_name):
+    """'Adaeze', 'Okafor' -> 'A*** O***': enough to recognise a contact, not to learn their name"""
+    parts = f"{first_name} {last_name}".split()
+    return ' '.join(f"{part[0].upper()}***" for part in parts) or "Owo Bank customer"
+
+
+def cache_is_process_local(alias='default'):
+    """True if CACHES[alias] is the local-memory backend, so no other worker sees what this one stores"""
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    return isinstance(caches[alias], LocMemCache)
+
+
+def staff_user(request):
+    """
+    The staff user behind a plain Django request, from the admin session or a
+    JWT bearer token, or None. For use outside DRF's authentication (middleware,
+    non-DRF endpoints).
+    """
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken
+
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            result = None
+        user = result[0] if result else None
+    return user if user and user.is_staff else None
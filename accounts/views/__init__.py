@@ -0,0 +1,42 @@
+"""
+API views, one module per domain. Everything is re-exported here, so
+`from accounts.views import TransferView` keeps working.
+
+Keep module-level imports light: with gunicorn's preload_app the master
+imports all of this once and the workers share it, but whatever is imported
+here is paid for by every process that loads the URLconf. Pull in heavy,
+rarely used libraries (reportlab for PDF statements) inside the code that
+needs them.
+"""
+from .auth import (
+    AsyncUserProfileView,
+    LoginView,
+    NINVerificationView,
+    PinStepUpView,
+    RegisterView,
+    RegistrationAvailabilityView,
+    UpdatePinView,
+    UserProfileView,
+)
+from .beneficiaries import (
+    BeneficiaryCursorPagination,
+    BeneficiaryListView,
+    BeneficiarySearchView,
+    ContactMatchView,
+    CreateBeneficiaryView,
+    DeleteBeneficiaryView,
+    UpdateBeneficiaryView,
+)
+from .statements import ExportStatementView, GenerateStatementView, StatementHistoryView, TestExportView
+from .system import CheckURLPatternsView, DebugRequestView, DebugURLView, HealthCheckView, MetricsView
+from .wallet import (
+    AsyncRealTimeDataView,
+    AsyncVerifyAccountView,
+    BankListView,
+    BillPaymentView,
+    RealTimeDataView,
+    RecentTransactionsView,
+    TransferView,
+    VerifyAccountView,
+    WalletInfoView,
+)
@@ -0,0 +1,226 @@
+"""Sign-up, sign-in, NIN verification, PIN management and the user profile"""
+import logging
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import permissions, views
+from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from ..async_api import AsyncAPIView
+from ..bloom import registration_index
+from ..models import User, Wallet
+from ..nin import NINProviderError, lookup_nin, matches
+from ..outbox import queue_email
+from ..pin import PIN_TOKEN_TTL, issue_pin_token, verify_pin
+from ..serializers import UserSerializer
+from ..throttling import RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+class LoginView(TokenObtainPairView):
+    # Password checks are the most expensive thing we do; limit per account and per IP
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'login'
+    throttle_user_field = 'email'
+
+class RegisterView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    @transaction.atomic
+    def post(self, request):
+        serializer = UserSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                with transaction.atomic():
+                    user = serializer.save()  # Wallet is now created in serializer
+            except IntegrityError:
+                # Registered by another worker since our index last refreshed
+                return Response({"error": "An account with these details already exists"}, status=400)
+            # Delivered after commit by the outbox worker, never inside this request
+            queue_email('Verify Owo Account', f'Click here: owo://verify/{user.id}', 'admin@owo.bank', user.email)
+            return Response(serializer.data, status=201)
+        return Response(serializer.errors, status=400)
+
+class RegistrationAvailabilityView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'availability'
+
+    def get(self, request):
+        """
+        Check whether ?email=, ?phone_number= and/or ?nin= are still free, in
+        one query. Not from the registration index: it never sees a value that
+        another worker changed a user to, and "available" has to be right.
+        """
+        values = {}
+        for field in ('email', 'phone_number', 'nin'):
+            value = request.GET.get(field, '').strip()
+            if value:
+                values[field] = value
+        if not values:
+            return Response({"error": "Provide email, phone_number or nin"}, status=400)
+
+        matches = Q()
+        for field, value in values.items():
+            matches |= Q(**{field: value})
+        taken = {
+            field
+            for row in User.objects.filter(matches).values_list(*values)
+            for field, value in zip(values, row) if value == values[field]
+        }
+        return Response({field: {"available": field not in taken} for field in values})
+
+class NINVerificationView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'nin'
+    
+    def post(self, request):
+        """
+        Verify NIN details
+        Expected payload: { "nin": "12345678901", "first_name": "John", "last_name": "Doe", "date_of_birth": "1990-01-01" }
+        """
+        nin = request.data.get('nin')
+        first_name = request.data.get('first_name', '').upper()
+        last_name = request.data.get('last_name', '').upper()
+        date_of_birth = request.data.get('date_of_birth')
+        
+        if not nin:
+            return Response({"error": "NIN is required"}, status=400)
+        
+        # Check if NIN already exists (the index answers most of these without a query).
+        # A signed-in user may still verify their own NIN.
+        user = request.user if request.user.is_authenticated else None
+        if registration_index.is_registered('nin', nin) and not (user and user.nin == nin):
+            return Response({"error": "NIN already registered"}, status=400)
+        
+        try:
+            # Cached and coalesced; see accounts/nin.py for the provider setup
+            record = lookup_nin(nin)
+        except NINProviderError as e:
+            # The vendor's error stays in the logs; it can describe their API or our credentials
+            logger.warning("NIN verification error: %s", e)
+            return Response({
+                "verified": False,
+                "error": "NIN verification is unavailable right now. Please try again later."
+            }, status=400)
+        
+        if not record or not matches(record, first_name, last_name, date_of_birth):
+            return Response({
+                "verified": False,
+                "error": "NIN verification failed. Please ensure details are correct."
+            }, status=400)
+        
+        if user and user.nin == nin and not user.is_nin_verified:
+            User.objects.filter(pk=user.pk).update(is_nin_verified=True)
+        
+        return Response({
+            "verified": True,
+            "message": "NIN verification successful",
+            "data": {
+                "first_name": record['first_name'],
+                "last_name": record['last_name'],
+                "date_of_birth": record['date_of_birth']
+            }
+        })
+
+class UpdatePinView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # Checks the current PIN, so it shares the step-up limit
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'pin'
+    
+    def post(self, request):
+        old_pin = request.data.get('old_pin')
+        new_pin = request.data.get('new_pin')
+        confirm_pin = request.data.get('confirm_pin')
+        
+        if not new_pin or not confirm_pin:
+            return Response({"error": "PIN fields are required"}, status=400)
+        
+        if len(new_pin) != 4 or not new_pin.isdigit():
+            return Response({"error": "PIN must be 4 digits"}, status=400)
+        
+        if new_pin != confirm_pin:
+            return Response({"error": "PINs do not match"}, status=400)
+        
+        # Check for simple patterns
+        if new_pin in ['1234', '0000', '1111', '4321', '2580']:
+            return Response({"error": "Please choose a stronger PIN"}, status=400)
+        
+        # If user already has a PIN, require old PIN
+        if request.user.pin:
+            if not old_pin:
+                return Response({"error": "Current PIN is required"}, status=400)
+            
+            if not verify_pin(request.user, old_pin):
+                return Response({"error": "Current PIN is incorrect"}, status=401)
+        
+        # Update the PIN
+        request.user.pin = make_password(new_pin)
+        request.user.save()
+        
+        return Response({
+            "message": "PIN updated successfully",
+            "status": "success"
+        })
+
+class PinStepUpView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # A 4-digit PIN has 10,000 values and a correct guess mints a token
+    # for every money endpoint
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'pin'
+
+    def post(self, request):
+        """
+        Verify the PIN once and return a short-lived token that TransferView and
+        BillPaymentView accept as `pin_token` in place of `pin`
+        """
+        if not verify_pin(request.user, request.data.get('pin')):
+            return Response({"error": "Invalid PIN"}, status=401)
+
+        return Response({
+            "pin_token": issue_pin_token(request.user),
+            "expires_in": PIN_TOKEN_TTL
+        })
+
+class UserProfileView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        try:
+            wallet = user.wallet
+        except User.wallet.RelatedObjectDoesNotExist:
+            # Create wallet if it doesn't exist
+            wallet = Wallet.objects.create(user=user)
+        return self.respond(user, wallet)
+
+    @staticmethod
+    def respond(user, wallet):
+        return Response({
+            'email': user.email,
+            'phone_number': user.phone_number,
+            'first_name': user.first_name if hasattr(user, 'first_name') else '',
+            'last_name': user.last_name if hasattr(user, 'last_name') else '',
+            'full_name': f"{user.first_name} {user.last_name}".strip() if user.first_name and user.last_name else user.email.split('@')[0],
+            'account_number': wallet.account_number,
+            'balance': str(wallet.balance),
+            'date_joined': user.date_joined.strftime("%B %Y"),
+            'is_email_verified': user.is_email_verified,
+            'is_active': user.is_active,
+        })
+
+class AsyncUserProfileView(AsyncAPIView, UserProfileView):
+    """UserProfileView on the async ORM"""
+
+    async def get(self, request):
+        user = request.user
+        try:
+            wallet = await Wallet.objects.aget_for_user(user)
+        except Wallet.DoesNotExist:
+            wallet = await Wallet.objects.acreate(user=user)
+        return self.respond(user, wallet)
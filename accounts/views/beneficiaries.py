@@ -0,0 +1,210 @@
+"""Saved beneficiaries: listing, typeahead search, contact matching and edits"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import permissions, views
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from ..banks import OWO_BANK_CODE
+from ..beneficiaries import SEARCH_MAX_RESULTS, search_beneficiaries
+from ..models import Beneficiary, User
+from ..replicas import ReplicaReadMixin
+from ..serializers import BeneficiarySerializer, CreateBeneficiarySerializer
+from ..throttling import RATE_LIMITS
+from ..utils import masked_name, normalize_phone, relative_time
+
+
+class BeneficiaryCursorPagination(CursorPagination):
+    ordering = ('-score', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class BeneficiaryListView(ReplicaReadMixin, views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        """
+        Get user's beneficiaries, most frecently used first.
+        ?top=N returns just the first N (quick-send row); ?cursor= / ?page_size=
+        switch to cursor pagination; otherwise the full list as before.
+        """
+        beneficiaries = Beneficiary.objects.filter(user=request.user).order_by('-score', '-id').only(
+            'id', 'name', 'account_number', 'bank_code', 'bank_name', 'nickname', 'last_used', 'transfer_count', 'score'
+        )
+        
+        top = request.GET.get('top')
+        if top:
+            try:
+                top = min(max(int(top), 1), 50)
+            except ValueError:
+                return Response({"error": "top must be a number"}, status=400)
+            return Response(self.format(beneficiaries[:top]))
+        
+        if 'cursor' in request.GET or 'page_size' in request.GET:
+            paginator = BeneficiaryCursorPagination()
+            page = paginator.paginate_queryset(beneficiaries, request, view=self)
+            return paginator.get_paginated_response(self.format(page))
+        
+        return Response(self.format(beneficiaries))
+    
+    @staticmethod
+    def format(beneficiaries):
+        # Format for frontend
+        now = timezone.now()
+        return [
+            {
+                'id': beneficiary.id,
+                'name': beneficiary.name,
+                'accountNumber': beneficiary.account_number,
+                'bank': beneficiary.bank_name,
+                'isOwobank': beneficiary.bank_code == OWO_BANK_CODE,
+                'nickname': beneficiary.nickname,
+                'lastTransfer': relative_time(beneficiary.last_used, now),
+                'transfersCount': beneficiary.transfer_count
+            }
+            for beneficiary in beneficiaries
+        ]
+
+class BeneficiarySearchView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        """Typeahead: ?q= prefix of name, nickname or account number; ?limit= (max 20)"""
+        q = request.GET.get('q', '').strip()
+        if not q:
+            return Response([])
+        
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), SEARCH_MAX_RESULTS)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=400)
+        
+        results = search_beneficiaries(request.user, q[:100], limit, BeneficiaryListView.format)
+        response = Response(results)
+        # Let the app reuse answers for repeated keystrokes
+        response['Cache-Control'] = 'private, max-age=10'
+        return response
+
+class ContactMatchView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'contacts'
+    
+    MAX_CONTACTS = 5000
+    CHUNK_SIZE = 500
+    
+    def post(self, request):
+        """
+        Match a phone book against Owo Bank accounts in bulk.
+        Expected payload: { "phone_numbers": ["0803...", "+234..."], "phone_hashes": ["<sha256 of 0803...>"] }
+        Either list may be omitted. Returns the contacts that have an Owo wallet,
+        with their account number and a masked name (accounts.utils.masked_name);
+        the full name is what /verify-account/ returns before a transfer.
+        """
+        numbers = request.data.get('phone_numbers') or []
+        hashes = request.data.get('phone_hashes') or []
+        if not isinstance(numbers, list) or not isinstance(hashes, list):
+            return Response({"error": "phone_numbers and phone_hashes must be lists"}, status=400)
+        if len(numbers) + len(hashes) > self.MAX_CONTACTS:
+            return Response({"error": f"At most {self.MAX_CONTACTS} contacts per request"}, status=400)
+        
+        # normalized value -> what the client sent, so it can map matches back
+        by_phone = {}
+        for raw in numbers:
+            normalized = normalize_phone(raw)
+            if normalized:
+                by_phone.setdefault(normalized, raw)
+        by_hash = {str(h).lower(): h for h in hashes if h}
+        
+        matches = []
+        for field, lookup in (('phone_number', by_phone), ('phone_hash', by_hash)):
+            keys = list(lookup)
+            for i in range(0, len(keys), self.CHUNK_SIZE):
+                matches.extend(self.match_chunk(request.user, field, keys[i:i + self.CHUNK_SIZE], lookup))
+        
+        return Response({"checked": len(by_phone) + len(by_hash), "matches": matches})
+    
+    def match_chunk(self, user, field, keys, lookup):
+        # One indexed IN query for the accounts, one for existing beneficiaries
+        rows = list(
+            User.objects.filter(**{f'{field}__in': keys}, is_active=True)
+            .exclude(pk=user.pk).exclude(wallet_account_number='')
+            .values_list(field, 'first_name', 'last_name', 'wallet_account_number')
+        )
+        saved = set(Beneficiary.objects.filter(
+            user=user, bank_code=OWO_BANK_CODE, account_number__in=[row[3] for row in rows]
+        ).values_list('account_number', flat=True))
+        
+        return [
+            {
+                "input": lookup[key],
+                "account_number": account_number,
+                "name": masked_name(first_name, last_name),
+                "bank_code": "050",
+                "bank_name": "Owo Bank",
+                "is_beneficiary": account_number in saved,
+            }
+            for key, first_name, last_name, account_number in rows
+        ]
+
+class CreateBeneficiaryView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @transaction.atomic
+    def post(self, request):
+        """Create a new beneficiary"""
+        serializer = CreateBeneficiarySerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            beneficiary = serializer.save()
+            
+            # Increment transfer count if this was created during a transfer
+            increment_count = request.data.get('increment_count', False)
+            if increment_count:
+                beneficiary.transfer_count += 1
+                beneficiary.save()
+            
+            return Response({
+                "success": True,
+                "message": "Beneficiary added successfully",
+                "beneficiary": BeneficiarySerializer(beneficiary, context={'request': request}).data
+            }, status=201)
+        return Response(serializer.errors, status=400)
+
+class DeleteBeneficiaryView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @transaction.atomic
+    def delete(self, request, beneficiary_id):
+        """Delete a beneficiary"""
+        try:
+            beneficiary = Beneficiary.objects.get(id=beneficiary_id, user=request.user)
+            beneficiary.delete()
+            return Response({"success": True, "message": "Beneficiary removed successfully"})
+        except Beneficiary.DoesNotExist:
+            return Response({"error": "Beneficiary not found"}, status=404)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+class UpdateBeneficiaryView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @transaction.atomic
+    def put(self, request, beneficiary_id):
+        """Update beneficiary nickname"""
+        try:
+            beneficiary = Beneficiary.objects.get(id=beneficiary_id, user=request.user)
+            nickname = request.data.get('nickname', '').strip()
+            
+            if nickname:
+                beneficiary.nickname = nickname
+                beneficiary.save()
+            
+            return Response({
+                "success": True,
+                "message": "Beneficiary updated",
+                "beneficiary": BeneficiarySerializer(beneficiary, context={'request': request}).data
+            })
+        except Beneficiary.DoesNotExist:
+            return Response({"error": "Beneficiary not found"}, status=404)
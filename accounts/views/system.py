@@ -0,0 +1,171 @@
+"""Health, metrics and URL-debugging endpoints"""
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions, views
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..metrics import registry as metrics_registry
+from ..utils import staff_user
+
+
+class HealthCheckView(APIView):
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """
+        Health check endpoint for backend status
+        """
+        return Response({
+            'status': 'healthy',
+            'service': 'OWO Banking API',
+            'timestamp': timezone.now().isoformat(),
+            'version': '1.0.0'
+        })
+
+class MetricsView(views.APIView):
+    # Staff users, or a scraper presenting OWO_METRICS_TOKEN as a bearer token
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def perform_authentication(self, request):
+        # With no authenticators DRF would set the Django request's user to
+        # AnonymousUser, hiding the admin session staff_user() looks for
+        pass
+    
+    def get(self, request):
+        """Per-view latency histograms and DB usage in Prometheus text format"""
+        if not self.is_allowed(request):
+            return Response({"error": "Not authorized"}, status=403)
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    
+    @staticmethod
+    def is_allowed(request):
+        token = getattr(settings, 'OWO_METRICS_TOKEN', '')
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and constant_time_compare(header, f'Bearer {token}'):
+            return True
+        return staff_user(request._request) is not None
+
+class DebugRequestView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        from django.urls import get_resolver, resolve, Resolver404
+        
+        current_path = request.path
+        try:
+            match = resolve(current_path)
+            match_info = {
+                'resolved': True,
+                'view': match.func.__name__,
+                'view_class': getattr(match.func, 'view_class', None).__name__ if hasattr(match.func, 'view_class') else 'N/A',
+                'args': match.args,
+                'kwargs': match.kwargs,
+                'url_name': match.url_name,
+            }
+        except Resolver404:
+            match_info = {
+                'resolved': False,
+                'error': 'No match found',
+            }
+        
+        # Also check the statement export URL specifically
+        test_path = '/api/auth/statement/export/TEST123/pdf/'
+        try:
+            test_match = resolve(test_path)
+            test_resolved = True
+        except Resolver404:
+            test_resolved = False
+        
+        return Response({
+            'current_request': {
+                'path': current_path,
+                'method': request.method,
+                'resolved': match_info,
+            },
+            'test_export_url': {
+                'path': test_path,
+                'resolved': test_resolved,
+            },
+            # ResolverMatch has no urlconf attribute; list the root patterns instead
+            'all_urls': [str(pattern.pattern) for pattern in get_resolver().url_patterns],
+        })
+
+class DebugURLView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        from django.urls import get_resolver
+        from django.urls.resolvers import RegexPattern, URLPattern, URLResolver
+        
+        resolver = get_resolver()
+        
+        def get_urls(url_patterns, prefix=''):
+            urls = []
+            for pattern in url_patterns:
+                if isinstance(pattern, URLPattern):
+                    urls.append({
+                        'pattern': str(pattern.pattern),
+                        'name': pattern.name,
+                        'callback': pattern.callback.__name__ if hasattr(pattern.callback, '__name__') else str(pattern.callback),
+                        'full_pattern': prefix + str(pattern.pattern)
+                    })
+                elif isinstance(pattern, URLResolver):
+                    urls.extend(get_urls(pattern.url_patterns, prefix + str(pattern.pattern)))
+            return urls
+        
+        all_urls = get_urls(resolver.url_patterns)
+        
+        # Filter for auth URLs
+        auth_urls = [url for url in all_urls if '/api/auth/' in url['full_pattern']]
+        
+        return Response({
+            'total_urls': len(all_urls),
+            'auth_urls': auth_urls,
+            'current_request': {
+                'path': request.path,
+                'method': request.method,
+                'user': str(request.user) if request.user.is_authenticated else 'Anonymous',
+            }
+        })
+
+class CheckURLPatternsView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        from django.urls import get_resolver
+        import re
+        
+        resolver = get_resolver()
+        patterns = []
+        
+        def extract_patterns(urlpatterns, prefix=''):
+            for pattern in urlpatterns:
+                if hasattr(pattern, 'pattern'):
+                    full_pattern = prefix + str(pattern.pattern)
+                    # Clean up the pattern
+                    full_pattern = full_pattern.replace('^', '').replace('$', '')
+                    patterns.append({
+                        'pattern': full_pattern,
+                        'name': getattr(pattern, 'name', 'No name'),
+                        'lookup_str': str(pattern.lookup_str) if hasattr(pattern, 'lookup_str') else 'N/A'
+                    })
+                    if hasattr(pattern, 'url_patterns'):
+                        extract_patterns(pattern.url_patterns, full_pattern)
+        
+        extract_patterns(resolver.url_patterns)
+        
+        # Filter for auth patterns
+        auth_patterns = [p for p in patterns if '/api/auth/' in p['pattern']]
+        
+        return Response({
+            'all_patterns_count': len(patterns),
+            'auth_patterns': auth_patterns,
+            'test_url': '/api/auth/statement/export/STM-D57685E946F9/pdf/',
+            'expected_pattern': 'api/auth/statement/export/<str:statement_id>/<str:format>/'
+        })
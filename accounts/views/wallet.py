@@ -0,0 +1,472 @@
+"""Wallet balance and history, transfers, bill payments and account lookups"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework import permissions, views
+from rest_framework.response import Response
+
+from .. import bills, ledger
+from ..async_api import AsyncAPIView
+from ..banks import BANK_LIST_RESPONSE, OWO_BANK_CODE, bank_name
+from ..beneficiaries import record_beneficiary_use, upsert_beneficiary_use
+from ..models import User, Wallet
+from ..pin import authorize_pin
+from ..replicas import ReplicaReadMixin
+from ..serializers import TransactionSerializer, VerifyAccountSerializer, WalletSerializer
+from ..throttling import PIN_RATE_LIMITS, RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+class BankListView(ReplicaReadMixin, views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        """Get list of supported banks (pre-rendered once per process, see accounts/banks.py)"""
+        return BANK_LIST_RESPONSE.respond(request)
+
+class WalletInfoView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            wallet = request.user.wallet
+            return Response(WalletSerializer(wallet).data)
+        except User.wallet.RelatedObjectDoesNotExist:
+            # If no wallet exists, create one
+            wallet = Wallet.objects.create(user=request.user)
+            return Response(WalletSerializer(wallet).data)
+
+class RecentTransactionsView(ReplicaReadMixin, views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            wallet = request.user.wallet
+            # Get transactions with optional limit parameter
+            limit = request.GET.get('limit', 10)
+            transactions = wallet.transactions.order_by('-timestamp')[:int(limit)]
+            
+            serializer = TransactionSerializer(transactions, many=True)
+            return Response(serializer.data)
+        except User.wallet.RelatedObjectDoesNotExist:
+            return Response([], status=200)
+
+class RealTimeDataView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        """Get real-time wallet and transaction data"""
+        try:
+            wallet = request.user.wallet
+            
+            # Get latest transactions (last 10)
+            latest_transactions = wallet.transactions.order_by('-timestamp')[:10]
+            
+            # Get today's transactions
+            today_amounts = wallet.transactions.filter(
+                timestamp__range=self.today_range()
+            ).values_list('amount', flat=True)
+            
+            return self.respond(wallet, latest_transactions, today_amounts)
+        except Exception as e:
+            logger.exception("Real-time data failed")
+            return Response({'error': str(e)}, status=500)
+
+    @staticmethod
+    def today_range():
+        # Get today's date using timezone
+        today = timezone.now().date()
+        today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        today_end = timezone.make_aware(datetime.combine(today, datetime.max.time()))
+        return today_start, today_end
+
+    @staticmethod
+    def respond(wallet, latest_transactions, today_amounts):
+        # Calculate today's stats
+        today_income = Decimal('0.00')
+        today_expense = Decimal('0.00')
+        today_count = 0
+        
+        for amount in today_amounts:
+            today_count += 1
+            if amount > 0:
+                today_income += amount
+            else:
+                today_expense += abs(amount)
+        
+        return Response({
+            'wallet': {
+                'balance': str(wallet.balance),
+                'account_number': wallet.account_number,
+            },
+            'stats': {
+                'today_income': str(today_income),
+                'today_expense': str(today_expense),
+                'today_transactions': today_count,
+            },
+            'latest_transactions': TransactionSerializer(
+                latest_transactions, many=True
+            ).data,
+            'last_updated': timezone.now().isoformat()
+        })
+
+class AsyncRealTimeDataView(AsyncAPIView, RealTimeDataView):
+    """RealTimeDataView on the async ORM"""
+
+    async def get(self, request):
+        try:
+            wallet = await Wallet.objects.aget_for_user(request.user)
+            latest_transactions = [t async for t in wallet.transactions.order_by('-timestamp')[:10]]
+            today_amounts = [a async for a in wallet.transactions.filter(
+                timestamp__range=self.today_range()
+            ).values_list('amount', flat=True)]
+            return self.respond(wallet, latest_transactions, today_amounts)
+        except Exception as e:
+            logger.exception("Real-time data failed")
+            return Response({'error': str(e)}, status=500)
+
+class TransferView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = PIN_RATE_LIMITS
+    throttle_scope = 'transfer'
+
+    def post(self, request):
+        data = request.data
+        amount = data.get('amount')
+        recipient_account = data.get('account_number')
+        bank_code = data.get('bank_code', '050')  # Default to Owo Bank if not provided
+        description = data.get('description', '')
+        pin = data.get('pin') or data.get('pin_token')
+        recipient_name = data.get('recipient_name')
+
+        # Only require bank_code if it's NOT an Owo Bank transfer
+        required_fields = [amount, recipient_account, pin]
+        if bank_code != '050':  # External bank
+            required_fields.append(bank_code)
+        
+        if not all(required_fields):
+            return Response({"error": "Missing required fields"}, status=400)
+
+        try:
+            amount_decimal = Decimal(amount)
+            if amount_decimal <= 0:
+                return Response({"error": "Amount must be positive"}, status=400)
+
+            user = request.user
+            if not authorize_pin(user, data):
+                return Response({"error": "Invalid PIN"}, status=400)
+
+            sender_wallet = user.wallet
+            if sender_wallet.balance < amount_decimal:
+                return Response({"error": "Insufficient funds"}, status=400)
+
+            recipient_wallet = None
+            sender_name = f"{user.first_name} {user.last_name}".strip() or user.email.split('@')[0]
+
+            if bank_code == '050':  # Internal Owo Bank transfer
+                try:
+                    # The recipient's name comes from the user row; fetch it in the same query
+                    recipient_wallet = Wallet.objects.get_by_account(recipient_account)
+                    if recipient_wallet.user_id == user.id:
+                        return Response({"error": "Cannot transfer to own account"}, status=400)
+
+                    # Override recipient_name with actual user details
+                    recipient_name = f"{recipient_wallet.user.first_name} {recipient_wallet.user.last_name}".strip() or recipient_wallet.user.email.split('@')[0]
+
+                except Wallet.DoesNotExist:
+                    return Response({"error": "Recipient account not found"}, status=400)
+            else:
+                # External transfer: Ensure recipient_name was provided (from verification)
+                if not recipient_name:
+                    return Response({"error": "Recipient name required for external transfers"}, status=400)
+
+            # Perform transfer. The balance check above is only a fast path; the
+            # conditional UPDATEs decide, so concurrent transfers can't overdraw
+            debit_entry = {
+                'type': 'TRANSFER',
+                'description': description or f"Transfer to {recipient_name}",
+                'counterparty': recipient_name,  # Set to recipient's name
+                'account_number': recipient_account,  # Recipient's account number
+            }
+            try:
+                if recipient_wallet:
+                    sender_transaction = ledger.move(sender_wallet, recipient_wallet, amount_decimal, debit_entry, {
+                        'type': 'TRANSFER',
+                        'description': description or f"Transfer from {sender_name}",
+                        'counterparty': sender_name,  # Set to sender's name
+                        'account_number': sender_wallet.account_number,  # Sender's account number
+                    })
+                else:
+                    sender_transaction = ledger.pay_out(sender_wallet, amount_decimal, debit_entry)
+            except ledger.InsufficientFunds:
+                return Response({"error": "Insufficient funds"}, status=400)
+            except ledger.TransferFailed as e:
+                return Response({"error": str(e)}, status=400)
+            except ledger.TransferPending as e:
+                # Debited; the recipient's shard will be credited by resume_transfers
+                return Response({
+                    "message": str(e),
+                    "new_balance": str(ledger.balance(sender_wallet)),
+                    "transaction_id": e.debit.id
+                }, status=202)
+
+            # Beneficiary bookkeeping runs after commit so it never extends the
+            # transfer's lock hold. With add_beneficiary it is one upsert; otherwise
+            # it bumps the frecency of an already-saved recipient (or does nothing).
+            # robust=True logs a failure instead of failing the transfer, which has
+            # already committed. It logs the hook's __qualname__, which a
+            # functools.partial doesn't have, so these are named functions.
+            if data.get('add_beneficiary', False):
+                beneficiary_fields = {
+                    'bank_name': bank_name(bank_code, data.get('bank_name', '')),
+                    'nickname': data.get('nickname', ''),
+                }
+
+                def save_beneficiary():
+                    upsert_beneficiary_use(user, recipient_account, bank_code, recipient_name, **beneficiary_fields)
+            else:
+                def save_beneficiary():
+                    record_beneficiary_use(user, recipient_account, bank_code)
+            transaction.on_commit(save_beneficiary, robust=True)
+
+            return Response({
+                "message": "Transfer successful",
+                "new_balance": str(ledger.balance(sender_wallet)),
+                "transaction_id": sender_transaction.id
+            })
+
+        except InvalidOperation:
+            return Response({"error": "Invalid amount"}, status=400)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+class BillPaymentView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = PIN_RATE_LIMITS
+    throttle_scope = 'bill'
+
+    def post(self, request):
+        bill_type = request.data.get('type') # AIRTIME or DATA
+        amount = request.data.get('amount')
+        phone = request.data.get('phone_number')
+        pin = request.data.get('pin')  # Get PIN from request
+        pin_token = request.data.get('pin_token')  # Or a step-up token from PinStepUpView
+        
+        if not pin and not pin_token:
+            return Response({"error": "PIN is required"}, status=400)
+        
+        if pin and (len(pin) != 4 or not pin.isdigit()):
+            return Response({"error": "PIN must be 4 digits"}, status=400)
+        
+        # Verify user's PIN (or step-up token) using password checking
+        if not authorize_pin(request.user, request.data):
+            return Response({"error": "Invalid PIN"}, status=401)
+        
+        try:
+            amount_decimal = Decimal(str(amount))
+        except (InvalidOperation, TypeError, ValueError):
+            return Response({"error": "Invalid amount format"}, status=400)
+        if amount_decimal <= 0:
+            return Response({"error": "Amount must be positive"}, status=400)
+        
+        sender_wallet = request.user.wallet
+
+        if sender_wallet.balance < amount_decimal:
+            return Response({"error": "Insufficient funds"}, status=400)
+
+        # Reserve the funds first, in a transaction short enough that the row
+        # lock isn't held across the provider call
+        try:
+            debit_row = ledger.pay_out(sender_wallet, amount_decimal, {
+                'type': bill_type.upper(),
+                'description': f"{bill_type.capitalize()} purchase for {phone}",
+            })
+        except ledger.InsufficientFunds:
+            return Response({"error": "Insufficient funds"}, status=400)
+
+        try:
+            bills.get_provider().purchase(bill_type.upper(), phone, amount_decimal)
+        except bills.BillProviderError:
+            logger.warning("Bill payment %s failed at the provider, reversing", debit_row.pk, exc_info=True)
+            try:
+                ledger.reverse(sender_wallet, debit_row)
+            except DatabaseError:
+                logger.exception("Reversing bill payment %s failed; %s is owed %s",
+                                 debit_row.pk, sender_wallet.account_number, amount_decimal)
+                return Response({"error": "Purchase failed. Your refund is being processed."}, status=502)
+            return Response({"error": "Purchase failed and you were not charged. Please try again."}, status=502)
+
+        return Response({
+            "message": f"{bill_type.capitalize()} purchase successful for ₦{amount}",
+            "new_balance": str(ledger.balance(sender_wallet))
+        })
+
+class VerifyAccountView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = RATE_LIMITS
+    throttle_scope = 'verify_account'
+    
+    def get(self, request):
+        """Get endpoint for simple account verification (existing functionality)"""
+        account_number = request.GET.get('account_number')
+        
+        if not account_number:
+            return Response({"error": "Account number is required"}, status=400)
+        
+        try:
+            wallet = Wallet.objects.get_by_account(account_number)
+        except Wallet.DoesNotExist:
+            wallet = None
+        return self.owo_lookup_response(request, account_number, wallet)
+    
+    def post(self, request):
+        """POST endpoint for bank account verification with bank code (new functionality)"""
+        serializer = VerifyAccountSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        account_number = serializer.validated_data['account_number']
+        bank_code = serializer.validated_data['bank_code']
+        
+        # Skip verification for Owo Bank accounts (handled during transfer)
+        if bank_code == OWO_BANK_CODE:
+            try:
+                wallet = Wallet.objects.get_by_account(account_number)
+            except Wallet.DoesNotExist:
+                wallet = None
+            return self.owo_verify_response(request, wallet, bank_code)
+        
+        # For external banks, you would call a bank verification API
+        # This is a mock implementation
+        # Simulate API call delay
+        time.sleep(getattr(settings, 'OWO_BANK_VERIFY_DELAY', 1.0))
+        return self.external_verify_response(account_number, bank_code)
+
+    @staticmethod
+    def owo_lookup_response(request, account_number, wallet):
+        if wallet is None:
+            # Account not found - return a fallback response instead of error
+            return Response({
+                "account_number": account_number,
+                "user_name": "Account Not Found",
+                "verified": False,
+                "message": "Account not found in Owo Bank. You can still proceed with transfer.",
+                "can_proceed": True  # Allow user to proceed anyway
+            })
+
+        # Don't return the user's own account
+        if wallet.user_id == request.user.id:
+            return Response({"error": "Cannot verify own account"}, status=400)
+            
+        return Response({
+            "account_number": wallet.account_number,
+            "user_email": wallet.user.email,
+            "user_name": f"{wallet.user.first_name} {wallet.user.last_name}".strip() or wallet.user.email.split('@')[0],
+            "verified": True,
+            "message": "Account verified successfully"
+        })
+
+    @staticmethod
+    def owo_verify_response(request, wallet, bank_code):
+        if wallet is None:
+            # Account not found - return a fallback response
+            return Response({
+                "verified": False,
+                "user_name": "Account Not Found",
+                "message": "Account not found in Owo Bank. Please verify the account number.",
+                "can_proceed": False  # Don't allow proceeding for Owo Bank
+            })
+
+        # Don't return own account
+        if wallet.user_id == request.user.id:
+            return Response({
+                "verified": False,
+                "error": "Cannot verify own account",
+                "can_proceed": False
+            }, status=400)
+        
+        return Response({
+            "verified": True,
+            "user_name": f"{wallet.user.first_name} {wallet.user.last_name}".strip() or wallet.user.email.split('@')[0],
+            "user_email": wallet.user.email,
+            "bank_name": bank_name(bank_code),
+            "message": "Owo Bank account verified"
+        })
+
+    @staticmethod
+    def external_verify_response(account_number, bank_code):
+        try:
+            # Mock verification for demo
+            if account_number == "0123456789":
+                verified_name = "Jane Smith"
+            elif account_number == "9876543210":
+                verified_name = "Mike Johnson"
+            else:
+                # For demo, generate a random name for valid-looking numbers
+                if len(account_number) == 10 and account_number.isdigit():
+                    names = ["John Doe", "Sarah Williams", "David Brown", "Lisa Johnson"]
+                    import random
+                    verified_name = random.choice(names)
+                else:
+                    # Invalid account number format
+                    return Response({
+                        "verified": False,
+                        "error": "Invalid account number format",
+                        "message": "Account number must be 10 digits",
+                        "can_proceed": False
+                    })
+            
+            return Response({
+                "verified": True,
+                "user_name": verified_name,
+                "bank_name": bank_name(bank_code),
+                "message": "Account verified successfully"
+            })
+            
+        except Exception as e:
+            # Any other error - return a fallback
+            return Response({
+                "verified": False,
+                "error": str(e),
+                "message": "Verification service unavailable. You can proceed with caution.",
+                "can_proceed": True  # Allow user to proceed with caution
+            }, status=400)
+
+class AsyncVerifyAccountView(AsyncAPIView, VerifyAccountView):
+    """
+    VerifyAccountView on the async ORM. The upstream bank lookup is awaited,
+    so a worker keeps serving other requests while it waits.
+    """
+
+    async def get(self, request):
+        account_number = request.GET.get('account_number')
+        if not account_number:
+            return Response({"error": "Account number is required"}, status=400)
+        try:
+            wallet = await Wallet.objects.aget_by_account(account_number)
+        except Wallet.DoesNotExist:
+            wallet = None
+        return self.owo_lookup_response(request, account_number, wallet)
+
+    async def post(self, request):
+        serializer = VerifyAccountSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        account_number = serializer.validated_data['account_number']
+        bank_code = serializer.validated_data['bank_code']
+
+        if bank_code == OWO_BANK_CODE:
+            try:
+                wallet = await Wallet.objects.aget_by_account(account_number)
+            except Wallet.DoesNotExist:
+                wallet = None
+            return self.owo_verify_response(request, wallet, bank_code)
+
+        await asyncio.sleep(getattr(settings, 'OWO_BANK_VERIFY_DELAY', 1.0))
+        return self.external_verify_response(account_number, bank_code)
@@ -0,0 +1,55 @@
+"""
+Work each process would otherwise do on its first requests, done once up
+front.
+
+gunicorn.conf.py calls warm_up() in the master after preload_app has loaded
+the application and before any worker is forked, so the results sit in
+memory the workers share copy-on-write and no worker's first request pays
+for them. Building the registration index queries the database;
+when_ready closes the connections afterwards so the forked workers don't
+inherit the sockets.
+"""
+import logging
+
+from django.contrib.auth.hashers import check_password, get_hashers, make_password
+from django.db import DatabaseError
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+from .banks import BANK_LIST_RESPONSE
+from .bloom import registration_index
+from .throttling import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    # Imports the hasher classes and argon2's C library, and runs one hash
+    # so its first use in a worker isn't slower than the rest
+    get_hashers()
+    check_password('warm-up', make_password('warm-up'))
+
+    # Rendered, gzipped and hashed at import; make sure that happened here
+    BANK_LIST_RESPONSE.gzip_body
+
+    # URL patterns and the reverse() lookup tables are built lazily per process
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+    # DRF imports its default authentication/renderer/parser/throttle classes on first access
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                 'DEFAULT_PARSER_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_CONTENT_NEGOTIATION_CLASS'):
+        getattr(api_settings, name)
+
+    # Picks the rate limit backend, so a misconfigured one stops the server
+    # here rather than failing every throttled request
+    get_backend()
+
+    # One streamed scan of the user table, instead of one per worker on its
+    # first signup or NIN check
+    try:
+        registration_index.build()
+    except DatabaseError:
+        # Don't keep the server from starting; each worker builds it on first use
+        logger.warning("Could not build the registration index at startup", exc_info=True)
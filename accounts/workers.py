@@ -0,0 +1,19 @@
+"""Helpers for fanning work out to a process pool from management commands"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def init_worker():
+    """Process pool initializer: make sure Django is configured in the child"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def process_pool(max_workers=None):
+    # Forked children must not share the parent's open DB sockets; each worker
+    # opens its own connection on first query.
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=init_worker)
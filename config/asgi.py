@@ -3,6 +3,13 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with the uvicorn worker class and OWO_ASYNC_VIEWS=1 so the async
+read endpoints run on the event loop (accounts/async_api.py):
+
+    OWO_ASYNC_VIEWS=1 gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+`manage.py bench_asgi` compares one such worker with one sync WSGI worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
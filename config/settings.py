@@ -37,6 +37,9 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 
 MIDDLEWARE = [
+    'accounts.middleware.ProbeMiddleware',  # Health probes short-circuit everything below
+    'accounts.middleware.MetricsMiddleware',  # Inert unless OWO_METRICS_SAMPLE_RATE > 0
+    'accounts.middleware.RequestIdMiddleware',  # X-Request-ID on every log line and response
     'corsheaders.middleware.CorsMiddleware',  # ADD THIS - MUST BE FIRST or near top
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -45,6 +48,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.ReplicaPinMiddleware',  # Inert unless DATABASE_REPLICA_URLS is set
+    'accounts.profiling.ProfilingMiddleware',  # Staff X-Owo-Profile: 1 / ?__profile=1, plus sampling
 ]
 
 INSTALLED_APPS = [
@@ -94,6 +99,36 @@ DATABASES = {
     )
 }
 
+# Read replicas, comma-separated URLs. Only views that opt in read from them,
+# and a user who just wrote is pinned to the primary (accounts/replicas.py).
+OWO_READ_REPLICAS = []
+for _i, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{_i}'] = {
+        **dj_database_url.parse(_url.strip(), conn_max_age=600, ssl_require=not _url.startswith('sqlite')),
+        'TEST': {'MIRROR': 'default'},
+    }
+    OWO_READ_REPLICAS.append(f'replica_{_i}')
+# Wallet/transaction shards, comma-separated URLs for shards 1..N ('default' is
+# shard 0). Wallets are placed by a hash of their account number, so adding a
+# shard later means moving wallets (accounts/sharding.py).
+OWO_WALLET_SHARDS = ['default']
+for _i, _url in enumerate(filter(None, os.environ.get('DATABASE_SHARD_URLS', '').split(',')), start=1):
+    DATABASES[f'shard_{_i}'] = dj_database_url.parse(_url.strip(), conn_max_age=600, ssl_require=not _url.startswith('sqlite'))
+    OWO_WALLET_SHARDS.append(f'shard_{_i}')
+DATABASE_ROUTERS = ['accounts.sharding.ShardRouter', 'accounts.replicas.ReplicaRouter']
+# Seconds a user reads from the primary after a write
+OWO_REPLICA_PIN_SECONDS = int(os.environ.get('OWO_REPLICA_PIN_SECONDS', 5))
+
+# Shared cache: replica pins, the 'cache' rate limit backend, search caching.
+# redis://host:6379/0, or file:///path for several workers on one host. Unset
+# means a local-memory cache per process, which is refused once replicas are
+# configured (a pin set by one worker must be seen by all of them).
+_cache_url = os.environ.get('CACHE_URL', '')
+if _cache_url.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': _cache_url}}
+elif _cache_url.startswith('file://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': _cache_url[len('file://'):]}}
+
 
 
 # Password validation
@@ -114,6 +149,94 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2id first so new hashes use it; older PBKDF2 hashes still verify and are
+# upgraded on the next successful login / PIN check.
+PASSWORD_HASHERS = [
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Tune with `python manage.py bench_hashers`
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+# Fraction of requests timed by accounts.middleware.MetricsMiddleware (0 disables it).
+# /metrics is readable by staff users or with `Authorization: Bearer $OWO_METRICS_TOKEN`.
+OWO_METRICS_SAMPLE_RATE = float(os.environ.get('OWO_METRICS_SAMPLE_RATE', 0))
+OWO_METRICS_TOKEN = os.environ.get('OWO_METRICS_TOKEN', '')
+# With several workers: a directory they all write their counts to, so /metrics
+# can serve the sum (accounts/metrics.py)
+OWO_METRICS_DIR = os.environ.get('OWO_METRICS_DIR', '')
+
+# Request profiling (accounts/profiling.py); profiles are listed at /admin/profiles/
+OWO_PROFILE_SAMPLE_RATE = float(os.environ.get('OWO_PROFILE_SAMPLE_RATE', 0))
+OWO_PROFILE_DIR = Path(os.environ.get('OWO_PROFILE_DIR', BASE_DIR / 'profiles'))
+OWO_PROFILE_MAX_FILES = int(os.environ.get('OWO_PROFILE_MAX_FILES', 50))
+
+# Max seconds before a worker's registration Bloom index picks up users created elsewhere
+OWO_REGISTRATION_INDEX_REFRESH = int(os.environ.get('OWO_REGISTRATION_INDEX_REFRESH', 5))
+# ... and how many ids before the newest one it has seen each refresh re-reads, for
+# signups whose transaction committed after a later one's
+OWO_REGISTRATION_INDEX_OVERLAP = int(os.environ.get('OWO_REGISTRATION_INDEX_OVERLAP', 1000))
+
+# NIN identity provider (see accounts/nin.py). For a local HTTP vendor run
+# `manage.py nin_stub_server` and set OWO_NIN_PROVIDER=accounts.nin.HTTPNINProvider
+OWO_NIN_PROVIDER = os.environ.get('OWO_NIN_PROVIDER', 'accounts.nin.StubNINProvider')
+OWO_NIN_PROVIDER_URL = os.environ.get('OWO_NIN_PROVIDER_URL', 'http://127.0.0.1:8765/v1/nin/verify')
+OWO_NIN_API_KEY = os.environ.get('OWO_NIN_API_KEY', '')
+OWO_NIN_CACHE_TTL = int(os.environ.get('OWO_NIN_CACHE_TTL', 86400))
+
+# Airtime/data provider (see accounts/bills.py), and the simulated one's latency (seconds)
+OWO_BILL_PROVIDER = os.environ.get('OWO_BILL_PROVIDER', 'accounts.bills.StubBillProvider')
+OWO_BILL_PROVIDER_DELAY = float(os.environ.get('OWO_BILL_PROVIDER_DELAY', 1.0))
+# Simulated external bank name-enquiry latency in VerifyAccountView (seconds)
+OWO_BANK_VERIFY_DELAY = float(os.environ.get('OWO_BANK_VERIFY_DELAY', 1.0))
+
+# Serve the async variants of the read endpoints (accounts/async_api.py).
+# Only under ASGI: gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+OWO_ASYNC_VIEWS = os.environ.get('OWO_ASYNC_VIEWS', '0') == '1'
+if OWO_ASYNC_VIEWS:
+    # Under ASGI each request's sync code runs in a thread of its own, so
+    # persistent connections would pile up one per finished thread. Pool
+    # outside Django instead (PgBouncer).
+    for _db in DATABASES.values():
+        _db['CONN_MAX_AGE'] = 0
+
+# Lifetime of the token returned by /pin/step-up/ (seconds)
+PIN_STEP_UP_TOKEN_TTL = int(os.environ.get('PIN_STEP_UP_TOKEN_TTL', 300))
+
+# Logging: one JSON line per record on stdout, written by a background thread
+# (accounts/log.py). Events logged with extra={'sample': True} are kept for
+# OWO_LOG_SAMPLE_RATE of requests.
+OWO_LOG_LEVEL = os.environ.get('OWO_LOG_LEVEL', 'INFO')
+OWO_LOG_SAMPLE_RATE = float(os.environ.get('OWO_LOG_SAMPLE_RATE', 0.01))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'accounts.log.RequestIdFilter'},
+        'sampling': {'()': 'accounts.log.SamplingFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'accounts.log.JSONFormatter'},
+    },
+    'handlers': {
+        'queue': {
+            '()': 'accounts.log.QueueingHandler',
+            'formatter': 'json',
+            'filters': ['request_id', 'sampling'],
+        },
+    },
+    'root': {'handlers': ['queue'], 'level': OWO_LOG_LEVEL},
+    'loggers': {
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'django.server': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -138,13 +261,41 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # Proxies in front of gunicorn (the platform's router: 1). Per-IP rate limits
+    # key on the address the nearest proxy saw, not on what the client claims in
+    # X-Forwarded-For; 0 when clients connect to gunicorn directly.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # Better default
-    ]
+    ],
+    # Used by accounts.throttling: '<scope>' is per user, '<scope>_ip' per client IP
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/min',
+        'login_ip': '30/min',
+        'transfer': '30/min',
+        'transfer_ip': '120/min',
+        'bill': '30/min',
+        'bill_ip': '120/min',
+        'verify_account': '60/min',
+        'verify_account_ip': '240/min',
+        'nin': '10/min',
+        'nin_ip': '30/min',
+        'availability': '60/min',
+        'availability_ip': '120/min',
+        'contacts': '10/min',
+        'contacts_ip': '30/min',
+        # Every raw PIN check (step-up, PIN change, transfers and bills sent with `pin`):
+        # slow enough that guessing a 4-digit PIN takes weeks
+        'pin': '20/hour',
+        'pin_ip': '100/hour',
+    },
 }
+
+# 'memory' (per process token bucket) or 'cache' (shared sliding window in CACHES['default'], needs CACHE_URL)
+OWO_RATE_LIMIT_BACKEND = os.environ.get('OWO_RATE_LIMIT_BACKEND', 'memory')
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -155,6 +306,12 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Email (Prints to console for dev)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Outbound mail goes through accounts.outbox. Set OWO_EMAIL_OUTBOX_WORKER=0 when a
+# separate `manage.py drain_outbox --loop` process does the sending.
+OWO_EMAIL_OUTBOX_WORKER = os.environ.get('OWO_EMAIL_OUTBOX_WORKER', '1') == '1'
+OWO_EMAIL_OUTBOX_BATCH_SIZE = 50
+OWO_EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -1,14 +1,20 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from accounts.views import MetricsView
+from accounts.admin import profile_list_view, profile_download_view
 
 
 def health_check(request):
     return HttpResponse("OK")
 
 urlpatterns = [
+    # Staff-only request profiles (see accounts/profiling.py)
+    path('admin/profiles/', admin.site.admin_view(profile_list_view), name='admin-profiles'),
+    path('admin/profiles/<str:name>', admin.site.admin_view(profile_download_view), name='admin-profile-download'),
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     
     # 1. Handle with trailing slash (already done)
     path('healthz/', health_check), 
@@ -0,0 +1,62 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory:
+
+    gunicorn config.wsgi --bind 0.0.0.0:$PORT --workers $WEB_CONCURRENCY
+
+The master imports the app once (preload_app) and warms it up, then forks
+the workers, which share those pages copy-on-write instead of each
+importing Django, DRF and the project on their own. `manage.py
+bench_startup` measures the difference.
+
+Code changes need a full restart with preload_app: HUP reloads fork from
+the master's already-imported code.
+"""
+import gc
+import glob
+import os
+
+wsgi_app = 'config.wsgi:application'
+preload_app = True
+
+
+def on_starting(server):
+    # The previous run's per-worker metric files (accounts/metrics.py); their
+    # counts would otherwise be added to this run's
+    metrics_dir = os.environ.get('OWO_METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.json*')):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Runs in the master once the app is loaded and before the first fork
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    from accounts.warmup import warm_up
+
+    warm_up()
+    # A connection opened here would be one socket shared by every worker
+    connections.close_all()
+    # Move everything allocated so far out of the collector's reach: a
+    # collection in a worker would otherwise write to (and so copy) every
+    # page holding a tracked object
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Each worker opens its own database connections on first use
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Counts recorded since the worker's last metrics flush
+    from accounts.metrics import registry
+
+    if registry.directory:
+        registry.flush()